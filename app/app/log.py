@@ -0,0 +1,123 @@
+"""
+Logging helpers: request ids, sampling, JSON records and off-thread I/O.
+"""
+
+import contextvars
+import copy
+import json
+import logging
+import queue
+import random
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+request_id_var = contextvars.ContextVar('request_id', default=None)
+
+
+class RequestIdFilter(logging.Filter):
+    """Attach the id of the current request to every record."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of the records of high-volume loggers.
+
+    `rates` maps logger name prefixes to the fraction of records kept.
+    Warnings and errors are never dropped.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = rates or {}
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        for prefix, rate in self.rates.items():
+            if record.name.startswith(prefix):
+                return rate >= 1 or random.random() < rate
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(
+                record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload['exc_info'] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when full."""
+
+    tracebacks = logging.Formatter()
+
+    def __init__(self, queue):
+        super().__init__(queue)
+        self.dropped = 0
+        self.listener = None
+
+    def prepare(self, record):
+        """
+        Interpolate the message and render the traceback to `exc_text`.
+
+        QueueHandler.prepare would fold the traceback into the message and
+        clear it, so the target's formatter could no longer put it in a
+        field of its own. Only the live frames are dropped here.
+        """
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.tracebacks.formatException(
+                    record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        # Called by logging.shutdown() at exit: drain what is queued.
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.stop()
+        super().close()
+
+
+def queue_handler(target, queue_size=10000):
+    """Return a handler that hands records to `target` on a listener thread.
+
+    Only the cheap message interpolation happens on the calling thread;
+    formatting and I/O run in the listener.
+    """
+    handler = DroppingQueueHandler(queue.Queue(queue_size))
+    handler.listener = QueueListener(
+        handler.queue, target, respect_handler_level=True)
+    handler.listener.start()
+    return handler
+
+
+def console_queue_handler(target_formatter, queue_size=10000):
+    """Return a queue_handler writing to stderr via `target_formatter`."""
+    target = logging.StreamHandler()
+    target.setFormatter(target_formatter)
+    return queue_handler(target, queue_size)
@@ -0,0 +1,102 @@
+"""
+Project-level middleware.
+"""
+
+import re
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+
+from app.log import request_id_var
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+class RequestIdMiddleware:
+    """Tag each request with an id, exposed to logs and the response."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.headers.get(REQUEST_ID_HEADER, '')
+        if not VALID_REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+        token = request_id_var.set(request_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_id_var.reset(token)
+        response[REQUEST_ID_HEADER] = request_id
+        return response
+
+
+class MiddlewareChain:
+    """A middleware stack built from dotted paths, like Django's own."""
+
+    def __init__(self, paths, get_response):
+        self.view_hooks = []
+        self.template_response_hooks = []
+        self.exception_hooks = []
+        handler = get_response
+        for path in reversed(paths):
+            try:
+                middleware = import_string(path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            if hasattr(middleware, 'process_view'):
+                self.view_hooks.insert(0, middleware.process_view)
+            if hasattr(middleware, 'process_template_response'):
+                self.template_response_hooks.append(
+                    middleware.process_template_response)
+            if hasattr(middleware, 'process_exception'):
+                self.exception_hooks.append(middleware.process_exception)
+            handler = convert_exception_to_response(middleware)
+        self.handler = handler
+
+
+class PathDispatchMiddleware:
+    """
+    Run API_MIDDLEWARE for requests under API_PATH_PREFIXES and
+    SITE_MIDDLEWARE (sessions, CSRF, auth, messages) for everything else.
+
+    JWT-authenticated API calls never need the session machinery; only the
+    admin does.
+    """
+
+    def __init__(self, get_response):
+        self.prefixes = tuple(settings.API_PATH_PREFIXES)
+        self.api = MiddlewareChain(settings.API_MIDDLEWARE, get_response)
+        self.site = MiddlewareChain(settings.SITE_MIDDLEWARE, get_response)
+
+    def chain_for(self, request):
+        if request.path_info.startswith(self.prefixes):
+            return self.api
+        return self.site
+
+    def __call__(self, request):
+        return self.chain_for(request).handler(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        for hook in self.chain_for(request).view_hooks:
+            response = hook(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def process_exception(self, request, exception):
+        for hook in self.chain_for(request).exception_hooks:
+            response = hook(request, exception)
+            if response is not None:
+                return response
+        return None
+
+    def process_template_response(self, request, response):
+        for hook in self.chain_for(request).template_response_hooks:
+            response = hook(request, response)
+        return response
@@ -14,6 +14,8 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
+from .cache_config import build_caches
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -36,13 +38,31 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'drf_spectacular',
+    'drf_spectacular_sidecar',
     'rest_framework_simplejwt',
     'djoser',
     'core',
 ]
 
 MIDDLEWARE = [
+    'app.middleware.RequestIdMiddleware',
+    'core.profiling.ProfilingMiddleware',
+    'core.slow_queries.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.staticfiles.StaticFilesMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'app.middleware.PathDispatchMiddleware',
+]
+
+# Stacks run by app.middleware.PathDispatchMiddleware: API routes are
+# JWT-authenticated and skip sessions, CSRF and messages; everything else
+# (the admin) gets the full stack.
+API_PATH_PREFIXES = ['/api/', '/fake_protected/', '/healthz', '/readyz']
+API_MIDDLEWARE = [
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+SITE_MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -51,8 +71,25 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# The admin's middleware checks only look at MIDDLEWARE; core.checks
+# verifies SITE_MIDDLEWARE instead.
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
+
 ROOT_URLCONF = 'app.urls'
 
+# Response compression (core.middleware.CompressionMiddleware).
+# 'br' and 'zstd' are used when the brotli/zstandard packages are installed.
+COMPRESSION_ENCODINGS = ['br', 'zstd', 'gzip']
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 512))
+COMPRESSION_CONTENT_TYPES = [
+    'application/json',
+    'application/vnd.oai.openapi',
+    'application/javascript',
+    'text/javascript',
+    'text/css',
+    'image/svg+xml',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -71,6 +108,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'app.wsgi.application'
 
+# Warm each worker up (core.warmup) when the WSGI/ASGI app is loaded,
+# before it accepts traffic.
+WARMUP = os.getenv('WARMUP', 'True') == 'True'
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
@@ -82,9 +123,85 @@ DATABASES = {
         'NAME': os.environ.get('DB_NAME', 'postgres'),
         'USER': os.environ.get('DB_USER', 'postgres'),
         'PASSWORD': os.environ.get('DB_PASSWORD', 'postgres'),
+        # Keep connections open across requests; checked before reuse.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'options': (
+                f"-c idle_in_transaction_session_timeout={os.getenv('DB_IDLE_IN_TRANSACTION_TIMEOUT', 60000)}"
+            ),
+        },
+    }
+}
 
+# Server-side pool per worker instead of persistent connections; needs
+# Django 5.1+ with psycopg 3 (requirements.upgrade.txt).
+if os.getenv('DB_POOL', 'False') == 'True':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+        'timeout': int(os.getenv('DB_POOL_TIMEOUT', 10)),
     }
+
+# Per-request DB time budgets in milliseconds, applied by
+# core.slow_queries.QueryBudgetMiddleware: DB_TIME_BUDGETS by path prefix,
+# DB_STATEMENT_TIMEOUT for other paths (0 disables either). Migrations and
+# management commands run without a statement_timeout.
+DB_STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', 30000))
+DB_TIME_BUDGETS = {
+    '/api/': int(os.getenv('DB_TIME_BUDGET_API', 5000)),
+    '/admin/': int(os.getenv('DB_TIME_BUDGET_ADMIN', 15000)),
 }
+# Queries slower than this are recorded with their plan (0 disables).
+SLOW_QUERY_MS = int(os.getenv('SLOW_QUERY_MS', 500))
+SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'True') == 'True'
+# Slow queries are explained and stored by a background thread; at most
+# SLOW_QUERY_QUEUE_SIZE requests' worth wait, the rest are dropped (0
+# records them on the request thread).
+SLOW_QUERY_QUEUE_SIZE = int(os.getenv('SLOW_QUERY_QUEUE_SIZE', 100))
+
+# Optional user sharding (core.sharding). USER_SHARDS lists the database
+# aliases users are spread over; extra shards default to the 'default'
+# server with the database name suffixed, overridable per shard with
+# DB_HOST_<ALIAS> / DB_NAME_<ALIAS>.
+USER_SHARDS = os.getenv('USER_SHARDS', 'default').split(',')
+# Upper bound on the shard count; user ids are interleaved with this stride.
+USER_SHARD_ID_STRIDE = int(os.getenv('USER_SHARD_ID_STRIDE', 64))
+
+for alias in USER_SHARDS:
+    if alias not in DATABASES:
+        DATABASES[alias] = {
+            **DATABASES['default'],
+            'HOST': os.getenv(f'DB_HOST_{alias.upper()}', DATABASES['default']['HOST']),
+            'NAME': os.getenv(f'DB_NAME_{alias.upper()}', f"{DATABASES['default']['NAME']}_{alias}"),
+        }
+
+DATABASE_ROUTERS = ['core.sharding.UserShardRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# CACHE_BACKEND is locmem, file, redis, memcached, database or a backend's
+# dotted path. Use a shared backend when running more than one worker
+# process, preferably redis or memcached: prod_settings falls back to
+# database, which core.checks warns about (core.W001).
+DEPLOY_ID = os.getenv('DEPLOY_ID', 'dev')
+
+CACHES = build_caches(
+    backend=os.getenv('CACHE_BACKEND', 'locmem'),
+    location=os.getenv('CACHE_LOCATION', ''),
+    deploy_id=DEPLOY_ID,
+    timeout=int(os.getenv('CACHE_TIMEOUT', 300)),
+)
+
+# Worker processes serving requests (gunicorn.conf.py reads the same
+# variable); system checks refuse process-local caches for more than one.
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
+
+# OpenAPI schema generated at image build time (see Dockerfile); served
+# instead of generating it when set and present.
+OPENAPI_SCHEMA_FILE = os.getenv('OPENAPI_SCHEMA_FILE', '')
 
 
 # Password validation
@@ -122,6 +239,20 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = os.getenv('STATIC_ROOT', BASE_DIR.parent / 'staticfiles')
+
+# Serve collected files from STATIC_ROOT in-process
+# (core.staticfiles.StaticFilesMiddleware). Hashed files are cached forever,
+# others for STATIC_MAX_AGE seconds.
+STATIC_SERVE = os.getenv('STATIC_SERVE', 'True') == 'True'
+STATIC_MAX_AGE = int(os.getenv('STATIC_MAX_AGE', 60))
+
+# Sampling profiler (core.profiling), toggled via /api/profiler/ or by
+# sending PROFILING_SIGNAL (e.g. SIGUSR2) to a worker, which then dumps its
+# samples to PROFILING_DIR when stopped.
+PROFILING_HZ = int(os.getenv('PROFILING_HZ', 49))
+PROFILING_SIGNAL = os.getenv('PROFILING_SIGNAL', '')
+PROFILING_DIR = os.getenv('PROFILING_DIR', '/tmp/profiles')
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -130,10 +261,17 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
 
+AUTHENTICATION_BACKENDS = [
+    'core.backends.CachedModelBackend',
+]
+
+# Seconds a resolved permission set stays cached (changes invalidate it).
+PERMISSIONS_CACHE_TIMEOUT = int(os.getenv('PERMISSIONS_CACHE_TIMEOUT', 3600))
+
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.JWTAuthentication',
     )
 }
 
@@ -142,13 +280,55 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=120),
-    'ROTATE_REFRESH_TOKENS': False,
+    'ROTATE_REFRESH_TOKENS': True,
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'VERIFYING_KEY': None,
     'USER_CREATE_PASSWORD_RETYPE ': True,
+    'TOKEN_OBTAIN_SERIALIZER': 'core.serializers.TokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'core.serializers.TokenRefreshSerializer',
 }
 
+# Seconds between bulk writes of buffered last_login timestamps.
+# Set to 0 to write through on every login.
+LAST_LOGIN_FLUSH_INTERVAL = int(os.getenv('LAST_LOGIN_FLUSH_INTERVAL', 60))
+
+# Audit trail (core.audit): authentication events are buffered and bulk
+# inserted every AUDIT_FLUSH_INTERVAL seconds (0 writes through) or once
+# AUDIT_BATCH_SIZE are waiting. At most AUDIT_BUFFER_SIZE events are held;
+# beyond that the oldest are dropped and counted.
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', 2))
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', 500))
+AUDIT_BUFFER_SIZE = int(os.getenv('AUDIT_BUFFER_SIZE', 10000))
+
+
+SPECTACULAR_SETTINGS = {
+    # Self-hosted Swagger UI assets instead of a CDN.
+    'SWAGGER_UI_DIST': 'SIDECAR',
+    'SWAGGER_UI_FAVICON_HREF': 'SIDECAR',
+    'REDOC_DIST': 'SIDECAR',
+}
+
+
+# Registration admission control (core.admission): at most
+# REGISTRATION_CONCURRENCY sign-ups run at once across all workers sharing
+# the default cache, and up to REGISTRATION_QUEUE_SIZE more per worker wait
+# REGISTRATION_QUEUE_TIMEOUT seconds for a slot. Beyond that clients get
+# 429, timed-out waits 503. 0 disables it.
+REGISTRATION_CONCURRENCY = int(os.getenv('REGISTRATION_CONCURRENCY', 0))
+REGISTRATION_QUEUE_SIZE = int(os.getenv('REGISTRATION_QUEUE_SIZE', 16))
+REGISTRATION_QUEUE_TIMEOUT = float(os.getenv('REGISTRATION_QUEUE_TIMEOUT', 2))
+REGISTRATION_RETRY_AFTER = int(os.getenv('REGISTRATION_RETRY_AFTER', 1))
+# Seconds after which a slot held by a killed worker is freed; keep it
+# above the longest request (GUNICORN_TIMEOUT).
+ADMISSION_LEASE = int(os.getenv('ADMISSION_LEASE', 60))
+
+# Seconds a response is replayed for a repeated Idempotency-Key.
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', 86400))
+
+
+EMAIL_BACKEND = os.getenv(
+    'EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
 
 DJOSER = {
     'LOGIN_FIELD': 'email',
@@ -157,6 +337,15 @@ DJOSER = {
     'PASSWORD_RESET_CONFIRM_URL': 'auth/users/reset_password_confirm/{uid}/{token}',
     'SERIALIZERS': {
         'user': 'core.serializers.CustomUserSerializer',
+        'user_create': 'core.serializers.UserCreateSerializer',
+        'activation': 'core.serializers.ActivationSerializer',
+        'password_reset': 'core.serializers.ShardEmailResetSerializer',
+        'password_reset_confirm': 'core.serializers.PasswordResetConfirmSerializer',
+        'password_reset_confirm_retype': 'core.serializers.PasswordResetConfirmRetypeSerializer',
+    },
+    'EMAIL': {
+        'activation': 'core.email.ActivationEmail',
+        'password_reset': 'core.email.PasswordResetEmail',
     },
     'TOKEN_MODEL': None,    # Necessary for JWT
 }
@@ -0,0 +1,49 @@
+"""
+Cache configuration shared by the settings modules.
+
+Every alias goes through core.caching.InstrumentedCache for hit/miss
+stats. 'default' holds state shared across deploys (used tokens,
+idempotency keys, permissions); 'deploy' is for values derived from the
+code, such as the API schema, and its keys change with DEPLOY_ID; 'local'
+is always in-process memory. 'default' must be shared by every worker
+(see core.checks.check_shared_cache); 'database' needs its table, made
+by `manage.py createcachetable` (run by migrate_shards).
+"""
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    'database': 'django.core.cache.backends.db.DatabaseCache',
+}
+
+DEFAULT_LOCATIONS = {
+    'locmem': 'shared',
+    'file': '/tmp/django_cache',
+    'database': 'core_cache',
+}
+
+
+def build_caches(backend='locmem', location='', deploy_id='dev',
+                 timeout=300):
+    """
+    Return a CACHES dict for `backend`: one of BACKENDS, or the dotted
+    path of any Django cache backend.
+    """
+    location = location or DEFAULT_LOCATIONS.get(backend, '')
+
+    def alias(backend, location, key_prefix):
+        return {
+            'BACKEND': 'core.caching.InstrumentedCache',
+            'LOCATION': location,
+            'KEY_PREFIX': key_prefix,
+            'TIMEOUT': timeout,
+            'OPTIONS': {'BACKEND': BACKENDS.get(backend, backend)},
+        }
+
+    return {
+        'default': alias(backend, location, 'drf'),
+        'deploy': alias(backend, location, f'drf:{deploy_id}'),
+        'local': alias('locmem', 'local', 'drf'),
+    }
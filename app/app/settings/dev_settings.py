@@ -1,5 +1,6 @@
 import os
 from .base_settings import *
+from .logging_config import build_logging
 
 DEBUG = True
 
@@ -10,16 +11,10 @@ ALLOWED_HOSTS = ['*']
 
 LOGGING_LEVEL = os.getenv('LOGGING_LEVEL_DEV', 'DEBUG')
 
-LOGGING = {
-    'version': 1,
-    'disable_existing_loggers': False,
-    'handlers': {
-        'console': {
-            'class': 'logging.StreamHandler',
-        },
+LOGGING = build_logging(
+    LOGGING_LEVEL,
+    json_format=os.getenv('LOG_JSON', 'False') == 'True',
+    sample_rates={
+        'django.db.backends': float(os.getenv('LOG_SQL_SAMPLE_RATE', 1)),
     },
-    'root': {
-        'handlers': ['console'],
-        'level': LOGGING_LEVEL,
-    },
-}
+)
@@ -0,0 +1,46 @@
+"""
+Logging configuration shared by the settings modules.
+
+Records are filtered and tagged on the calling thread, then handed to a
+queue; a listener thread does the formatting and the stream I/O.
+"""
+
+
+def build_logging(level, json_format=False, sample_rates=None):
+    """Return a LOGGING dict for the given root level."""
+    formatter = 'json' if json_format else 'plain'
+    return {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'filters': {
+            'request_id': {
+                '()': 'app.log.RequestIdFilter',
+            },
+            'sampling': {
+                '()': 'app.log.SamplingFilter',
+                'rates': sample_rates or {},
+            },
+        },
+        'formatters': {
+            'plain': {
+                'format': '%(asctime)s %(levelname)s %(name)s '
+                          '[%(request_id)s] %(message)s',
+            },
+            'json': {
+                '()': 'app.log.JsonFormatter',
+            },
+        },
+        'handlers': {
+            # Formatters are configured before any handler, so this
+            # reference always resolves to the formatter instance.
+            'queue': {
+                '()': 'app.log.console_queue_handler',
+                'target_formatter': f'cfg://formatters.{formatter}',
+                'filters': ['request_id', 'sampling'],
+            },
+        },
+        'root': {
+            'handlers': ['queue'],
+            'level': level,
+        },
+    }
@@ -1,23 +1,39 @@
 import os
 from .base_settings import *
+from .logging_config import build_logging
 
 DEBUG = False
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.getenv('ALLOWED_HOSTS', '').split(',') if host]
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'core.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Same default as gunicorn.conf.py.
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 2))
+
+# Workers share used tokens, idempotency keys, permission versions and
+# admission slots, so the default cache can't be per process.
+CACHES = build_caches(
+    backend=os.getenv('CACHE_BACKEND', 'database'),
+    location=os.getenv('CACHE_LOCATION', ''),
+    deploy_id=DEPLOY_ID,
+    timeout=int(os.getenv('CACHE_TIMEOUT', 300)),
+)
 
 LOGGING_LEVEL = os.getenv('LOGGING_LEVEL_PROD', 'WARNING')
 
 # modify to suit your needs:
-LOGGING = {
-    'version': 1,
-    'disable_existing_loggers': False,
-    'handlers': {
-        'console': {
-            'class': 'logging.StreamHandler',
-        },
+LOGGING = build_logging(
+    LOGGING_LEVEL,
+    json_format=os.getenv('LOG_JSON', 'True') == 'True',
+    sample_rates={
+        'django.db.backends': float(os.getenv('LOG_SQL_SAMPLE_RATE', 1)),
     },
-    'root': {
-        'handlers': ['console'],
-        'level': LOGGING_LEVEL,
-    },
-}
+)
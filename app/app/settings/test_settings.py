@@ -0,0 +1,28 @@
+import os
+from .dev_settings import *
+
+# Password hashing dominates the suite's runtime; tests don't need PBKDF2.
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+]
+
+TEST_RUNNER = 'core.tests.runner.TimedTestRunner'
+
+# Defaults for the runner; `--parallel N` and `--keepdb` still override.
+TEST_PARALLEL = os.getenv('TEST_PARALLEL', 'auto')
+TEST_KEEPDB = os.getenv('TEST_KEEPDB', 'True') == 'True'
+
+LOGGING_LEVEL = os.getenv('LOGGING_LEVEL_TEST', 'WARNING')
+LOGGING['root']['level'] = LOGGING_LEVEL
+
+# Write last_login, audit events and slow queries through so no buffered
+# writes outlive the test database.
+LAST_LOGIN_FLUSH_INTERVAL = 0
+AUDIT_FLUSH_INTERVAL = 0
+SLOW_QUERY_QUEUE_SIZE = 0
+
+# Second database for the sharding tests; USER_SHARDS itself is left alone.
+DATABASES['shard_1'] = {
+    **DATABASES['default'],
+    'NAME': f"{DATABASES['default']['NAME']}_shard_1",
+}
@@ -17,20 +17,34 @@ Including another URLconf
 from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from drf_spectacular.views import SpectacularSwaggerView
 
 from app.views import FakeProtectedView
+from core.views import (
+    AuditEventListView, AuditStatsView, CachedSpectacularAPIView,
+    CacheStatsView, ProfilerView, UserChangeListView, healthz, readyz,
+)
 
 urlpatterns = [
+    path('healthz', healthz, name='healthz'),
+    path('readyz', readyz, name='readyz'),
     path(settings.ADMIN_URL, admin.site.urls),
-    path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
+    path('api/schema/', CachedSpectacularAPIView.as_view(),
+         name='api-schema'),
     path(
         'api/docs/',
         SpectacularSwaggerView.as_view(url_name='api-schema'),
         name='swagger-ui'
     ),
-    path('api/auth/', include(('djoser.urls', 'auth'), namespace='auth')),
+    path('api/auth/', include(('core.urls', 'auth'), namespace='auth')),
     path('api/auth/', include('djoser.urls.jwt')),
+    path('api/users/changes/', UserChangeListView.as_view(),
+         name='user-changes'),
+    path('api/audit/events/', AuditEventListView.as_view(),
+         name='audit-events'),
+    path('api/audit/stats/', AuditStatsView.as_view(), name='audit-stats'),
+    path('api/profiler/', ProfilerView.as_view(), name='profiler'),
+    path('api/cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
     path('fake_protected/', FakeProtectedView.as_view(),
          name='fake_protected'),  # for testing
 ]
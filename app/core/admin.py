@@ -4,13 +4,47 @@ Django Admin customization
 
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as DefaultUserAdmin
+from django.core.exceptions import ValidationError
 
-from core import models
+from core import models, sharding
+from core.bulk import set_user_flags
+
+
+def flag_action(description, **flags):
+    """Build an admin action applying `flags` with chunked UPDATEs."""
+    def apply_flags(modeladmin, request, queryset):
+        updated = set_user_flags(queryset, flags)
+        modeladmin.message_user(request, f'{description}: {updated} users.')
+    apply_flags.short_description = description
+    apply_flags.__name__ = 'set_' + '_'.join(
+        f'{name}_{value}'.lower() for name, value in flags.items())
+    return apply_flags
+
+
+class ShardFilter(admin.SimpleListFilter):
+    """List the users of one shard; 'default' unless one is picked."""
+
+    title = 'shard'
+    parameter_name = 'shard'
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in sharding.get_shards()]
+
+    def queryset(self, request, queryset):
+        if sharding.is_shard(self.value()):
+            return queryset.using(self.value())
+        return queryset
 
 
 class UserAdmin(DefaultUserAdmin):
     ordering = ["id"]
     list_display = ["email", "name"]
+    actions = [
+        flag_action("Activate selected users", is_active=True),
+        flag_action("Deactivate selected users", is_active=False),
+        flag_action("Grant staff status", is_staff=True),
+        flag_action("Revoke staff status", is_staff=False),
+    ]
     fieldsets = (
         (None, {"fields": ("email", "password")}),
         ("Personal Info", {"fields": ("name",)}),
@@ -50,5 +84,28 @@ class UserAdmin(DefaultUserAdmin):
         ),
     )
 
+    def get_list_filter(self, request):
+        list_filter = super().get_list_filter(request)
+        if sharding.is_sharded():
+            list_filter = (ShardFilter, *list_filter)
+        return list_filter
+
+    def get_object(self, request, object_id, from_field=None):
+        """Find the user on whichever shard holds it; ids never collide."""
+        queryset = self.get_queryset(request)
+        model = queryset.model
+        field = (model._meta.pk if from_field is None
+                 else model._meta.get_field(from_field))
+        try:
+            object_id = field.to_python(object_id)
+        except (ValidationError, ValueError):
+            return None
+        for alias in sharding.get_shards():
+            try:
+                return queryset.using(alias).get(**{field.name: object_id})
+            except model.DoesNotExist:
+                continue
+        return None
+
 
 admin.site.register(models.User, UserAdmin)
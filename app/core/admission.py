@@ -0,0 +1,122 @@
+"""
+Admission control for expensive endpoints.
+
+An `AdmissionController` lets at most `limit` requests run a code path at
+once across every worker sharing the default cache. Up to `queue_size`
+more per process wait up to `timeout` seconds for a slot; anything beyond
+that is turned away with 429, and waits that time out get 503. Both carry
+Retry-After, so overload degrades into fast rejections instead of piling
+up behind the database.
+
+Slots are leases in the default cache: taking one is an atomic
+`cache.add` on one of `limit` keys, and a lease left by a killed worker
+expires after `lease` seconds.
+"""
+
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions, status
+
+
+class ServiceUnavailable(exceptions.APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Service temporarily overloaded, try again later.')
+    default_code = 'service_unavailable'
+
+    def __init__(self, wait=None, detail=None, code=None):
+        super().__init__(detail, code)
+        # Picked up by DRF's exception handler as Retry-After.
+        self.wait = wait
+
+
+class AdmissionController:
+    """Bound the concurrency of a code path, with a short wait queue."""
+
+    # Seconds between attempts to take a slot while queued.
+    poll_interval = 0.05
+
+    def __init__(self, name, limit, queue_size=0, timeout=0, retry_after=1,
+                 lease=60):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.lease = lease
+        self._lock = threading.Lock()
+        self._waiting = 0
+
+    @classmethod
+    def from_settings(cls, prefix):
+        return cls(
+            prefix.lower(),
+            limit=getattr(settings, f'{prefix}_CONCURRENCY'),
+            queue_size=getattr(settings, f'{prefix}_QUEUE_SIZE'),
+            timeout=getattr(settings, f'{prefix}_QUEUE_TIMEOUT'),
+            retry_after=getattr(settings, f'{prefix}_RETRY_AFTER'),
+            lease=getattr(settings, 'ADMISSION_LEASE', 60),
+        )
+
+    @property
+    def waiting(self):
+        return self._waiting
+
+    def _slot_key(self, index):
+        return f'admission:{self.name}:{index}'
+
+    def _acquire(self, owner):
+        """Take a free slot; return its key, or None if all are taken."""
+        start = random.randrange(self.limit)
+        for offset in range(self.limit):
+            key = self._slot_key((start + offset) % self.limit)
+            if cache.add(key, owner, timeout=self.lease):
+                return key
+        return None
+
+    def _release(self, key, owner):
+        # Leave the slot alone if the lease expired and was taken over.
+        if cache.get(key) == owner:
+            cache.delete(key)
+
+    def _wait(self, owner):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(self.poll_interval, remaining))
+            key = self._acquire(owner)
+            if key is not None:
+                return key
+
+    @contextmanager
+    def admit(self):
+        """Run the block once a slot is free; raise 429/503 otherwise."""
+        if self.limit <= 0:
+            yield
+            return
+        owner = uuid.uuid4().hex
+        key = self._acquire(owner)
+        if key is None:
+            with self._lock:
+                if self._waiting >= self.queue_size:
+                    raise exceptions.Throttled(wait=self.retry_after)
+                self._waiting += 1
+            try:
+                key = self._wait(owner)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if key is None:
+                raise ServiceUnavailable(wait=self.retry_after)
+        try:
+            yield
+        finally:
+            self._release(key, owner)
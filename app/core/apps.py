@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.contrib.auth.signals import user_logged_in
+
+        from core import checks, schema, signals  # noqa: F401
+        from core.last_login import record_login
+        from core.profiling import install_signal_handler
+
+        # Replace the per-login UPDATE with the coalescing buffer.
+        user_logged_in.disconnect(dispatch_uid='update_last_login')
+        user_logged_in.connect(record_login, dispatch_uid='update_last_login')
+
+        install_signal_handler()
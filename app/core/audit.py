@@ -0,0 +1,263 @@
+"""
+Audit trail of authentication events.
+
+Recording an event only touches memory: events go to a bounded ring
+buffer that a background thread writes to `AuditEvent` in bulk INSERTs,
+every `AUDIT_FLUSH_INTERVAL` seconds or as soon as `AUDIT_BATCH_SIZE`
+events are waiting, and once more when the process exits. The buffer
+holds at most `AUDIT_BUFFER_SIZE` events; when writes fall behind, the
+oldest are overwritten and counted as dropped.
+
+On PostgreSQL the table is partitioned by month (see
+`core.operations.CreatePartitionedModel`); `ensure_partitions` and
+`drop_partitions` are run by the audit_partitions command.
+"""
+
+import atexit
+import datetime
+import logging
+import os
+import re
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import (
+    DEFAULT_DB_ALIAS, DatabaseError, close_old_connections, connections,
+    transaction,
+)
+from django.utils import timezone
+
+from app.log import request_id_var
+from core.models import AuditEvent
+
+logger = logging.getLogger(__name__)
+
+
+def client_ip(request):
+    if request is None:
+        return None
+    return request.META.get('REMOTE_ADDR') or None
+
+
+class AuditSink:
+    """Ring buffer of audit events flushed in bulk by a daemon thread."""
+
+    def __init__(self):
+        self._events = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.recorded = self.written = self.dropped = self.failed = 0
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'AUDIT_FLUSH_INTERVAL', 2)
+
+    @property
+    def batch_size(self):
+        return getattr(settings, 'AUDIT_BATCH_SIZE', 500)
+
+    @property
+    def buffer_size(self):
+        return getattr(settings, 'AUDIT_BUFFER_SIZE', 10000)
+
+    def record(self, event, user_id=None, identifier='', request=None):
+        """Buffer an event; written to the database later, in bulk."""
+        entry = AuditEvent(
+            event=event, user_id=user_id, identifier=identifier[:255],
+            ip_address=client_ip(request),
+            request_id=request_id_var.get() or '',
+        )
+        with self._lock:
+            if len(self._events) >= self.buffer_size:
+                self._events.popleft()
+                self.dropped += 1
+            self._events.append(entry)
+            self.recorded += 1
+            pending = len(self._events)
+        if self.flush_interval <= 0:
+            self.flush()
+            return
+        self._ensure_thread()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write buffered events in batches; return how many were written."""
+        written = 0
+        while True:
+            with self._lock:
+                size = min(self.batch_size, len(self._events))
+                batch = [self._events.popleft() for _ in range(size)]
+            if not batch:
+                return written
+            try:
+                AuditEvent.objects.using(DEFAULT_DB_ALIAS).bulk_create(batch)
+            except DatabaseError:
+                logger.exception('Writing %d audit events failed', len(batch))
+                self._requeue(batch)
+                return written
+            written += len(batch)
+            with self._lock:
+                self.written += len(batch)
+
+    def _requeue(self, batch):
+        """Put a failed batch back in front, dropping what no longer fits."""
+        with self._lock:
+            self.failed += 1
+            room = max(self.buffer_size - len(self._events), 0)
+            kept = batch[max(len(batch) - room, 0):] if room else []
+            self.dropped += len(batch) - len(kept)
+            self._events.extendleft(reversed(kept))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'recorded': self.recorded,
+                'written': self.written,
+                'dropped': self.dropped,
+                'failed_flushes': self.failed,
+                'pending': len(self._events),
+            }
+
+    def _ensure_thread(self):
+        # A forked worker inherits the object but not the thread.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name='audit-sink', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Audit flush failed')
+            finally:
+                close_old_connections()
+
+
+sink = AuditSink()
+atexit.register(sink.flush)
+
+
+def record(event, user_id=None, identifier='', request=None):
+    """Record an authentication event through the shared sink."""
+    sink.record(event, user_id, identifier, request)
+
+
+def events(start=None, end=None, event=None, user_id=None):
+    """
+    Return audit events, optionally within [start, end) and for one event
+    type or user. Bounding the time range limits the partitions read.
+    """
+    queryset = AuditEvent.objects.using(DEFAULT_DB_ALIAS)
+    if start is not None:
+        queryset = queryset.filter(occurred_at__gte=start)
+    if end is not None:
+        queryset = queryset.filter(occurred_at__lt=end)
+    if event is not None:
+        queryset = queryset.filter(event=event)
+    if user_id is not None:
+        queryset = queryset.filter(user_id=user_id)
+    return queryset
+
+
+def month_start(day, offset=0):
+    """First instant (UTC) of the month `offset` months after `day`."""
+    month = day.year * 12 + day.month - 1 + offset
+    return datetime.datetime(
+        month // 12, month % 12 + 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def partition_name(month):
+    return f'{AuditEvent._meta.db_table}_p{month:%Y%m}'
+
+
+def partitions(using=DEFAULT_DB_ALIAS):
+    """Return {month: table name} of the existing monthly partitions."""
+    table = AuditEvent._meta.db_table
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE parent.relname = %s', [table])
+        names = [row[0] for row in cursor.fetchall()]
+    pattern = re.compile(rf'^{table}_p(\d{{4}})(\d{{2}})$')
+    found = {}
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            month = datetime.datetime(
+                int(match[1]), int(match[2]), 1, tzinfo=datetime.timezone.utc)
+            found[month] = name
+    return found
+
+
+def ensure_partitions(months_ahead=3, now=None, using=DEFAULT_DB_ALIAS):
+    """
+    Create the partitions from the current month to `months_ahead` months
+    ahead; return the names of those created.
+
+    Rows that already landed in the DEFAULT partition for a new month are
+    moved into it, so creating a partition late never fails.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    table = AuditEvent._meta.db_table
+    now = now or timezone.now()
+    existing = partitions(using)
+    created = []
+    for offset in range(months_ahead + 1):
+        month = month_start(now, offset)
+        if month in existing:
+            continue
+        name = partition_name(month)
+        bounds = [month, month_start(month, 1)]
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE {quote(name)} (LIKE {quote(table)})')
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM {quote(table + "_default")} '
+                f'WHERE occurred_at >= %s AND occurred_at < %s RETURNING *) '
+                f'INSERT INTO {quote(name)} SELECT * FROM moved', bounds)
+            cursor.execute(
+                f'ALTER TABLE {quote(table)} ATTACH PARTITION {quote(name)} '
+                f'FOR VALUES FROM (%s) TO (%s)', bounds)
+        created.append(name)
+    return created
+
+
+def drop_partitions(retain_months, now=None, using=DEFAULT_DB_ALIAS):
+    """
+    Drop the partitions older than `retain_months` full months, and the
+    DEFAULT partition's rows of that age; return the dropped names.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    table = AuditEvent._meta.db_table
+    cutoff = month_start(now or timezone.now(), -retain_months)
+    dropped = []
+    for month, name in sorted(partitions(using).items()):
+        if month >= cutoff:
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}')
+            cursor.execute(f'DROP TABLE {quote(name)}')
+        dropped.append(name)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(table + "_default")} '
+            f'WHERE occurred_at < %s', [cutoff])
+    return dropped
@@ -0,0 +1,123 @@
+"""
+Authentication classes for the API.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import authentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed, InvalidToken,
+)
+from rest_framework_simplejwt.settings import api_settings
+
+from core import sharding
+
+# Claim carrying the user's token_version when the token was issued.
+VERSION_CLAIM = 'ver'
+
+
+class Principal:
+    """
+    Compact stand-in for the authenticated user on API requests.
+
+    Carries the fields permission checks need; any other attribute or
+    method loads the full user (once) and is delegated to it.
+    """
+
+    FIELDS = (
+        'id', 'email', 'is_active', 'is_staff', 'is_superuser',
+        'token_version',
+    )
+    __slots__ = FIELDS + ('_db', '_user')
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, id, email, is_active, is_staff, is_superuser,
+                 token_version=0, using=DEFAULT_DB_ALIAS):
+        values = zip(self.FIELDS, (id, email, is_active, is_staff,
+                                   is_superuser, token_version))
+        for name, value in values:
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, '_db', using)
+        object.__setattr__(self, '_user', None)
+
+    @property
+    def pk(self):
+        return self.id
+
+    def unwrap(self):
+        """Return the full user model instance, loading it on first use."""
+        if self._user is None:
+            manager = get_user_model()._default_manager.db_manager(self._db)
+            object.__setattr__(self, '_user', manager.get(pk=self.id))
+        return self._user
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.unwrap(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.unwrap(), name, value)
+        if name in self.FIELDS:
+            object.__setattr__(self, name, value)
+
+    def __eq__(self, other):
+        if isinstance(other, Principal):
+            return self.id == other.id
+        if isinstance(other, get_user_model()):
+            return self.id == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __str__(self):
+        return self.email
+
+    def __repr__(self):
+        return f'<Principal: {self.email}>'
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+    """JWT authentication reading the user from the shard in the token.
+
+    Returns a `Principal` built from a single row instead of a model
+    instance.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification'))
+        # Tokens issued before sharding was enabled carry no claim.
+        alias = validated_token.get(sharding.SHARD_CLAIM, DEFAULT_DB_ALIAS)
+        user = None
+        if sharding.is_shard(alias):
+            user = self.get_user_from(alias, validated_token)
+        if user is None:
+            raise AuthenticationFailed(
+                _('User not found'), code='user_not_found')
+        return user
+
+    def get_user_from(self, alias, validated_token):
+        """Return the active user from `alias`, or None if it isn't there."""
+        manager = self.user_model._default_manager.db_manager(alias)
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        try:
+            row = manager.values_list(*Principal.FIELDS).get(
+                **{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            return None
+        user = Principal(*row, using=alias)
+        if not user.is_active:
+            raise AuthenticationFailed(
+                _('User is inactive'), code='user_inactive')
+        # Checked against the row read above, so a password change
+        # revokes older tokens on every node without another query.
+        if validated_token.get(VERSION_CLAIM, 0) != user.token_version:
+            raise AuthenticationFailed(
+                _('Token has been revoked'), code='token_revoked')
+        return user
@@ -0,0 +1,61 @@
+"""
+Authentication backends for the core app.
+"""
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+PERMISSIONS_VERSION_KEY = 'perms:version'
+
+
+def get_permissions_version():
+    """Return the global permissions version, creating it if needed."""
+    version = cache.get(PERMISSIONS_VERSION_KEY)
+    if version is None:
+        cache.add(PERMISSIONS_VERSION_KEY, 1, timeout=None)
+        version = cache.get(PERMISSIONS_VERSION_KEY, 1)
+    return version
+
+
+def bump_permissions_version():
+    """Invalidate every cached permission set at once."""
+    try:
+        cache.incr(PERMISSIONS_VERSION_KEY)
+    except ValueError:
+        cache.add(PERMISSIONS_VERSION_KEY, 2, timeout=None)
+
+
+def permissions_cache_key(user_id, version=None):
+    if version is None:
+        version = get_permissions_version()
+    return f'perms:{version}:{user_id}'
+
+
+def invalidate_user_permissions(user_ids):
+    """Drop the cached permission sets of the given users."""
+    version = get_permissions_version()
+    cache.delete_many(
+        [permissions_cache_key(user_id, version) for user_id in user_ids]
+    )
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend sharing resolved permissions across requests.
+
+    The set of permission names of an active user is computed once and
+    stored as a frozenset in the cache, keyed by user id and the global
+    permissions version.
+    """
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, '_perm_cache'):
+            key = permissions_cache_key(user_obj.pk)
+            perms = cache.get(key)
+            if perms is None:
+                perms = frozenset(super().get_all_permissions(user_obj))
+                cache.set(key, perms, settings.PERMISSIONS_CACHE_TIMEOUT)
+            user_obj._perm_cache = perms
+        return user_obj._perm_cache
@@ -0,0 +1,273 @@
+"""
+Benchmark scenarios run by the `benchmark` management command.
+
+Each scenario takes an iteration count and returns a list of result rows
+(dicts sharing the same keys), printed as a table by the command.
+"""
+
+import gc
+import json
+import logging
+import platform
+import threading
+import statistics
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.core.handlers.base import BaseHandler
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt import authentication as jwt_authentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from app.log import queue_handler
+from core.authentication import JWTAuthentication
+from core.profiling import profiler
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    """Register a benchmark scenario under `name`."""
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+def measure(func, iterations):
+    """Call `func` repeatedly and return the durations in milliseconds."""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples):
+    """Return mean, median and p99 of millisecond samples."""
+    ordered = sorted(samples)
+    return {
+        'mean_ms': round(statistics.fmean(ordered), 3),
+        'p50_ms': round(ordered[len(ordered) // 2], 3),
+        'p99_ms': round(ordered[int(len(ordered) * 0.99) - 1], 3),
+    }
+
+
+def format_table(rows):
+    """Return the lines of a left-aligned table of same-keyed row dicts."""
+    columns = list(rows[0])
+    widths = [
+        max(len(str(col)), *(len(str(row[col])) for row in rows))
+        for col in columns
+    ]
+    return ['  '.join(
+        str(value).ljust(width) for value, width in zip(values, widths))
+        for values in [columns] + [[row[col] for col in columns]
+                                   for row in rows]]
+
+
+class SlowStream:
+    """Stream simulating a slow log sink (pipe, network, busy disk)."""
+
+    def write(self, data):
+        time.sleep(0.0001)
+
+    def flush(self):
+        pass
+
+
+@scenario('logging')
+def logging_latency(iterations):
+    """Request latency while emitting logs to a slow sink."""
+    rows = []
+    for volume in (0, 10, 100):
+        for mode in ('sync', 'queued'):
+            target = logging.StreamHandler(SlowStream())
+            handler = target
+            if mode == 'queued':
+                handler = queue_handler(target, queue_size=0)
+            logger = logging.getLogger(f'benchmark.logging.{mode}')
+            logger.propagate = False
+            logger.setLevel(logging.DEBUG)
+            logger.handlers = [handler]
+
+            def request():
+                for i in range(volume):
+                    logger.debug('SELECT %s FROM core_user', i)
+
+            samples = measure(request, iterations)
+            handler.close()
+            rows.append({'mode': mode, 'records': volume,
+                         **summarize(samples)})
+    return rows
+
+
+@scenario('principal')
+def principal_memory(iterations):
+    """Memory and GC cost of the authenticated user object per request."""
+    rows = []
+    with transaction.atomic():
+        user = get_user_model().objects.create_superuser(
+            'benchmark@example.com', None)
+        token = AccessToken.for_user(user)
+        modes = {
+            'model': jwt_authentication.JWTAuthentication(),
+            'principal': JWTAuthentication(),
+        }
+        for mode, authenticator in modes.items():
+            # Keep every result alive, as overlapping requests would.
+            kept = []
+
+            def request():
+                kept.append(authenticator.get_user(token))
+
+            gc.collect()
+            collections = gc.get_stats()[0]['collections']
+            samples = measure(request, iterations)
+            gcs = gc.get_stats()[0]['collections'] - collections
+            # Measure memory separately; tracing skews the timings.
+            kept.clear()
+            tracemalloc.start()
+            for _ in range(iterations):
+                request()
+            retained, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            rows.append({
+                'mode': mode,
+                'bytes_per_user': retained // iterations,
+                'gen0_gcs': gcs,
+                **summarize(samples),
+            })
+        transaction.set_rollback(True)
+    return rows
+
+
+@scenario('middleware')
+def middleware_overhead(iterations):
+    """Per-request cost of the full middleware stack vs path dispatch."""
+    dispatcher = 'app.middleware.PathDispatchMiddleware'
+    outer = [path for path in settings.MIDDLEWARE if path != dispatcher]
+    stacks = {
+        'full': outer + settings.SITE_MIDDLEWARE,
+        'dispatch': settings.MIDDLEWARE,
+    }
+    handlers = {}
+    for mode, middleware in stacks.items():
+        with override_settings(MIDDLEWARE=middleware):
+            handlers[mode] = BaseHandler()
+            handlers[mode].load_middleware()
+
+    factory = RequestFactory()
+    url = reverse('fake_protected')
+    samples = {mode: [] for mode in stacks}
+    with transaction.atomic(), \
+            override_settings(ALLOWED_HOSTS=['testserver']):
+        user = get_user_model().objects.create_superuser(
+            'benchmark@example.com', None)
+        headers = {
+            'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}',
+            # A browser that also uses the admin sends its cookies.
+            'HTTP_COOKIE': 'sessionid=abc; csrftoken=def',
+        }
+        # Alternate the stacks so drift affects both equally.
+        for _ in range(iterations):
+            for mode, handler in handlers.items():
+                request = factory.get(url, **headers)
+                samples[mode] += measure(
+                    lambda: handler.get_response(request), 1)
+        transaction.set_rollback(True)
+    return [{'mode': mode, **summarize(samples[mode])} for mode in stacks]
+
+
+@scenario('profiler')
+def profiler_overhead(iterations):
+    """Request latency with the sampling profiler off and on."""
+    payload = {'users': [{'id': i, 'email': f'user{i}@example.com'}
+                         for i in range(200)]}
+
+    def request():
+        for _ in range(10):
+            json.loads(json.dumps(payload))
+
+    ident = threading.get_ident()
+    measure(request, iterations // 10 + 1)  # warm up
+    samples = {'off': [], 'on': []}
+    # Alternate short blocks so drift affects both modes equally.
+    for _ in range(10):
+        samples['off'] += measure(request, iterations // 10 + 1)
+        profiler.labels[ident] = 'benchmark'
+        profiler.start()
+        try:
+            samples['on'] += measure(request, iterations // 10 + 1)
+        finally:
+            profiler.stop()
+            profiler.labels.pop(ident, None)
+    taken = sum(profiler.snapshot().values())
+    # Wall-clock differences are noisy; also price one sample directly.
+    profiler.labels[ident] = 'benchmark'
+    cost_ms = summarize(measure(profiler.sample, iterations))['mean_ms']
+    profiler.labels.pop(ident, None)
+    profiler.reset()
+    off, on = summarize(samples['off']), summarize(samples['on'])
+    overhead = (on['mean_ms'] - off['mean_ms']) / off['mean_ms'] * 100
+    return [
+        {'profiler': 'off', **off, 'samples': 0, 'overhead_pct': 0.0,
+         'sampler_cpu_pct': 0.0},
+        {'profiler': f'on ({profiler.hz} Hz)', **on, 'samples': taken,
+         'overhead_pct': round(overhead, 2),
+         'sampler_cpu_pct': round(cost_ms * profiler.hz / 10, 3)},
+    ]
+
+
+def stack_description():
+    """Describe the interpreter, Django version and database driver."""
+    driver = connection.Database
+    name = driver.__name__.split('.')[0]
+    version = getattr(driver, '__version__', None) or getattr(
+        driver, 'sqlite_version', '')
+    return f'Python {platform.python_version()}, Django ' \
+           f'{django.get_version()}, {name} {version.split()[0]}'
+
+
+@scenario('throughput')
+def request_throughput(iterations):
+    """Requests per second through the full stack, by endpoint."""
+    handler = BaseHandler()
+    handler.load_middleware()
+    factory = RequestFactory()
+    stack = stack_description()
+    rows = []
+    with transaction.atomic(), \
+            override_settings(ALLOWED_HOSTS=['testserver']):
+        user = get_user_model().objects.create_superuser(
+            'benchmark@example.com', None)
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'}
+        endpoints = {
+            'healthz': (reverse('healthz'), {}),
+            'users/me': (reverse('auth:user-me'), auth),
+            'user changes': (reverse('user-changes'), auth),
+            'schema': (reverse('api-schema') + '?format=json', {}),
+        }
+        for name, (url, headers) in endpoints.items():
+            def request():
+                response = handler.get_response(factory.get(url, **headers))
+                if response.status_code != 200:
+                    raise RuntimeError(
+                        f'{url} returned {response.status_code}')
+
+            measure(request, iterations // 10 + 1)  # warm up
+            samples = measure(request, iterations)
+            rows.append({
+                'stack': stack,
+                'endpoint': name,
+                'req_per_s': round(len(samples) * 1000 / sum(samples)),
+                **summarize(samples),
+            })
+        transaction.set_rollback(True)
+    return rows
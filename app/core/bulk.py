@@ -0,0 +1,51 @@
+"""
+Set-based bulk updates of user flags.
+"""
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from core import changes
+from core.backends import invalidate_user_permissions
+from core.models import UserChange
+from core.signals import users_bulk_updated
+
+BULK_FLAGS = {'is_active', 'is_staff'}
+
+
+def set_user_flags(queryset, flags, chunk_size=1000, progress=None):
+    """Apply `flags` to every user in `queryset` with chunked UPDATEs.
+
+    Model `save()` and per-row signals are bypassed. Each chunk is one
+    UPDATE and one change feed INSERT in a transaction, followed by one
+    cache invalidation and one `users_bulk_updated` signal. `progress`, if
+    given, is called with the running total after each chunk. Returns the
+    number of updated users.
+    """
+    unknown = set(flags) - BULK_FLAGS
+    if unknown:
+        raise ValueError(f'Unsupported flags: {", ".join(sorted(unknown))}')
+    if flags.get('is_active'):
+        # Users pending deletion must stay locked out.
+        queryset = queryset.filter(deleted_at__isnull=True)
+    User = queryset.model
+    # The queryset's shard, e.g. from the admin's shard filter.
+    using = queryset.db
+    users = User._base_manager.using(using)
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    last_pk = None
+    total = 0
+    while True:
+        page = pks if last_pk is None else pks.filter(pk__gt=last_pk)
+        chunk = list(page[:chunk_size])
+        if not chunk:
+            return total
+        # The change feed lives on 'default', which may be another database.
+        with transaction.atomic(using=using), \
+                transaction.atomic(using=DEFAULT_DB_ALIAS, savepoint=False):
+            total += users.filter(pk__in=chunk).update(**flags)
+            changes.record_changes(chunk, UserChange.UPDATED)
+        invalidate_user_permissions(chunk)
+        users_bulk_updated.send(sender=User, user_ids=chunk, flags=flags)
+        last_pk = chunk[-1]
+        if progress is not None:
+            progress(total)
@@ -0,0 +1,216 @@
+"""
+Caching helpers: an instrumented backend wrapper, stampede-safe
+recomputation and warmers for hot keys.
+"""
+
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils import translation
+from django.utils.module_loading import import_string
+
+MISSING = object()
+
+# Name -> function filling a hot key, run by `warm_cache`.
+WARMERS = {}
+
+
+class InstrumentedCache(BaseCache):
+    """
+    Cache backend wrapping another one and counting hits and misses.
+
+    The wrapped backend is named by OPTIONS['BACKEND']; every other
+    setting (LOCATION, KEY_PREFIX, TIMEOUT, remaining OPTIONS) is passed
+    through to it. Counters are per process.
+    """
+
+    def __init__(self, location, params):
+        options = dict(params.get('OPTIONS', {}))
+        backend = import_string(options.pop('BACKEND'))
+        super().__init__(params)
+        self.backend = backend(location, {**params, 'OPTIONS': options})
+        self.stats = Counter()
+        self._lock = threading.Lock()
+
+    def count(self, **events):
+        with self._lock:
+            self.stats.update(events)
+
+    def get(self, key, default=None, version=None):
+        value = self.backend.get(key, MISSING, version=version)
+        if value is MISSING:
+            self.count(misses=1)
+            return default
+        self.count(hits=1)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = self.backend.get_many(keys, version=version)
+        self.count(hits=len(found), misses=len(keys) - len(found))
+        return found
+
+    def has_key(self, key, version=None):
+        return self.backend.has_key(key, version=version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.count(sets=1)
+        return self.backend.add(key, value, timeout, version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.count(sets=1)
+        self.backend.set(key, value, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self.count(sets=len(data))
+        return self.backend.set_many(data, timeout, version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.backend.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        self.count(deletes=1)
+        return self.backend.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.count(deletes=len(keys))
+        return self.backend.delete_many(keys, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        return self.backend.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        return self.backend.decr(key, delta, version=version)
+
+    def clear(self):
+        return self.backend.clear()
+
+    def close(self, **kwargs):
+        return self.backend.close(**kwargs)
+
+
+def cache_stats():
+    """Return hit/miss counters for every instrumented cache alias."""
+    stats = {}
+    for alias in caches.settings:
+        cache = caches[alias]
+        if not isinstance(cache, InstrumentedCache):
+            continue
+        counts = dict(cache.stats)
+        lookups = counts.get('hits', 0) + counts.get('misses', 0)
+        stats[alias] = {
+            'hits': counts.get('hits', 0),
+            'misses': counts.get('misses', 0),
+            'sets': counts.get('sets', 0),
+            'deletes': counts.get('deletes', 0),
+            'hit_ratio': round(counts.get('hits', 0) / lookups, 4)
+            if lookups else None,
+        }
+    return stats
+
+
+def get_or_compute(key, compute, timeout, alias='default', beta=1.0,
+                   lock_timeout=10):
+    """
+    Return the cached value for `key`, computing it at most once at a time.
+
+    Values are stored with how long they took to compute, and are
+    recomputed a little before they expire, earlier the slower they are
+    (XFetch, probabilistic early expiration), so hot keys rarely expire
+    under load. On an outright miss, only the worker holding the lock
+    computes while others wait up to `lock_timeout` seconds for it.
+    """
+    cache = caches[alias]
+    entry = cache.get(key)
+    if entry is not None:
+        value, delta, expires = entry
+        if expires is None:
+            return value
+        # -log(U) with U in (0, 1]: usually small, occasionally large.
+        early = delta * beta * -math.log(1 - random.random())
+        if time.time() + early < expires:
+            return value
+        # Chosen to refresh early: others keep serving the current value.
+        return compute_and_store(cache, key, compute, timeout)
+
+    lock = f'{key}:lock'
+    if cache.add(lock, 1, lock_timeout):
+        try:
+            return compute_and_store(cache, key, compute, timeout)
+        finally:
+            cache.delete(lock)
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    # The lock holder is slow or gone; compute without it.
+    return compute_and_store(cache, key, compute, timeout)
+
+
+def compute_and_store(cache, key, compute, timeout):
+    start = time.time()
+    value = compute()
+    delta = time.time() - start
+    expires = None if timeout is None else time.time() + timeout
+    cache.set(key, (value, delta, expires), timeout)
+    return value
+
+
+def warmer(name):
+    """Register a function filling hot cache keys under `name`."""
+    def register(func):
+        WARMERS[name] = func
+        return func
+    return register
+
+
+def schema_key(version=None):
+    return f'schema:{version or ""}:{translation.get_language()}'
+
+
+def load_schema_file():
+    """Return the schema pre-generated at build time, if there is one."""
+    path = settings.OPENAPI_SCHEMA_FILE
+    if not path or translation.get_language() != settings.LANGUAGE_CODE:
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def get_schema(version=None, request=None):
+    """Return the public OpenAPI schema, generated once per deploy."""
+    from drf_spectacular.settings import spectacular_settings
+
+    def generate():
+        schema = None if version else load_schema_file()
+        if schema is not None:
+            return schema
+        generator = spectacular_settings.DEFAULT_GENERATOR_CLASS(
+            api_version=version)
+        return generator.get_schema(request=request, public=True)
+
+    return get_or_compute(schema_key(version), generate, None, alias='deploy')
+
+
+@warmer('schema')
+def warm_schema():
+    get_schema()
+
+
+@warmer('permissions')
+def warm_permissions_version():
+    from core.backends import get_permissions_version
+    get_permissions_version()
@@ -0,0 +1,137 @@
+"""
+Change feed of user modifications.
+"""
+
+import contextvars
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Max
+from django.db.models.functions import Now
+
+from core.models import UserChange
+
+
+class ClockTimestamp(Now):
+    """The database's current time; on PostgreSQL, at evaluation."""
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, template='CLOCK_TIMESTAMP()',
+            **extra_context)
+
+
+# Entries collected by an enclosing `deferred()` block, if any.
+_pending = contextvars.ContextVar('pending_changes', default=None)
+
+
+def record_changes(user_ids, action):
+    """Append one change entry per user id in a single INSERT."""
+    # Stamped by the database once the INSERT holds its table lock, which
+    # is what `watermark` relies on.
+    entries = [UserChange(user_id=user_id, action=action,
+                          changed_at=ClockTimestamp())
+               for user_id in user_ids]
+    pending = _pending.get()
+    if pending is not None:
+        pending.extend(entries)
+        return
+    UserChange.objects.bulk_create(entries)
+
+
+@contextmanager
+def deferred():
+    """
+    Collect the changes recorded inside the block, e.g. by per-row delete
+    signals, and append them in one INSERT when it exits without error.
+    """
+    if _pending.get() is not None:
+        yield
+        return
+    token = _pending.set([])
+    try:
+        yield
+        entries = _pending.get()
+    finally:
+        _pending.reset(token)
+    UserChange.objects.bulk_create(entries)
+
+
+def record_change(user_id, action):
+    """Append a change entry for a single user."""
+    record_changes([user_id], action)
+
+
+def watermark(using=DEFAULT_DB_ALIAS):
+    """
+    Return the time before which every change is committed, or None when
+    the database serialises writers and all visible changes are final.
+
+    Sequence numbers are handed out at INSERT time but become visible at
+    COMMIT, so a transaction can commit a lower seq after a consumer has
+    moved past it. Only transactions holding a write lock on the change
+    table can do that, and their changes are stamped after they started;
+    changes stamped before the oldest of them started are final. With no
+    such transaction, that is every change stamped until now.
+
+    Other sessions' transactions are only seen if they use the same
+    database role (or the role has pg_read_all_stats).
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        # pg_stat_activity is otherwise read once per transaction.
+        cursor.execute('SELECT pg_stat_clear_snapshot()')
+        cursor.execute(
+            'SELECT LEAST(clock_timestamp(), MIN(activity.xact_start)) '
+            'FROM pg_locks locks '
+            'JOIN pg_stat_activity activity ON activity.pid = locks.pid '
+            'WHERE locks.relation = %s::regclass AND locks.granted '
+            "AND locks.mode = 'RowExclusiveLock' "
+            'AND locks.pid <> pg_backend_pid()',
+            [UserChange._meta.db_table])
+        return cursor.fetchone()[0]
+
+
+def settled(queryset):
+    """Restrict `queryset` to changes that no open transaction can precede."""
+    horizon = watermark(queryset.db)
+    if horizon is None:
+        return queryset
+    return queryset.filter(changed_at__lt=horizon)
+
+
+def changes_since(seq, limit):
+    """Return up to `limit` settled changes with a seq above `seq`."""
+    return list(settled(UserChange.objects.filter(seq__gt=seq))[:limit])
+
+
+def compact_changes(before_seq, batch_size=1000):
+    """Delete superseded entries up to `before_seq`.
+
+    Only the latest entry per user is kept, so a consumer replaying the
+    compacted range still ends up with the current state of every user.
+    Returns the number of deleted entries.
+    """
+    # The entries to keep are computed once; users changed again after
+    # this point only leave a few superseded entries for the next run.
+    keep = set(
+        UserChange.objects.values('user_id')
+        .annotate(latest=Max('seq'))
+        .filter(latest__lte=before_seq)
+        .values_list('latest', flat=True)
+    )
+    deleted = last = 0
+    while True:
+        batch = list(
+            UserChange.objects.filter(seq__gt=last, seq__lte=before_seq)
+            .order_by('seq').values_list('seq', flat=True)[:batch_size]
+        )
+        superseded = [seq for seq in batch if seq not in keep]
+        if superseded:
+            deleted += UserChange.objects.filter(
+                seq__in=superseded).delete()[0]
+        if len(batch) < batch_size:
+            return deleted
+        last = batch[-1]
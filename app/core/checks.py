@@ -0,0 +1,75 @@
+"""
+System checks for project configuration.
+"""
+
+from django.conf import settings
+from django.core import checks
+
+DISPATCHER = 'app.middleware.PathDispatchMiddleware'
+
+LOCAL_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+DATABASE_CACHE = 'django.core.cache.backends.db.DatabaseCache'
+
+# Middleware the admin needs, replacing the silenced admin.E408-E410.
+ADMIN_MIDDLEWARE = [
+    ('django.contrib.auth.middleware.AuthenticationMiddleware', 'core.E001'),
+    ('django.contrib.messages.middleware.MessageMiddleware', 'core.E002'),
+    ('django.contrib.sessions.middleware.SessionMiddleware', 'core.E003'),
+]
+
+
+@checks.register(checks.Tags.admin)
+def check_site_middleware(app_configs, **kwargs):
+    """Check the admin still gets sessions, auth and messages."""
+    if DISPATCHER not in settings.MIDDLEWARE:
+        return []
+    errors = [
+        checks.Error(
+            f"'{path}' must be in SITE_MIDDLEWARE to use the admin.",
+            id=error_id,
+        )
+        for path, error_id in ADMIN_MIDDLEWARE
+        if path not in settings.SITE_MIDDLEWARE
+    ]
+    admin_path = '/' + settings.ADMIN_URL
+    if admin_path.startswith(tuple(settings.API_PATH_PREFIXES)):
+        errors.append(checks.Error(
+            'ADMIN_URL must not fall under API_PATH_PREFIXES, which skip '
+            'session middleware.',
+            id='core.E004',
+        ))
+    return errors
+
+
+def cache_backend(alias='default'):
+    """The backend of cache `alias`, seen through InstrumentedCache."""
+    config = settings.CACHES[alias]
+    return config.get('OPTIONS', {}).get('BACKEND', config['BACKEND'])
+
+
+def is_process_local(alias='default'):
+    """Whether the cache `alias` lives in each worker's own memory."""
+    return cache_backend(alias) == LOCAL_CACHE
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Check every worker sees the state kept in the default cache."""
+    if cache_backend() == DATABASE_CACHE:
+        return [checks.Warning(
+            'The default cache is the database: permission and token '
+            'versions and admission slots then cost a query on the primary '
+            'database for most requests.',
+            hint="Set CACHE_BACKEND to 'redis' or 'memcached'.",
+            id='core.W001',
+        )]
+    if getattr(settings, 'WEB_CONCURRENCY', 1) <= 1 or not is_process_local():
+        return []
+    return [checks.Error(
+        'The default cache is process-local, but it holds state every '
+        'worker must see: used tokens, idempotency keys, permission '
+        'versions and admission slots.',
+        hint="Set CACHE_BACKEND to a cache shared by all workers (e.g. "
+             "'database' or 'redis'), or WEB_CONCURRENCY to 1.",
+        id='core.E005',
+    )]
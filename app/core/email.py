@@ -0,0 +1,26 @@
+"""
+Emails carrying core signed tokens instead of djoser's default ones.
+"""
+
+from djoser import email
+from djoser.conf import settings
+
+from core.tokens import activation_tokens, password_reset_tokens
+
+
+class ActivationEmail(email.ActivationEmail):
+
+    def get_context_data(self):
+        context = super().get_context_data()
+        context['token'] = activation_tokens.make_token(context['user'])
+        context['url'] = settings.ACTIVATION_URL.format(**context)
+        return context
+
+
+class PasswordResetEmail(email.PasswordResetEmail):
+
+    def get_context_data(self):
+        context = super().get_context_data()
+        context['token'] = password_reset_tokens.make_token(context['user'])
+        context['url'] = settings.PASSWORD_RESET_CONFIRM_URL.format(**context)
+        return context
@@ -0,0 +1,87 @@
+"""
+Idempotency keys for unsafe API requests.
+
+A client sending `Idempotency-Key: <key>` may retry the same request
+freely: the first successful response is cached for IDEMPOTENCY_KEY_TTL
+seconds and replayed for later requests with that key. Reusing a key for a
+different body is rejected with 422, and a retry arriving while the first
+attempt is still running gets 409.
+"""
+
+import functools
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions, status
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+VALID_KEY = re.compile(r'^[A-Za-z0-9._:-]{8,128}$')
+# Upper bound on how long an attempt holds its key.
+LOCK_TIMEOUT = 60
+
+
+class KeyInUse(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = _('A request with this idempotency key is in progress.')
+    default_code = 'idempotency_key_in_use'
+
+
+class KeyReused(exceptions.APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = _('This idempotency key was used for another request.')
+    default_code = 'idempotency_key_reused'
+
+
+def remember(cache_key, fingerprint, response):
+    """Cache a successful response for replay and return it."""
+    if status.is_success(response.status_code):
+        cache.set(cache_key, {
+            'fingerprint': fingerprint,
+            'status': response.status_code,
+            'data': response.data,
+        }, settings.IDEMPOTENCY_KEY_TTL)
+    return response
+
+
+def idempotent(view_method):
+    """Make a viewset action replay its response for a repeated key."""
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return view_method(self, request, *args, **kwargs)
+        if not VALID_KEY.match(key):
+            raise exceptions.ValidationError(
+                {IDEMPOTENCY_HEADER: _('Invalid idempotency key.')})
+
+        digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+        cache_key = f'idempotency:{self.basename}-{self.action}:{digest}'
+        fingerprint = hashlib.sha256(request.body).hexdigest()
+        cached = cache.get(cache_key)
+        if cached is None:
+            if not cache.add(f'{cache_key}:lock', 1, LOCK_TIMEOUT):
+                raise KeyInUse()
+            try:
+                # The first attempt may have finished since the lookup.
+                cached = cache.get(cache_key)
+                if cached is None:
+                    return remember(
+                        cache_key, fingerprint,
+                        view_method(self, request, *args, **kwargs))
+            finally:
+                cache.delete(f'{cache_key}:lock')
+
+        if cached['fingerprint'] != fingerprint:
+            raise KeyReused()
+        return Response(
+            cached['data'], status=cached['status'],
+            headers={REPLAYED_HEADER: 'true'},
+        )
+
+    return wrapper
@@ -0,0 +1,77 @@
+"""
+Write-coalescing buffer for last_login timestamps.
+
+Recording a login only touches memory. Pending timestamps are written in a
+single bulk UPDATE once `LAST_LOGIN_FLUSH_INTERVAL` seconds have passed, and
+once more when the process exits.
+"""
+
+import atexit
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+
+class LastLoginBuffer:
+    """Buffer last_login timestamps per user and flush them in bulk."""
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._timer = None
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'LAST_LOGIN_FLUSH_INTERVAL', 60)
+
+    def record(self, user_id, when=None, using=DEFAULT_DB_ALIAS):
+        """Remember that `user_id` (stored on `using`) logged in at `when`."""
+        when = when or timezone.now()
+        interval = self.flush_interval
+        timer = None
+        with self._lock:
+            self._pending[using, user_id] = when
+            if interval > 0 and self._timer is None:
+                timer = self._timer = threading.Timer(
+                    interval, self._flush_from_timer)
+                timer.daemon = True
+        if interval <= 0:
+            self.flush()
+        elif timer is not None:
+            timer.start()
+
+    def flush(self):
+        """Write pending timestamps, one UPDATE per database; return count."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            timer, self._timer = self._timer, None
+        if timer is not None and timer is not threading.current_thread():
+            timer.cancel()
+        if not pending:
+            return 0
+        User = get_user_model()
+        by_alias = {}
+        for (using, pk), when in pending.items():
+            by_alias.setdefault(using, []).append(User(pk=pk, last_login=when))
+        for using, users in by_alias.items():
+            User.objects.using(using).bulk_update(users, ['last_login'])
+        return len(pending)
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # The timer thread owns its own connections; don't leak them.
+            connections.close_all()
+
+
+buffer = LastLoginBuffer()
+atexit.register(buffer.flush)
+
+
+def record_login(sender, user, **kwargs):
+    """Receiver for `user_logged_in` replacing Django's per-login UPDATE."""
+    buffer.record(user.pk, using=user._state.db)
@@ -0,0 +1,424 @@
+"""
+Multi-node load test harness, run by the `loadtest_cluster` command.
+
+Starts N gunicorn nodes against the configured databases, puts a
+round-robin TCP load balancer in front of them, and drives the auth flows
+(login, `users/me`, token refresh) from concurrent clients. Consistency
+checks then target individual nodes, so state that lives in one node
+(a per-process cache, say) shows up as a failure.
+"""
+
+import http.client
+import itertools
+import json
+import os
+import selectors
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.urls import reverse
+from djoser.utils import encode_uid
+
+from core import sharding
+from core.benchmarks import summarize
+from core.idempotency import IDEMPOTENCY_HEADER
+from core.models import TokenFamily
+from core.tokens import activation_tokens
+
+PASSWORD = 'Complex135@'
+# Directory of manage.py, where the nodes run.
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def request(address, method, path, body=None, token=None, headers=None,
+            timeout=30):
+    """Send one request on a new connection; return (status, data)."""
+    headers = dict(headers or {})
+    if body is not None:
+        body = json.dumps(body)
+        headers['Content-Type'] = 'application/json'
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    conn = http.client.HTTPConnection(*address, timeout=timeout)
+    try:
+        conn.request(method, path, body, headers)
+        response = conn.getresponse()
+        content = response.read()
+    finally:
+        conn.close()
+    try:
+        data = json.loads(content) if content else None
+    except ValueError:
+        data = None
+    return response.status, data
+
+
+class ProxyHandler(socketserver.BaseRequestHandler):
+    """Pipe one client connection to the next backend."""
+
+    def handle(self):
+        backend = self.server.next_backend()
+        with socket.create_connection(backend) as upstream, \
+                selectors.DefaultSelector() as selector:
+            peers = {self.request: upstream, upstream: self.request}
+            for sock in peers:
+                selector.register(sock, selectors.EVENT_READ)
+            while True:
+                for key, _ in selector.select():
+                    data = key.fileobj.recv(65536)
+                    if not data:
+                        return
+                    peers[key.fileobj].sendall(data)
+
+
+class LoadBalancer(socketserver.ThreadingTCPServer):
+    """Round-robin TCP load balancer, one backend per connection."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, backends, address=('127.0.0.1', 0)):
+        self._backends = itertools.cycle(backends)
+        self._lock = threading.Lock()
+        super().__init__(address, ProxyHandler)
+
+    def next_backend(self):
+        with self._lock:
+            return next(self._backends)
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+class Cluster:
+    """N gunicorn nodes of this project on local ports."""
+
+    def __init__(self, nodes, workers=2, threads=1, timeout=60):
+        self.size = nodes
+        self.workers = workers
+        self.threads = threads
+        self.timeout = timeout
+        self.addresses = []
+        self.processes = []
+        self.log_dir = tempfile.mkdtemp(prefix='loadtest-')
+
+    def environment(self):
+        env = dict(os.environ)
+        hosts = [h for h in env.get('ALLOWED_HOSTS', '').split(',') if h]
+        env['ALLOWED_HOSTS'] = ','.join(hosts + ['127.0.0.1'])
+        # Registration sends an activation email.
+        env['EMAIL_BACKEND'] = 'django.core.mail.backends.locmem.EmailBackend'
+        return env
+
+    def __enter__(self):
+        env = self.environment()
+        for index in range(self.size):
+            address = ('127.0.0.1', free_port())
+            log = open(os.path.join(self.log_dir, f'node{index}.log'), 'wb')
+            self.processes.append(subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', 'app.wsgi:application',
+                 '--bind', '%s:%d' % address,
+                 '--workers', str(self.workers),
+                 '--threads', str(self.threads),
+                 '--access-logfile', os.devnull],
+                cwd=PROJECT_DIR, env=env, stdout=log, stderr=log))
+            log.close()
+            self.addresses.append(address)
+        try:
+            self.wait_ready()
+        except BaseException:
+            self.__exit__()
+            raise
+        return self
+
+    def wait_ready(self):
+        deadline = time.monotonic() + self.timeout
+        for index, address in enumerate(self.addresses):
+            while True:
+                if self.processes[index].poll() is not None:
+                    raise RuntimeError(
+                        f'node{index} exited, see {self.log_dir}')
+                try:
+                    if request(address, 'GET', reverse('readyz'))[0] == 200:
+                        break
+                except OSError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError(
+                        f'node{index} not ready, see {self.log_dir}')
+                time.sleep(0.1)
+
+    def __exit__(self, *exc_info):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+class Users:
+    """Throwaway active users, deleted from every shard on exit."""
+
+    def __init__(self, count):
+        self.prefix = f'loadtest-{uuid.uuid4().hex[:8]}-'
+        self.count = count
+        self.created = []
+
+    def email(self):
+        return f'{self.prefix}{uuid.uuid4().hex[:12]}@example.com'
+
+    def create(self, active=True):
+        User = get_user_model()
+        user = User.objects.create_user(email=self.email(), password=PASSWORD)
+        if active:
+            # create_user leaves users inactive until activation.
+            User.objects.db_manager(user._state.db).filter(
+                pk=user.pk).update(is_active=True)
+            user.is_active = True
+        self.created.append(user)
+        return user
+
+    def __enter__(self):
+        for _ in range(self.count):
+            self.create()
+        return self
+
+    def __exit__(self, *exc_info):
+        User = get_user_model()
+        for alias in sharding.get_shards():
+            users = User.objects.using(alias).filter(
+                email__startswith=self.prefix)
+            TokenFamily.objects.filter(
+                user_id__in=list(users.values_list('pk', flat=True))
+            ).delete()
+            users.delete()
+
+
+def login(address, email):
+    status, data = request(address, 'POST', reverse('jwt-create'),
+                           {'email': email, 'password': PASSWORD})
+    if status != 200:
+        raise RuntimeError(f'login returned {status}')
+    return data['access'], data['refresh']
+
+
+def drive(address, emails, clients, duration, reads_per_refresh=5):
+    """
+    Run the auth flow from `clients` threads for `duration` seconds:
+    login, then `users/me` requests with a token refresh between batches.
+    Return (millisecond samples, error count).
+    """
+    me_url = reverse('auth:user-me')
+    refresh_url = reverse('jwt-refresh')
+    deadline = time.monotonic() + duration
+
+    def client(index):
+        samples, errors = [], 0
+
+        def timed(*args, **kwargs):
+            nonlocal errors
+            start = time.perf_counter()
+            try:
+                status, data = request(address, *args, **kwargs)
+            except OSError:
+                status, data = None, None
+            samples.append((time.perf_counter() - start) * 1000)
+            if status != 200:
+                errors += 1
+            return status, data
+
+        email = emails[index % len(emails)]
+        access, refresh = login(address, email)
+        while time.monotonic() < deadline:
+            for _ in range(reads_per_refresh):
+                timed('GET', me_url, token=access)
+            status, data = timed(
+                'POST', refresh_url, {'refresh': refresh})
+            if status == 200:
+                access, refresh = data['access'], data['refresh']
+            else:
+                access, refresh = login(address, email)
+        return samples, errors
+
+    with ThreadPoolExecutor(clients) as pool:
+        results = list(pool.map(client, range(clients)))
+    samples = [sample for result, _ in results for sample in result]
+    return samples, sum(errors for _, errors in results)
+
+
+class ConnectionSampler(threading.Thread):
+    """Track the peak number of PostgreSQL connections to the database."""
+
+    def __init__(self, using=DEFAULT_DB_ALIAS, interval=0.5):
+        super().__init__(daemon=True)
+        self.using = using
+        self.interval = interval
+        self.peak = None
+        self.stopped = threading.Event()
+
+    def run(self):
+        connection = connections[self.using]
+        try:
+            while not self.stopped.is_set():
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SELECT count(*) FROM pg_stat_activity '
+                        'WHERE datname = current_database()')
+                    count = cursor.fetchone()[0]
+                self.peak = max(self.peak or 0, count)
+                self.stopped.wait(self.interval)
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        if connections[self.using].vendor == 'postgresql':
+            self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        if self.is_alive():
+            self.join()
+
+
+def check_deactivation(cluster, users):
+    """A deactivated user's access token stops working on every node."""
+    user = users.create()
+    access, _ = login(cluster.addresses[0], user.email)
+    me_url = reverse('auth:user-me')
+    for address in cluster.addresses:
+        request(address, 'GET', me_url, token=access)
+    user.is_active = False
+    user.save(update_fields=['is_active'])
+    stale = [
+        index for index, address in enumerate(cluster.addresses)
+        if request(address, 'GET', me_url, token=access)[0] == 200
+    ]
+    if stale:
+        return False, f'node(s) {stale} still accept the token'
+    return True, 'rejected by every node'
+
+
+def check_refresh_reuse(cluster, users):
+    """Replaying a rotated refresh token revokes its family everywhere."""
+    nodes = itertools.cycle(cluster.addresses)
+    url = reverse('jwt-refresh')
+    user = users.create()
+    _, first = login(next(nodes), user.email)
+    status, data = request(next(nodes), 'POST', url, {'refresh': first})
+    if status != 200:
+        return False, f'refresh returned {status}'
+    replayed = request(next(nodes), 'POST', url, {'refresh': first})[0]
+    revoked = request(next(nodes), 'POST', url,
+                      {'refresh': data['refresh']})[0]
+    return (replayed, revoked) == (401, 401), \
+        f'replay returned {replayed}, next refresh {revoked}'
+
+
+def check_activation_replay(cluster, users):
+    """An activation token works once across nodes."""
+    user = users.create(active=False)
+    body = {'uid': encode_uid(user.pk),
+            'token': activation_tokens.make_token(user)}
+    url = reverse('auth:user-activation')
+    statuses = [request(address, 'POST', url, body)[0]
+                for address in cluster.addresses + cluster.addresses[:1]]
+    return statuses[0] == 204 and set(statuses[1:]) == {403}, \
+        f'statuses {statuses}'
+
+
+def check_password_change(cluster, users):
+    """A password change revokes the user's tokens on every node."""
+    user = users.create()
+    access, refresh = login(cluster.addresses[0], user.email)
+    status, _ = request(
+        cluster.addresses[-1], 'POST', reverse('auth:user-set-password'),
+        {'current_password': PASSWORD, 'new_password': PASSWORD[::-1]},
+        token=access)
+    if status != 204:
+        return False, f'set_password returned {status}'
+    me_url = reverse('auth:user-me')
+    accepted = [
+        index for index, address in enumerate(cluster.addresses)
+        if request(address, 'GET', me_url, token=access)[0] == 200
+    ]
+    refreshed = request(cluster.addresses[0], 'POST', reverse('jwt-refresh'),
+                        {'refresh': refresh})[0]
+    if accepted or refreshed != 401:
+        return False, f'node(s) {accepted} accept the access token, ' \
+                      f'refresh returned {refreshed}'
+    return True, 'old tokens rejected by every node'
+
+
+def check_idempotent_registration(cluster, users):
+    """A retried registration is replayed by whichever node gets it."""
+    body = {'email': users.email(), 'password': PASSWORD,
+            're_password': PASSWORD, 'name': 'Load Test'}
+    headers = {IDEMPOTENCY_HEADER: uuid.uuid4().hex}
+    url = reverse('auth:user-list')
+    statuses = [request(address, 'POST', url, body, headers=headers)[0]
+                for address in cluster.addresses + cluster.addresses[:1]]
+    return set(statuses) == {201}, f'statuses {statuses}'
+
+
+CHECKS = {
+    'deactivation': check_deactivation,
+    'refresh reuse': check_refresh_reuse,
+    'activation replay': check_activation_replay,
+    'password change': check_password_change,
+    'idempotent registration': check_idempotent_registration,
+}
+
+
+def run(nodes, clients, duration, workers=2, threads=1, users=20):
+    """
+    Load test a cluster of `nodes` nodes; return (row, check results),
+    where check results map each CHECKS name to (passed, detail).
+    """
+    with Users(users) as accounts, \
+            Cluster(nodes, workers, threads) as cluster, \
+            LoadBalancer(cluster.addresses) as balancer, \
+            ConnectionSampler() as sampler:
+        emails = [user.email for user in accounts.created]
+        start = time.perf_counter()
+        samples, errors = drive(
+            balancer.server_address, emails, clients, duration)
+        elapsed = time.perf_counter() - start
+        checks = {}
+        for name, check in CHECKS.items():
+            try:
+                checks[name] = check(cluster, accounts)
+            except Exception as exc:
+                checks[name] = (False, f'{exc.__class__.__name__}: {exc}')
+    row = {
+        'nodes': nodes,
+        'requests': len(samples),
+        'errors': errors,
+        'req_per_s': round(len(samples) / elapsed),
+        **summarize(samples or [0]),
+        'db_conns_peak': '-' if sampler.peak is None else sampler.peak,
+    }
+    return row, checks
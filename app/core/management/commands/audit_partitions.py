@@ -0,0 +1,42 @@
+"""
+Django command to maintain the monthly partitions of the audit table
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core import audit
+
+
+class Command(BaseCommand):
+    """Django command to create upcoming and drop expired audit partitions"""
+
+    help = 'Create the next monthly audit partitions and drop old ones.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead', type=int, default=3,
+            help='Months of partitions to create past the current one.',
+        )
+        parser.add_argument(
+            '--retain', type=int, metavar='MONTHS',
+            help='Drop partitions older than this many full months.',
+        )
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        using = options['database']
+        if options['ahead'] < 0 or (options['retain'] or 0) < 0:
+            raise CommandError('--ahead and --retain must not be negative.')
+        if connections[using].vendor != 'postgresql':
+            self.stdout.write('Audit partitions need PostgreSQL; skipped.')
+            return
+
+        for name in audit.ensure_partitions(options['ahead'], using=using):
+            self.stdout.write(f'Created {name}')
+        if options['retain'] is not None:
+            for name in audit.drop_partitions(options['retain'], using=using):
+                self.stdout.write(f'Dropped {name}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(audit.partitions(using))} audit partitions.'))
@@ -0,0 +1,27 @@
+"""
+Django command to run benchmark scenarios
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import SCENARIOS, format_table
+
+
+class Command(BaseCommand):
+    """Django command to run a named benchmark and print its results"""
+
+    help = 'Run a benchmark scenario and print a results table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=sorted(SCENARIOS))
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be positive.')
+        rows = SCENARIOS[options['scenario']](options['iterations'])
+        if not rows:
+            return
+        for line in format_table(rows):
+            self.stdout.write(line)
@@ -0,0 +1,59 @@
+"""
+Django command to flag migrations that would lock tables during a deploy
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+from core.operations import ERROR, check_plan
+
+
+class Command(BaseCommand):
+    """Django command to check pending migrations before deploying"""
+
+    help = 'Flag unsafe operations in unapplied migrations.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'app_label', nargs='?',
+            help='Only check migrations of this app.',
+        )
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Audit every migration, including applied ones, as if '
+                 'its tables already held data.',
+        )
+        parser.add_argument(
+            '--strict', action='store_true',
+            help='Fail on warnings too.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        executor = MigrationExecutor(connections[options['database']])
+        plan = executor.migration_plan(
+            executor.loader.graph.leaf_nodes(), clean_start=options['all'])
+        app_label = options['app_label']
+        if app_label and app_label not in executor.loader.migrated_apps:
+            raise CommandError(f"App '{app_label}' has no migrations.")
+
+        findings = [
+            finding for finding in check_plan(
+                plan, skip_new_tables=not options['all'])
+            if app_label in (None, finding[0].app_label)
+        ]
+        for migration, operation, level, message in findings:
+            style = self.style.ERROR if level == ERROR else self.style.WARNING
+            self.stdout.write(style(
+                f'{level}: {migration.app_label}.{migration.name}: '
+                f'{operation.describe()}: {message}'))
+
+        errors = sum(level == ERROR for _, _, level, _ in findings)
+        failing = len(findings) if options['strict'] else errors
+        if failing:
+            raise CommandError(
+                f'{failing} unsafe migration operation(s) found.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {len(plan)} migrations: {len(findings)} warning(s).'))
@@ -0,0 +1,39 @@
+"""
+Django command to compact the user change feed
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core import changes
+from core.models import UserChange
+
+
+class Command(BaseCommand):
+    """Django command to drop superseded user change entries"""
+
+    help = 'Keep only the latest change per user outside the retention window'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-days', type=int, default=7,
+            help='Never compact entries newer than this many days.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        cutoff = timezone.now() - timedelta(days=options['keep_days'])
+        last = (
+            UserChange.objects.filter(changed_at__lt=cutoff)
+            .order_by('-seq').values_list('seq', flat=True).first()
+        )
+        if last is None:
+            self.stdout.write('Nothing to compact.')
+            return
+        deleted = changes.compact_changes(last, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Removed {deleted} superseded changes up to seq {last}.'
+        ))
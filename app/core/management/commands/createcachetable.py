@@ -0,0 +1,30 @@
+"""
+Django command to create the database cache tables, seeing through
+core.caching.InstrumentedCache
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.db import BaseDatabaseCache
+from django.core.management.commands import createcachetable
+
+from core.caching import InstrumentedCache
+
+
+class Command(createcachetable.Command):
+    """Django's createcachetable, for wrapped database caches too"""
+
+    def handle(self, *tablenames, **options):
+        """Entry point for command"""
+        if tablenames:
+            return super().handle(*tablenames, **options)
+        tables = []
+        for alias in settings.CACHES:
+            cache = caches[alias]
+            if isinstance(cache, InstrumentedCache):
+                cache = cache.backend
+            if (isinstance(cache, BaseDatabaseCache)
+                    and cache._table not in tables):
+                tables.append(cache._table)
+        if tables:
+            super().handle(*tables, **options)
@@ -0,0 +1,71 @@
+"""
+Django command to load test several app nodes sharing one database
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import loadtest
+from core.benchmarks import format_table
+
+
+class Command(BaseCommand):
+    """Django command to run the multi-node load test harness"""
+
+    help = 'Start N app nodes behind a load balancer, drive the auth ' \
+           'flows and check cross-node consistency.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--nodes', type=int, nargs='+', default=[1, 2],
+            help='Cluster sizes to test, one run each.',
+        )
+        parser.add_argument('--clients', type=int, default=16)
+        parser.add_argument(
+            '--duration', type=float, default=10.0,
+            help='Seconds of load per run.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=2,
+            help='Gunicorn workers per node.',
+        )
+        parser.add_argument('--threads', type=int, default=1)
+        parser.add_argument(
+            '--users', type=int, default=20,
+            help='Throwaway users the clients log in as.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        if min(options['nodes'] + [options['clients'], options['users']]) < 1:
+            raise CommandError(
+                '--nodes, --clients and --users must be positive.')
+        backend = settings.CACHES['default']['OPTIONS']['BACKEND']
+        processes = max(options['nodes']) * options['workers']
+        if processes > 1 and backend.endswith('LocMemCache'):
+            self.stderr.write(self.style.WARNING(
+                'The default cache is per process, so what is stored in it '
+                '(idempotency keys, used tokens) is not shared between '
+                'workers or nodes. Set CACHE_BACKEND to redis or memcached.'))
+
+        rows, failures = [], 0
+        for nodes in options['nodes']:
+            try:
+                row, checks = loadtest.run(
+                    nodes, options['clients'], options['duration'],
+                    workers=options['workers'], threads=options['threads'],
+                    users=options['users'])
+            except RuntimeError as exc:
+                raise CommandError(exc)
+            rows.append(row)
+            for name, (passed, detail) in checks.items():
+                failures += not passed
+                style = self.style.SUCCESS if passed else self.style.ERROR
+                self.stdout.write(style(
+                    f"{'PASS' if passed else 'FAIL'} {name} "
+                    f'({nodes} nodes): {detail}'))
+
+        for line in format_table(rows):
+            self.stdout.write(line)
+        if failures:
+            raise CommandError(f'{failures} consistency check(s) failed.')
@@ -0,0 +1,56 @@
+"""
+Django command to merge sampling profiles from several workers
+"""
+
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import parse_collapsed, render
+
+
+class Command(BaseCommand):
+    """Django command to combine collapsed-stack profile dumps"""
+
+    help = 'Merge collapsed-stack profiles into one collapsed or ' \
+           'speedscope file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+')
+        parser.add_argument(
+            '--output-format', choices=['collapsed', 'speedscope'],
+            default='collapsed',
+        )
+        parser.add_argument(
+            '-o', '--output',
+            help='File to write; defaults to stdout.',
+        )
+        parser.add_argument(
+            '--label', action='append', default=[],
+            help='Only keep samples for this URL name (repeatable).',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        merged = Counter()
+        for path in options['files']:
+            try:
+                with open(path) as f:
+                    merged.update(parse_collapsed(f.read()))
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Cannot read {path}: {exc}')
+        if options['label']:
+            merged = Counter({
+                key: count for key, count in merged.items()
+                if key[0] in options['label']
+            })
+
+        content = render(merged, options['output_format'])
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(content)
+            self.stderr.write(
+                f'Merged {sum(merged.values())} samples from '
+                f'{len(options["files"])} files into {options["output"]}.')
+        else:
+            self.stdout.write(content, ending='')
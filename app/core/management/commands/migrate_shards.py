@@ -0,0 +1,34 @@
+"""
+Django command to migrate the default database and every user shard,
+then create the database cache tables
+"""
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from core import sharding
+
+
+class Command(BaseCommand):
+    """Django command to run migrate on each database alias in turn"""
+
+    help = ("Run migrate on 'default', then on every other user shard, "
+            'and createcachetable.')
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        aliases = [DEFAULT_DB_ALIAS] + [
+            alias for alias in sharding.get_shards()
+            if alias != DEFAULT_DB_ALIAS
+        ]
+        for alias in aliases:
+            self.stdout.write(f'Migrating {alias}...')
+            call_command(
+                'migrate', database=alias, interactive=False,
+                verbosity=options['verbosity'], stdout=self.stdout,
+            )
+        call_command(
+            'createcachetable', verbosity=options['verbosity'],
+            stdout=self.stdout,
+        )
@@ -0,0 +1,57 @@
+"""
+Django command to hard-delete users marked as deleted
+"""
+
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core import changes, sharding
+
+
+class Command(BaseCommand):
+    """Django command to purge soft-deleted users in bounded batches"""
+
+    help = 'Hard-delete soft-deleted users in small transactions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=int, default=0,
+            help='Only purge users deleted at least this many hours ago.',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--sleep', type=float, default=0.0,
+            help='Seconds to pause between batches.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        purged = 0
+        for alias in sharding.get_shards():
+            purged = self.purge(alias, cutoff, purged, options)
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} users.'))
+
+    def purge(self, alias, cutoff, purged, options):
+        """Purge the soft-deleted users of one shard; return the total."""
+        users = get_user_model().objects.using(alias)
+        pending = (
+            users.filter(deleted_at__lte=cutoff)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+        while True:
+            batch = list(pending[:options['batch_size']])
+            if not batch:
+                return purged
+            # One change-feed INSERT per batch, not one per deleted row.
+            with transaction.atomic(using=alias), changes.deferred():
+                users.filter(pk__in=batch).delete()
+            purged += len(batch)
+            self.stdout.write(f'Purged {purged} users...')
+            if options['sleep']:
+                time.sleep(options['sleep'])
@@ -0,0 +1,43 @@
+"""
+Django command to delete expired refresh token families
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import TokenFamily
+
+
+class Command(BaseCommand):
+    """Django command to purge expired token families in bounded batches"""
+
+    help = 'Delete expired refresh token families in small batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--sleep', type=float, default=0.0,
+            help='Seconds to pause between batches.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        expired = (
+            TokenFamily.objects.filter(expires_at__lte=timezone.now())
+            .order_by('expires_at').values_list('pk', flat=True)
+        )
+        purged = 0
+        while True:
+            batch = list(expired[:options['batch_size']])
+            if not batch:
+                break
+            TokenFamily.objects.filter(pk__in=batch).delete()
+            purged += len(batch)
+            self.stdout.write(f'Purged {purged} token families...')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Purged {purged} token families.'))
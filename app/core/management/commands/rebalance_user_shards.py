@@ -0,0 +1,113 @@
+"""
+Django command to move users onto the shard owning their email
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from core import changes, sharding
+from core.models import TokenFamily, UserChange
+
+
+def link_fields(through):
+    """Return the through model's column names except its own id."""
+    return [f.attname for f in through._meta.fields if not f.primary_key]
+
+
+def delete_rows(model, pks, using):
+    """DELETE rows by primary key in one statement, sending no signals."""
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(pks))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(model._meta.db_table)} '
+            f'WHERE {quote(model._meta.pk.column)} IN ({placeholders})',
+            pks,
+        )
+
+
+class Command(BaseCommand):
+    """Django command to rebalance users after USER_SHARDS changed"""
+
+    help = 'Copy misplaced users to their shard, keeping their ids.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only count the users that would move.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        shards = sharding.get_shards()
+        # Moved users keep their ids: the id sequences must be disjoint.
+        # migrate does this too; shards added since are caught here.
+        for alias in shards:
+            try:
+                interleaved = sharding.ensure_interleaved(alias)
+            except ImproperlyConfigured as exc:
+                raise CommandError(exc)
+            if interleaved:
+                self.stdout.write(f'Interleaved user ids on {alias}.')
+
+        moved = 0
+        for source in shards:
+            moved += self.rebalance(source, options)
+        verb = 'Would move' if options['dry_run'] else 'Moved'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {moved} users.'))
+
+    def rebalance(self, source, options):
+        """Move misplaced users off `source` batch by batch."""
+        User = get_user_model()
+        users = User.objects.using(source).order_by('pk')
+        moved = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                users.filter(pk__gt=last_pk)
+                .values_list('pk', 'email')[:options['batch_size']])
+            if not batch:
+                return moved
+            last_pk = batch[-1][0]
+            targets = {}
+            for pk, email in batch:
+                target = sharding.shard_for_email(email)
+                if target != source:
+                    targets.setdefault(target, []).append(pk)
+            for target, pks in targets.items():
+                if not options['dry_run']:
+                    self.move(pks, source, target)
+                moved += len(pks)
+                self.stdout.write(f'{source} -> {target}: {len(pks)} users')
+
+    def move(self, pks, source, target):
+        """Copy users and their group/permission links, then drop the
+        originals. Re-running after a partial failure is safe.
+
+        Their tokens name the old shard, so their refresh tokens are
+        revoked: moved users sign in again.
+        """
+        User = get_user_model()
+        links = [User.groups.through, User.user_permissions.through]
+        with transaction.atomic(using=target), \
+                transaction.atomic(using=source):
+            User.objects.using(target).bulk_create(
+                User.objects.using(source).filter(pk__in=pks),
+                ignore_conflicts=True,
+            )
+            for through in links:
+                rows = through.objects.using(source).filter(user_id__in=pks)
+                copies = rows.values(*link_fields(through))
+                through.objects.using(target).bulk_create(
+                    [through(**row) for row in copies],
+                    ignore_conflicts=True,
+                )
+                rows.delete()
+            # The users still exist, so no deletion signals or changes.
+            delete_rows(User, pks, source)
+        TokenFamily.objects.filter(user_id__in=pks).delete()
+        changes.record_changes(pks, UserChange.UPDATED)
@@ -0,0 +1,61 @@
+"""
+Django command to flip is_active/is_staff on many users at once
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.bulk import set_user_flags
+
+
+class Command(BaseCommand):
+    """Django command to bulk update user flags with chunked UPDATEs"""
+
+    help = 'Set is_active/is_staff on the users matching the filters.'
+
+    def add_arguments(self, parser):
+        active = parser.add_mutually_exclusive_group()
+        active.add_argument('--activate', dest='is_active',
+                            action='store_true', default=None)
+        active.add_argument('--deactivate', dest='is_active',
+                            action='store_false')
+        staff = parser.add_mutually_exclusive_group()
+        staff.add_argument('--staff', dest='is_staff',
+                           action='store_true', default=None)
+        staff.add_argument('--no-staff', dest='is_staff',
+                           action='store_false')
+        parser.add_argument(
+            '--filter', action='append', default=[], metavar='LOOKUP=VALUE',
+            help='Queryset filter, e.g. email__endswith=@example.com. '
+                 'May be repeated.',
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        flags = {
+            name: options[name] for name in ('is_active', 'is_staff')
+            if options[name] is not None
+        }
+        if not flags:
+            raise CommandError('Nothing to do: pass a flag to set.')
+
+        lookups = {}
+        for item in options['filter']:
+            lookup, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError(f'Invalid filter: {item!r}')
+            lookups[lookup] = value
+        queryset = get_user_model().objects.filter(**lookups)
+
+        if options['dry_run']:
+            self.stdout.write(f'{queryset.count()} users match.')
+            return
+
+        updated = set_user_flags(
+            queryset, flags, chunk_size=options['chunk_size'],
+            progress=lambda total: self.stdout.write(
+                f'Updated {total} users...'),
+        )
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} users.'))
@@ -0,0 +1,83 @@
+"""
+Django command to summarize recorded slow queries
+"""
+
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.utils import timezone
+
+from core.models import SlowQuery
+
+
+class Command(BaseCommand):
+    """Django command to aggregate slow queries by statement and view"""
+
+    help = 'Report slow queries grouped by normalized SQL and URL name.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=float, default=1.0,
+            help='Only include queries recorded in the last N days.',
+        )
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--view', action='append', default=[],
+            help='Only include this URL name (repeatable).',
+        )
+        parser.add_argument(
+            '--plans', action='store_true',
+            help='Print the plan of the slowest query in each group.',
+        )
+        parser.add_argument(
+            '--purge-older-than', type=float, metavar='DAYS',
+            help='Delete queries recorded more than DAYS days ago first.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        now = timezone.now()
+        if options['purge_older_than'] is not None:
+            cutoff = now - timedelta(days=options['purge_older_than'])
+            purged, _ = SlowQuery.objects.filter(
+                recorded_at__lt=cutoff).delete()
+            self.stdout.write(f'Purged {purged} slow queries.')
+
+        queries = SlowQuery.objects.filter(
+            recorded_at__gte=now - timedelta(days=options['days']))
+        if options['view']:
+            queries = queries.filter(view_name__in=options['view'])
+        groups = (
+            queries.values('fingerprint', 'view_name')
+            .annotate(
+                count=Count('pk'),
+                timeouts=Count('pk', filter=Q(timed_out=True)),
+                total_ms=Sum('duration_ms'), avg_ms=Avg('duration_ms'),
+                max_ms=Max('duration_ms'),
+            )
+            .order_by('-total_ms')[:options['limit']]
+        )
+        if not groups:
+            self.stdout.write('No slow queries recorded.')
+            return
+
+        self.stdout.write(
+            f"{'count':>6} {'timeouts':>8} {'avg_ms':>9} {'max_ms':>9} "
+            f"{'total_ms':>10}  view")
+        for group in groups:
+            slowest = (
+                queries.filter(fingerprint=group['fingerprint'],
+                               view_name=group['view_name'])
+                .order_by('-duration_ms').first()
+            )
+            self.stdout.write(
+                f"{group['count']:>6} {group['timeouts']:>8} "
+                f"{group['avg_ms']:>9.1f} {group['max_ms']:>9.1f} "
+                f"{group['total_ms']:>10.1f}  {group['view_name']}")
+            self.stdout.write(f'    {slowest.statement}')
+            if options['plans'] and slowest.plan is not None:
+                plan = json.dumps(slowest.plan, indent=2)
+                self.stdout.write(
+                    '\n'.join(f'    {line}' for line in plan.splitlines()))
@@ -3,8 +3,8 @@ Django command to pause execution until database is available
 """
 
 import time
-from psycopg2 import OperationalError as Psycopg2Error
 
+from django.db import connections
 from django.db.utils import OperationalError
 from django.core.management.base import BaseCommand
 
@@ -15,13 +15,17 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         """Entry point for command"""
 
+        # The driver's own error (psycopg2 or psycopg 3) can escape
+        # Django's wrapping while connecting.
+        driver_error = connections['default'].Database.OperationalError
+
         self.stdout.write('Waiting for database...')
         db_up = False
         while not db_up:
             try:
                 self.check(databases=['default'])
                 db_up = True
-            except (Psycopg2Error, OperationalError):
+            except (driver_error, OperationalError):
                 self.stdout.write('Database unavailable, waiting 1 second...')
                 time.sleep(1)
 
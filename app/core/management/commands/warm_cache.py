@@ -0,0 +1,35 @@
+"""
+Django command to fill hot cache keys ahead of traffic
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.caching import WARMERS
+
+
+class Command(BaseCommand):
+    """Django command to run cache warmers, e.g. after a deploy"""
+
+    help = 'Precompute hot cache keys such as the API schema.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'warmers', nargs='*',
+            help=f'Warmers to run ({", ".join(sorted(WARMERS))}); '
+                 'all of them by default.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        unknown = set(options['warmers']) - set(WARMERS)
+        if unknown:
+            raise CommandError(
+                f'Unknown warmers: {", ".join(sorted(unknown))}')
+        for name in options['warmers'] or sorted(WARMERS):
+            start = time.perf_counter()
+            WARMERS[name]()
+            elapsed = (time.perf_counter() - start) * 1000
+            self.stdout.write(f'Warmed {name} in {elapsed:.0f}ms.')
+        self.stdout.write(self.style.SUCCESS('Cache warm.'))
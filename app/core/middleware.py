@@ -0,0 +1,172 @@
+"""
+Middleware for the core app.
+"""
+
+import zlib
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import parse_http_date_safe
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+def gzip_compress(data):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        # Sync-flush so each chunk reaches the client as it is produced.
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def brotli_stream(chunks):
+    compressor = brotli.Compressor(quality=4)
+    for chunk in chunks:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def zstd_stream(chunks):
+    compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# Supported encodings: name -> (compress(bytes), compress_stream(iterable)).
+ENCODERS = {'gzip': (gzip_compress, gzip_stream)}
+if brotli is not None:
+    ENCODERS['br'] = (
+        lambda data: brotli.compress(data, quality=4), brotli_stream)
+if zstandard is not None:
+    ENCODERS['zstd'] = (
+        lambda data: zstandard.ZstdCompressor(level=3).compress(data),
+        zstd_stream,
+    )
+
+
+def parse_accept_encoding(header):
+    """Return the encodings accepted by the client with their q-values."""
+    accepted = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+class CompressionMiddleware:
+    """Compress API payloads and answer conditional GETs.
+
+    Responses get a cheap weak ETag (CRC32 and length of the body) so
+    If-None-Match can be answered with a 304, then are compressed with the
+    first encoding of `COMPRESSION_ENCODINGS` the client accepts. Static
+    files never get here: core.staticfiles serves them precompressed.
+
+    Only `COMPRESSION_CONTENT_TYPES` are compressed; HTML is left out by
+    default as admin pages embed CSRF tokens (BREACH).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = settings.COMPRESSION_MIN_SIZE
+        self.content_types = tuple(settings.COMPRESSION_CONTENT_TYPES)
+        self.encodings = [
+            name for name in settings.COMPRESSION_ENCODINGS
+            if name in ENCODERS
+        ]
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method in ('GET', 'HEAD'):
+            response = self.process_conditional(request, response)
+        if response.status_code == 304:
+            return response
+        return self.process_compression(request, response)
+
+    def process_conditional(self, request, response):
+        if response.status_code != 200 or response.streaming:
+            return response
+        if not response.has_header('ETag') and not self.no_store(response):
+            content = response.content
+            response['ETag'] = (
+                f'W/"{zlib.crc32(content):08x}{len(content):x}"')
+        etag = response.get('ETag')
+        last_modified = response.get('Last-Modified')
+        last_modified = last_modified and parse_http_date_safe(last_modified)
+        if etag or last_modified:
+            return get_conditional_response(
+                request, etag=etag, last_modified=last_modified,
+                response=response,
+            )
+        return response
+
+    def process_compression(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0]
+        if not content_type.startswith(self.content_types):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+        if response.streaming and response.is_async:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        compress, compress_stream = ENCODERS[encoding]
+
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            compressed = compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        return response
+
+    def choose_encoding(self, header):
+        accepted = parse_accept_encoding(header)
+        for name in self.encodings:
+            if accepted.get(name, accepted.get('*', 0)) > 0:
+                return name
+        return None
+
+    @staticmethod
+    def no_store(response):
+        return 'no-store' in response.get('Cache-Control', '')
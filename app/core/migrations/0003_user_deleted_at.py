@@ -0,0 +1,28 @@
+# Generated by Django 4.2.6 on 2026-10-19 14:05
+
+import core.operations
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0002_user_change'),
+    ]
+
+    operations = [
+        core.operations.WithLockTimeout(
+            migrations.AddField(
+                model_name='user',
+                name='deleted_at',
+                field=models.DateTimeField(blank=True, null=True),
+            ),
+        ),
+        core.operations.AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(
+                fields=['deleted_at'], name='core_user_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.6 on 2026-10-19 14:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_token_family'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('view_name', models.CharField(max_length=200)),
+                ('database', models.CharField(max_length=64)),
+                ('fingerprint', models.CharField(db_index=True, max_length=16)),
+                ('statement', models.TextField()),
+                ('duration_ms', models.FloatField()),
+                ('timed_out', models.BooleanField(default=False)),
+                ('plan', models.JSONField(blank=True, null=True)),
+            ],
+        ),
+    ]
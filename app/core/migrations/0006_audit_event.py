@@ -0,0 +1,31 @@
+# Generated by Django 4.2.6 on 2026-10-19 16:05
+
+import core.operations
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_slow_query'),
+    ]
+
+    operations = [
+        core.operations.CreatePartitionedModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('occurred_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('event', models.CharField(choices=[('login', 'Logged in'), ('login_failed', 'Failed login'), ('register', 'Registered'), ('activate', 'Activated'), ('password_reset', 'Password reset'), ('delete', 'Deleted')], max_length=16)),
+                ('user_id', models.BigIntegerField(blank=True, null=True)),
+                ('identifier', models.CharField(blank=True, max_length=255)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('request_id', models.CharField(blank=True, max_length=64)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['occurred_at'], name='core_audit_time_idx'), models.Index(fields=['user_id', 'occurred_at'], name='core_audit_user_idx'), models.Index(fields=['event', 'occurred_at'], name='core_audit_event_idx')],
+            },
+            partition_key='occurred_at',
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.6 on 2026-10-19 17:20
+
+import core.operations
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0006_audit_event'),
+    ]
+
+    operations = [
+        core.operations.WithLockTimeout(
+            migrations.AddField(
+                model_name='user',
+                name='token_version',
+                field=models.PositiveIntegerField(default=0),
+            ),
+        ),
+    ]
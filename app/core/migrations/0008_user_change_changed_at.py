@@ -0,0 +1,26 @@
+# Generated by Django 4.2.6 on 2026-10-20 09:30
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_user_token_version'),
+    ]
+
+    # changed_at is now set explicitly, from the database clock; the
+    # column itself is unchanged.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='userchange',
+                    name='changed_at',
+                    field=models.DateTimeField(
+                        default=django.utils.timezone.now),
+                ),
+            ],
+        ),
+    ]
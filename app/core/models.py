@@ -2,16 +2,26 @@
 Database Models
 """
 
-from django.db import models
+from django.db import NotSupportedError, models
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser, BaseUserManager,
     PermissionsMixin
 )
 
+from core import sharding
+
 
 class UserManager(BaseUserManager):
     """Manager for the User model"""
 
+    def get_by_natural_key(self, username):
+        """Look the user up on the shard owning the email."""
+        if self._db is None and sharding.is_sharded():
+            shard = sharding.shard_for_email(username)
+            return self.db_manager(shard).get_by_natural_key(username)
+        return super().get_by_natural_key(username)
+
     def create_user(self, email, password=None, **extra_fields):
         """Create, save and return a new user profile."""
         if not email:
@@ -39,7 +49,156 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    # Embedded in issued tokens; bumped with every password change, which
+    # invalidates the tokens issued before it.
+    token_version = models.PositiveIntegerField(default=0)
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at'], name='core_user_deleted_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        # set_password() leaves the raw password in _password until saved.
+        password_changed = (
+            self._password is not None and not self._state.adding
+            and (update_fields is None or 'password' in update_fields)
+        )
+        if password_changed:
+            self.token_version = models.F('token_version') + 1
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
+        super().save(*args, **kwargs)
+        if password_changed:
+            # Bumped in the same UPDATE as the password; refresh tokens
+            # are revoked with their families.
+            self.refresh_from_db(fields=['token_version'])
+            TokenFamily.objects.filter(user_id=self.pk).delete()
+
+    def soft_delete(self):
+        """Revoke access now and leave the row for the purge command."""
+        self.is_active = False
+        self.deleted_at = timezone.now()
+        self.set_unusable_password()
+        self.save(update_fields=['is_active', 'deleted_at', 'password'])
+
+
+class UserChange(models.Model):
+    """Append-only log entry recording a change to a user."""
+
+    CREATED = 'create'
+    UPDATED = 'update'
+    DELETED = 'delete'
+    ACTION_CHOICES = [
+        (CREATED, 'Created'),
+        (UPDATED, 'Updated'),
+        (DELETED, 'Deleted'),
+    ]
+
+    seq = models.BigAutoField(primary_key=True)
+    user_id = models.BigIntegerField(db_index=True)
+    action = models.CharField(max_length=6, choices=ACTION_CHOICES)
+    # Set by core.changes.record_changes from the database clock.
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['seq']
+
+
+class TokenFamily(models.Model):
+    """
+    Refresh tokens descending from one login.
+
+    Only the current generation may be refreshed; presenting an older one
+    means a token was replayed, and the family is deleted (revoked).
+    """
+
+    # Enough on its own: core.sharding interleaves the shards' user id
+    # sequences, so an id names one user across all shards.
+    user_id = models.BigIntegerField()
+    generation = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+
+    @classmethod
+    def rotate(cls, family_id, generation, expires_at):
+        """Advance the family past `generation`; False if revoked/reused."""
+        advanced = cls.objects.filter(
+            pk=family_id, generation=generation,
+            expires_at__gt=timezone.now(),
+        ).update(generation=models.F('generation') + 1, expires_at=expires_at)
+        if not advanced:
+            cls.objects.filter(pk=family_id).delete()
+        return bool(advanced)
+
+
+class SlowQuery(models.Model):
+    """
+    A query that exceeded SLOW_QUERY_MS or was cancelled by its timeout.
+
+    Statements are stored normalized; plans come from EXPLAIN with the
+    original parameters, so they may include literal values.
+    """
+
+    recorded_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    view_name = models.CharField(max_length=200)
+    database = models.CharField(max_length=64)
+    fingerprint = models.CharField(max_length=16, db_index=True)
+    statement = models.TextField()
+    duration_ms = models.FloatField()
+    timed_out = models.BooleanField(default=False)
+    plan = models.JSONField(null=True, blank=True)
+
+
+class AuditEvent(models.Model):
+    """
+    Append-only record of an authentication event, written by core.audit.
+
+    On PostgreSQL the table is partitioned by month of `occurred_at` (see
+    the audit_partitions command), so filter on it to read few partitions.
+    """
+
+    LOGIN = 'login'
+    LOGIN_FAILED = 'login_failed'
+    REGISTERED = 'register'
+    ACTIVATED = 'activate'
+    PASSWORD_RESET = 'password_reset'
+    DELETED = 'delete'
+    EVENT_CHOICES = [
+        (LOGIN, 'Logged in'),
+        (LOGIN_FAILED, 'Failed login'),
+        (REGISTERED, 'Registered'),
+        (ACTIVATED, 'Activated'),
+        (PASSWORD_RESET, 'Password reset'),
+        (DELETED, 'Deleted'),
+    ]
+
+    occurred_at = models.DateTimeField(default=timezone.now)
+    event = models.CharField(max_length=16, choices=EVENT_CHOICES)
+    user_id = models.BigIntegerField(null=True, blank=True)
+    # The identifier given on failed logins, where no user may exist.
+    identifier = models.CharField(max_length=255, blank=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    request_id = models.CharField(max_length=64, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['occurred_at'], name='core_audit_time_idx'),
+            models.Index(fields=['user_id', 'occurred_at'],
+                         name='core_audit_user_idx'),
+            models.Index(fields=['event', 'occurred_at'],
+                         name='core_audit_event_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise NotSupportedError('Audit events are append-only.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise NotSupportedError('Audit events are append-only.')
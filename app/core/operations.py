@@ -0,0 +1,407 @@
+"""
+Migration operations for changing large tables online, and checks
+flagging operations that would lock them.
+
+On PostgreSQL:
+
+- `AddIndexConcurrently` / `RemoveIndexConcurrently` build and drop
+  indexes without blocking writes.
+- `BatchedBackfill` updates rows in small committed batches.
+- `WithLockTimeout` gives up on a DDL statement that can't get its lock
+  quickly instead of queueing every query behind it, and retries.
+- `CreatePartitionedModel` creates a table partitioned by range, so old
+  data can be dropped a partition at a time.
+
+All but `CreatePartitionedModel` need a migration with `atomic = False`.
+Other databases run the plain equivalents.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+
+from django.db import NotSupportedError, OperationalError, migrations
+from django.db import transaction
+from django.db.migrations.operations.base import Operation
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE raised when lock_timeout expires.
+LOCK_NOT_AVAILABLE = '55P03'
+
+ERROR = 'error'
+WARNING = 'warning'
+
+
+def is_postgres(schema_editor):
+    return schema_editor.connection.vendor == 'postgresql'
+
+
+def ensure_not_in_transaction(operation, schema_editor):
+    if schema_editor.connection.in_atomic_block:
+        raise NotSupportedError(
+            f'{operation.__class__.__name__} cannot run inside a '
+            'transaction; set atomic = False on the migration.')
+
+
+@contextmanager
+def no_statement_timeout(schema_editor):
+    """Lift any statement_timeout (e.g. the role's) for a long operation."""
+    schema_editor.execute('SET statement_timeout = 0')
+    try:
+        yield
+    finally:
+        schema_editor.execute('RESET statement_timeout')
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    """Create an index without blocking writes (CONCURRENTLY)."""
+
+    atomic = False
+
+    def describe(self):
+        return f'Concurrently create index {self.index.name} on field(s) ' \
+               f'{", ".join(self.index.fields)} of model {self.model_name}'
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias,
+                                        model):
+            return
+        if not is_postgres(schema_editor):
+            return schema_editor.add_index(model, self.index)
+        ensure_not_in_transaction(self, schema_editor)
+        with no_statement_timeout(schema_editor):
+            # A failed concurrent build leaves an invalid index behind.
+            if self.index_is_invalid(schema_editor):
+                schema_editor.remove_index(
+                    model, self.index, concurrently=True)
+            schema_editor.add_index(model, self.index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias,
+                                        model):
+            return
+        if not is_postgres(schema_editor):
+            return schema_editor.remove_index(model, self.index)
+        ensure_not_in_transaction(self, schema_editor)
+        with no_statement_timeout(schema_editor):
+            schema_editor.remove_index(model, self.index, concurrently=True)
+
+    def index_is_invalid(self, schema_editor):
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT 1 FROM pg_index JOIN pg_class '
+                'ON pg_class.oid = pg_index.indexrelid '
+                'WHERE pg_class.relname = %s AND NOT pg_index.indisvalid',
+                [self.index.name])
+            return cursor.fetchone() is not None
+
+
+class RemoveIndexConcurrently(migrations.RemoveIndex):
+    """Drop an index without blocking reads or writes (CONCURRENTLY)."""
+
+    atomic = False
+
+    def describe(self):
+        return f'Concurrently remove index {self.name} from {self.model_name}'
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias,
+                                        model):
+            return
+        index = from_state.models[app_label, self.model_name_lower] \
+            .get_index_by_name(self.name)
+        if not is_postgres(schema_editor):
+            return schema_editor.remove_index(model, index)
+        ensure_not_in_transaction(self, schema_editor)
+        with no_statement_timeout(schema_editor):
+            schema_editor.remove_index(model, index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        index = to_state.models[app_label, self.model_name_lower] \
+            .get_index_by_name(self.name)
+        AddIndexConcurrently(self.model_name, index).database_forwards(
+            app_label, schema_editor, from_state, to_state)
+
+
+class WithLockTimeout(Operation):
+    """
+    Run a schema operation with a short lock_timeout, retrying with
+    backoff when it can't get its lock.
+
+    DDL waiting for an ACCESS EXCLUSIVE lock queues every later query on
+    the table behind it; giving up quickly and retrying keeps a long
+    transaction from turning into an outage. Deferred SQL (e.g. foreign
+    key constraints) still runs when the migration ends.
+    """
+
+    reduces_to_sql = False
+    atomic = False
+
+    def __init__(self, operation, lock_timeout='2s', attempts=5, delay=1.0):
+        self.operation = operation
+        self.lock_timeout = lock_timeout
+        self.attempts = attempts
+        self.delay = delay
+
+    def describe(self):
+        return f'{self.operation.describe()} (lock_timeout ' \
+               f'{self.lock_timeout}, {self.attempts} attempts)'
+
+    def state_forwards(self, app_label, state):
+        self.operation.state_forwards(app_label, state)
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        self.run(self.operation.database_forwards, app_label, schema_editor,
+                 from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        self.run(self.operation.database_backwards, app_label,
+                 schema_editor, from_state, to_state)
+
+    def run(self, method, app_label, schema_editor, from_state, to_state):
+        if not is_postgres(schema_editor):
+            return method(app_label, schema_editor, from_state, to_state)
+        ensure_not_in_transaction(self, schema_editor)
+        alias = schema_editor.connection.alias
+        for attempt in range(1, self.attempts + 1):
+            try:
+                with transaction.atomic(using=alias):
+                    schema_editor.execute(
+                        'SET LOCAL lock_timeout = %s', [self.lock_timeout])
+                    # Only waiting for the lock is bounded, not the DDL.
+                    schema_editor.execute('SET LOCAL statement_timeout = 0')
+                    return method(
+                        app_label, schema_editor, from_state, to_state)
+            except OperationalError as exc:
+                code = getattr(exc.__cause__, 'pgcode', None) or getattr(
+                    exc.__cause__, 'sqlstate', None)
+                if code != LOCK_NOT_AVAILABLE or attempt == self.attempts:
+                    raise
+            wait = self.delay * 2 ** (attempt - 1)
+            logger.warning('%s: lock not available, retrying in %.1fs',
+                           self.operation.describe(), wait)
+            time.sleep(wait)
+
+
+class BatchedBackfill(Operation):
+    """
+    Update existing rows in small committed batches.
+
+    `values` are passed to `QuerySet.update()` (constants or expressions);
+    only rows matching `filter` are touched, in primary key order.
+    Progress is logged after each batch, and `sleep` seconds between
+    batches leave room for replication and other writers.
+    """
+
+    reduces_to_sql = False
+    reversible = True
+    atomic = False
+
+    def __init__(self, model_name, values, filter=None, batch_size=1000,
+                 sleep=0.0, reverse_values=None):
+        self.model_name = model_name
+        self.values = values
+        self.filter = filter or {}
+        self.batch_size = batch_size
+        self.sleep = sleep
+        self.reverse_values = reverse_values
+
+    def describe(self):
+        return f'Backfill {", ".join(self.values)} on {self.model_name} ' \
+               f'in batches of {self.batch_size}'
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        self.backfill(app_label, schema_editor, to_state, self.values)
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if self.reverse_values:
+            self.backfill(app_label, schema_editor, to_state,
+                          self.reverse_values)
+
+    def backfill(self, app_label, schema_editor, state, values):
+        alias = schema_editor.connection.alias
+        model = state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(alias, model):
+            return
+        if not is_postgres(schema_editor):
+            return self.run_batches(alias, model, values)
+        # Counting and batching a large table can outlast a
+        # statement_timeout set on the role or database.
+        with no_statement_timeout(schema_editor):
+            self.run_batches(alias, model, values)
+
+    def run_batches(self, alias, model, values):
+        queryset = model._base_manager.using(alias).filter(**self.filter)
+        total = queryset.count()
+        done = 0
+        last_pk = None
+        while True:
+            batch = queryset.order_by('pk')
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            pks = list(batch.values_list('pk', flat=True)[:self.batch_size])
+            if not pks:
+                break
+            last_pk = pks[-1]
+            with transaction.atomic(using=alias):
+                done += model._base_manager.using(alias).filter(
+                    pk__in=pks).update(**values)
+            logger.info('%s: %d/%d rows', self.describe(), done, total)
+            if self.sleep:
+                time.sleep(self.sleep)
+
+
+class CreatePartitionedModel(migrations.CreateModel):
+    """
+    Create a model's table partitioned by range of `partition_key`, with a
+    DEFAULT partition catching rows outside every other partition.
+
+    PostgreSQL requires the partition key in the primary key, so the
+    table's key is (pk, partition_key); the pk stays unique through its
+    identity sequence. Partitions are then managed outside migrations.
+    """
+
+    def __init__(self, name, fields, partition_key, **kwargs):
+        self.partition_key = partition_key
+        super().__init__(name, fields, **kwargs)
+
+    def deconstruct(self):
+        name, args, kwargs = super().deconstruct()
+        kwargs['partition_key'] = self.partition_key
+        return name, args, kwargs
+
+    def describe(self):
+        return f'{super().describe()} partitioned by {self.partition_key}'
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        model = to_state.apps.get_model(app_label, self.name)
+        if not self.allow_migrate_model(schema_editor.connection.alias,
+                                        model):
+            return
+        if not is_postgres(schema_editor):
+            return schema_editor.create_model(model)
+        quote = schema_editor.quote_name
+        table = model._meta.db_table
+        pk = quote(model._meta.pk.column)
+        key = quote(model._meta.get_field(self.partition_key).column)
+        sql, params = schema_editor.table_sql(model)
+        # Move the inline PRIMARY KEY of the pk column to a composite one.
+        sql = sql.replace(' PRIMARY KEY', '', 1)
+        sql = f'{sql[:-1]}, PRIMARY KEY ({pk}, {key})) ' \
+              f'PARTITION BY RANGE ({key})'
+        schema_editor.execute(sql, params or None)
+        schema_editor.execute(
+            f'CREATE TABLE {quote(table + "_default")} '
+            f'PARTITION OF {quote(table)} DEFAULT')
+        for index in model._meta.indexes:
+            schema_editor.add_index(model, index)
+
+
+# Operations only needing a name check; the rest are inspected below.
+UNSAFE = {
+    migrations.AddIndex: (
+        ERROR, 'builds the index while blocking writes; use '
+               'AddIndexConcurrently'),
+    migrations.RemoveIndex: (
+        WARNING, 'takes an ACCESS EXCLUSIVE lock; use '
+                 'RemoveIndexConcurrently'),
+    migrations.AddConstraint: (
+        ERROR, 'validates every row while blocking writes'),
+    migrations.AlterField: (
+        WARNING, 'may rewrite or scan the table under an ACCESS '
+                 'EXCLUSIVE lock'),
+    migrations.RenameField: (
+        ERROR, 'breaks code still running during the deploy'),
+    migrations.RenameModel: (
+        ERROR, 'breaks code still running during the deploy'),
+    migrations.RemoveField: (
+        WARNING, 'breaks code still running during the deploy unless the '
+                 'field was unused in the previous release'),
+    migrations.DeleteModel: (
+        WARNING, 'breaks code still running during the deploy unless the '
+                 'model was unused in the previous release'),
+    migrations.RunSQL: (WARNING, 'raw SQL needs a manual review'),
+}
+# DDL that needs an ACCESS EXCLUSIVE lock and should use WithLockTimeout.
+LOCKING = (
+    migrations.AddField, migrations.AlterField, migrations.RemoveField,
+    migrations.RenameField, migrations.AddConstraint,
+    migrations.RemoveConstraint, migrations.RemoveIndex,
+)
+
+
+def check_operation(operation, migration, guarded=False):
+    """Return (level, message) pairs for an operation on an existing table."""
+    if isinstance(operation, WithLockTimeout):
+        return check_operation(operation.operation, migration, guarded=True)
+    findings = []
+    # Exact types: subclasses such as AddIndexConcurrently are safe.
+    if type(operation) in UNSAFE:
+        findings.append(UNSAFE[type(operation)])
+    if isinstance(operation, migrations.AddField):
+        field = operation.field
+        if (field.db_index or field.unique) and not field.primary_key:
+            findings.append((
+                ERROR, 'builds an index while blocking writes; add the field '
+                       'without one, then use AddIndexConcurrently'))
+        if not field.null and not field.has_default():
+            findings.append((ERROR, 'fails on a populated table; add a '
+                                    'default or make the field nullable'))
+    if isinstance(operation, (migrations.RunPython, BatchedBackfill)) \
+            and migration.atomic:
+        findings.append((
+            WARNING, 'holds its row locks until the whole migration '
+                     'commits; use BatchedBackfill with atomic = False'))
+    if isinstance(operation, LOCKING) and not guarded:
+        findings.append((WARNING, 'waits for its lock indefinitely; wrap it '
+                                  'in WithLockTimeout'))
+    return findings
+
+
+def model_of(operation):
+    if isinstance(operation, WithLockTimeout):
+        return model_of(operation.operation)
+    name = getattr(operation, 'model_name', None)
+    if name is None and isinstance(operation, migrations.CreateModel):
+        name = operation.name
+    return name and name.lower()
+
+
+def check_plan(plan, skip_new_tables=True):
+    """
+    Return (migration, operation, level, message) for every unsafe
+    operation in a migration plan. Operations on tables created earlier
+    in the plan are skipped unless `skip_new_tables` is False: those
+    tables are empty.
+    """
+    created = set()
+    findings = []
+    for migration, backwards in plan:
+        if backwards:
+            continue
+        for operation in migration.operations:
+            model = (migration.app_label, model_of(operation))
+            if isinstance(operation, migrations.CreateModel):
+                created.add(model)
+                continue
+            if skip_new_tables and model in created:
+                continue
+            for level, message in check_operation(operation, migration):
+                findings.append((migration, operation, level, message))
+    return findings
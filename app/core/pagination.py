@@ -0,0 +1,72 @@
+"""
+Pagination classes for the core API views.
+"""
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class SequencePagination(BasePagination):
+    """Keyset pagination over a monotonically increasing sequence field.
+
+    Clients pass the last sequence number they have seen as `since` and get
+    the next batch back, together with the cursor to use for the next call.
+    """
+
+    sequence_field = 'seq'
+    since_query_param = 'since'
+    limit_query_param = 'limit'
+    default_limit = 100
+    max_limit = 1000
+
+    def get_int_param(self, request, name, default):
+        try:
+            return int(request.query_params.get(name, default))
+        except ValueError:
+            raise ValidationError({name: 'Must be an integer.'})
+
+    def get_since(self, request):
+        return self.get_int_param(request, self.since_query_param, 0)
+
+    def get_limit(self, request):
+        limit = self.get_int_param(
+            request, self.limit_query_param, self.default_limit)
+        return max(1, min(limit, self.max_limit))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.since = self.get_since(request)
+        self.limit = self.get_limit(request)
+        field = self.sequence_field
+        # Fetch one extra row to know whether another batch is waiting.
+        page = list(
+            queryset.filter(**{f'{field}__gt': self.since})
+            .order_by(field)[:self.limit + 1]
+        )
+        self.has_more = len(page) > self.limit
+        page = page[:self.limit]
+        self.next_since = getattr(page[-1], field) if page else self.since
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.next_since,
+            'has_more': self.has_more,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'integer'},
+                'has_more': {'type': 'boolean'},
+                'results': schema,
+            },
+        }
+
+
+class AuditEventPagination(SequencePagination):
+    """Keyset pagination of audit events by id, in insertion order."""
+
+    sequence_field = 'id'
@@ -0,0 +1,238 @@
+"""
+Low-overhead sampling profiler for request-serving threads.
+
+While running, a background thread wakes `hz` times a second, reads the
+stacks of threads currently serving a request (`sys._current_frames`) and
+counts them per URL name. Nothing is traced, so request threads only pay
+for labelling themselves in `ProfilingMiddleware`.
+
+Profiles are exported as collapsed stacks (flamegraph.pl, speedscope,
+inferno) or speedscope JSON, and per-worker dumps are combined with the
+`merge_profiles` command.
+"""
+
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+UNRESOLVED = '<unresolved>'
+MAX_DEPTH = 128
+
+
+class SamplingProfiler:
+    """Periodically sample the stacks of labelled threads."""
+
+    def __init__(self):
+        # Thread ident -> label, set by the middleware for the request.
+        self.labels = {}
+        self.samples = Counter()
+        self.hz = None
+        self.started_at = None
+        self._lock = threading.Lock()
+        self._names = {}
+        self._thread = None
+        self._stopped = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, hz=None):
+        """Start sampling; returns False if already running."""
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self.hz = hz or settings.PROFILING_HZ
+            self.started_at = time.time()
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='sampling-profiler', daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self):
+        """Stop sampling, keeping the collected samples."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return False
+        self._stopped.set()
+        thread.join()
+        return True
+
+    def reset(self):
+        with self._lock:
+            self.samples = Counter()
+            self.started_at = time.time() if self.running else None
+
+    def snapshot(self):
+        """Return a copy of the samples: {(label, stack): count}."""
+        with self._lock:
+            return Counter(self.samples)
+
+    def frame_name(self, code):
+        name = self._names.get(code)
+        if name is None:
+            filename = os.path.basename(code.co_filename)
+            name = self._names[code] = (
+                f'{code.co_name} ({filename}:{code.co_firstlineno})')
+        return name
+
+    def sample(self):
+        """Record the current stack of every labelled thread."""
+        if not self.labels:
+            return
+        frames = sys._current_frames()
+        stacks = []
+        for ident, label in list(self.labels.items()):
+            frame = frames.get(ident)
+            stack = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                stack.append(self.frame_name(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                stacks.append((label, tuple(reversed(stack))))
+        with self._lock:
+            self.samples.update(stacks)
+
+    def _run(self):
+        interval = 1 / self.hz
+        while not self._stopped.wait(interval):
+            self.sample()
+
+
+profiler = SamplingProfiler()
+
+
+def to_collapsed(samples):
+    """Render samples as collapsed stacks: 'label;frame;frame count'."""
+    lines = [
+        ';'.join((label,) + stack) + f' {count}'
+        for (label, stack), count in sorted(samples.items())
+    ]
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+def parse_collapsed(text):
+    """Parse collapsed stacks back into samples."""
+    samples = Counter()
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        stack, _, count = line.rpartition(' ')
+        label, *frames = stack.split(';')
+        samples[label, tuple(frames)] += int(count)
+    return samples
+
+
+def to_speedscope(samples, name='profile'):
+    """Render samples as a speedscope document, one profile per label."""
+    frames = []
+    index = {}
+    profiles = {}
+    for (label, stack), count in sorted(samples.items()):
+        profile = profiles.setdefault(label, {
+            'type': 'sampled', 'name': label, 'unit': 'none',
+            'startValue': 0, 'endValue': 0, 'samples': [], 'weights': [],
+        })
+        ids = []
+        for frame in stack:
+            if frame not in index:
+                index[frame] = len(frames)
+                frames.append({'name': frame})
+            ids.append(index[frame])
+        profile['samples'].append(ids)
+        profile['weights'].append(count)
+        profile['endValue'] += count
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': name,
+        'shared': {'frames': frames},
+        'profiles': list(profiles.values()),
+    }
+
+
+def render(samples, output):
+    """Serialize samples in the given output format."""
+    if output == 'speedscope':
+        return json.dumps(to_speedscope(samples))
+    return to_collapsed(samples)
+
+
+def dump(directory=None):
+    """Write this worker's samples as collapsed stacks; return the path."""
+    directory = directory or settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(
+        directory, f'{socket.gethostname()}-{os.getpid()}.collapsed')
+    with open(path, 'w') as f:
+        f.write(to_collapsed(profiler.snapshot()))
+    return path
+
+
+toggle_requested = threading.Event()
+
+
+def toggle():
+    """Start the profiler, or stop it and dump the samples."""
+    if profiler.stop():
+        dump()
+        profiler.reset()
+    else:
+        profiler.start()
+
+
+def request_toggle(signum, frame):
+    # Signal handlers run on the main thread between bytecodes, possibly
+    # while it holds the profiler lock, so leave the work to watch_toggles.
+    toggle_requested.set()
+
+
+def watch_toggles():
+    """Toggle the profiler each time the signal handler asks for it."""
+    while True:
+        toggle_requested.wait()
+        toggle_requested.clear()
+        toggle()
+
+
+def install_signal_handler():
+    """Toggle profiling on PROFILING_SIGNAL (e.g. 'SIGUSR2'), if set."""
+    name = settings.PROFILING_SIGNAL
+    if not name or threading.current_thread() is not threading.main_thread():
+        return False
+    threading.Thread(
+        target=watch_toggles, name='profiler-toggle', daemon=True).start()
+    signal.signal(getattr(signal, name), request_toggle)
+    return True
+
+
+class ProfilingMiddleware:
+    """Label request threads with their URL name while profiling."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profiler.running:
+            return self.get_response(request)
+        ident = threading.get_ident()
+        profiler.labels[ident] = UNRESOLVED
+        try:
+            return self.get_response(request)
+        finally:
+            profiler.labels.pop(ident, None)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        ident = threading.get_ident()
+        if ident in profiler.labels:
+            match = request.resolver_match
+            profiler.labels[ident] = match.view_name or match._func_path
@@ -0,0 +1,22 @@
+"""
+OpenAPI extensions for the core subclasses of simplejwt classes.
+
+drf-spectacular matches extensions by exact class, so the built-in
+simplejwt ones don't apply to these subclasses.
+"""
+
+from drf_spectacular.contrib import rest_framework_simplejwt as simplejwt
+
+
+class JWTScheme(simplejwt.SimpleJWTScheme):
+    target_class = 'core.authentication.JWTAuthentication'
+
+
+class TokenObtainPairSerializerExtension(
+        simplejwt.TokenObtainPairSerializerExtension):
+    target_class = 'core.serializers.TokenObtainPairSerializer'
+
+
+class TokenRefreshSerializerExtension(
+        simplejwt.TokenRefreshSerializerExtension):
+    target_class = 'core.serializers.TokenRefreshSerializer'
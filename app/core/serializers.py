@@ -3,7 +3,26 @@ Serializers for the User API Views.
 """
 
 from django.contrib.auth import get_user_model
-from rest_framework import serializers
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from djoser import serializers as djoser_serializers, utils
+from djoser.conf import settings as djoser_settings
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
+from rest_framework import exceptions, serializers
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from core import audit, sharding
+from core.authentication import VERSION_CLAIM
+from core.last_login import buffer as last_login_buffer
+from core.models import AuditEvent, TokenFamily, UserChange
+from core.tokens import activation_tokens, password_reset_tokens
+
+# Refresh token claims naming its family and generation.
+FAMILY_CLAIM = 'fam'
+GENERATION_CLAIM = 'gen'
 
 
 class CustomUserSerializer(serializers.ModelSerializer):
@@ -21,3 +40,249 @@ class CustomUserSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         """Create a new user with encrypted password and return it."""
         return get_user_model().objects.create_user(**validated_data)
+
+
+class UserCreateSerializer(djoser_serializers.UserCreateSerializer):
+    """Registration serializer rejecting taken emails before any hashing.
+
+    The email is normalized as `create_user` would store it and looked up
+    on its shard, so duplicates fail validation instead of the unique
+    constraint. An email held by a soft-deleted user is free again: that
+    row is purged right before the new user is created.
+    """
+
+    class Meta(djoser_serializers.UserCreateSerializer.Meta):
+        extra_kwargs = {'email': {'validators': []}}
+
+    def validate_email(self, value):
+        User = get_user_model()
+        email = User.objects.normalize_email(value)
+        shard = sharding.shard_for_email(email)
+        taken = User.objects.db_manager(shard).filter(
+            email=email, deleted_at__isnull=True)
+        if taken.exists():
+            field = User._meta.get_field('email')
+            raise serializers.ValidationError(
+                f'{User._meta.verbose_name} with this {field.verbose_name} '
+                'already exists.'
+            )
+        return email
+
+    def perform_create(self, validated_data):
+        User = get_user_model()
+        shard = sharding.shard_for_email(validated_data['email'])
+        with transaction.atomic(using=shard):
+            User.objects.db_manager(shard).filter(
+                email=validated_data['email'], deleted_at__isnull=False,
+            ).delete()
+            return super().perform_create(validated_data)
+
+
+class ShardEmailResetSerializer(djoser_serializers.SendEmailResetSerializer):
+    """Email lookup for resets and activation resends on the email's shard.
+
+    Soft-deleted users are never found, so they get no more mail.
+    """
+
+    def get_user(self, is_active=True):
+        User = get_user_model()
+        email = self.data.get(self.email_field, '')
+        user = User.objects.db_manager(sharding.shard_for_email(email)).filter(
+            email=email, is_active=is_active, deleted_at__isnull=True,
+        ).first()
+        if user is not None and user.has_usable_password():
+            return user
+        if (djoser_settings.PASSWORD_RESET_SHOW_EMAIL_NOT_FOUND
+                or djoser_settings.USERNAME_RESET_SHOW_EMAIL_NOT_FOUND):
+            self.fail('email_not_found')
+
+
+class SignedUidAndTokenSerializer(serializers.Serializer):
+    """Validate a uid and a core signed token without a database query."""
+
+    uid = serializers.CharField()
+    token = serializers.CharField()
+
+    token_service = None
+
+    default_error_messages = {
+        'invalid_token':
+            djoser_settings.CONSTANTS.messages.INVALID_TOKEN_ERROR,
+        'invalid_uid':
+            djoser_settings.CONSTANTS.messages.INVALID_UID_ERROR,
+        'stale_token':
+            djoser_settings.CONSTANTS.messages.STALE_TOKEN_ERROR,
+    }
+
+    def validate(self, attrs):
+        self.check_token(attrs)
+        return super().validate(attrs)
+
+    def check_token(self, attrs):
+        """Check signature and expiry; set `user_id`, `shard`, `payload`."""
+        try:
+            self.user_id = int(utils.decode_uid(attrs['uid']))
+        except (ValueError, TypeError, OverflowError):
+            raise serializers.ValidationError(
+                {'uid': [self.error_messages['invalid_uid']]},
+                code='invalid_uid',
+            )
+        self.payload = self.token_service.load(attrs['token'])
+        if self.payload is not None:
+            self.shard = self.token_service.shard(self.payload)
+        if (self.payload is None or self.payload['u'] != self.user_id
+                or not sharding.is_shard(self.shard)):
+            raise serializers.ValidationError(
+                {'token': [self.error_messages['invalid_token']]},
+                code='invalid_token',
+            )
+
+
+class ActivationSerializer(SignedUidAndTokenSerializer):
+    """Activation token serializer; the view activates in one UPDATE
+    conditional on the token_version the token was issued for."""
+
+    token_service = activation_tokens
+
+
+class PasswordResetConfirmSerializer(SignedUidAndTokenSerializer,
+                                     djoser_serializers.PasswordSerializer):
+    """Reset confirmation fetching the user only for a well-formed token."""
+
+    token_service = password_reset_tokens
+
+    def check_token(self, attrs):
+        super().check_token(attrs)
+        if self.token_service.is_used(attrs['token']):
+            raise exceptions.PermissionDenied(
+                self.error_messages['stale_token'])
+        User = get_user_model()
+        try:
+            self.user = User.objects.db_manager(self.shard).get(
+                pk=self.user_id)
+        except User.DoesNotExist:
+            raise serializers.ValidationError(
+                {'uid': [self.error_messages['invalid_uid']]},
+                code='invalid_uid',
+            )
+        if not self.token_service.check_password(self.payload, self.user):
+            raise serializers.ValidationError(
+                {'token': [self.error_messages['invalid_token']]},
+                code='invalid_token',
+            )
+
+
+class PasswordResetConfirmRetypeSerializer(
+    PasswordResetConfirmSerializer, djoser_serializers.PasswordRetypeSerializer
+):
+    pass
+
+
+class UserChangeSerializer(serializers.ModelSerializer):
+    """Serializer for user change feed entries."""
+
+    user = serializers.SerializerMethodField()
+
+    class Meta:
+        """Meta class for the serializer."""
+        model = UserChange
+        fields = ('seq', 'user_id', 'action', 'changed_at', 'user')
+
+    @extend_schema_field(OpenApiTypes.OBJECT)
+    def get_user(self, obj):
+        """Return the current state of the user, or None once deleted."""
+        user = self.context.get('users', {}).get(obj.user_id)
+        if user is None:
+            return None
+        return {
+            'email': user.email,
+            'name': user.name,
+            'is_active': user.is_active,
+            'is_staff': user.is_staff,
+        }
+
+
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    """Token pair serializer recording last_login through the buffer."""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token[sharding.SHARD_CLAIM] = user._state.db
+        token[VERSION_CLAIM] = user.token_version
+        family = TokenFamily.objects.create(
+            user_id=user.pk, expires_at=datetime_from_epoch(token['exp']))
+        token[FAMILY_CLAIM] = family.pk
+        token[GENERATION_CLAIM] = family.generation
+        return token
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        last_login_buffer.record(self.user.pk, using=self.user._state.db)
+        audit.record(AuditEvent.LOGIN, self.user.pk,
+                     request=self.context.get('request'))
+        return data
+
+
+class ProfilerSerializer(serializers.Serializer):
+    """Start, stop or reset the sampling profiler."""
+
+    running = serializers.BooleanField()
+    hz = serializers.IntegerField(min_value=1, max_value=1000, required=False)
+    reset = serializers.BooleanField(default=False)
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """Rotate refresh tokens within their family.
+
+    Each refresh is one conditional UPDATE moving the family to the next
+    generation; replaying an older token revokes the whole family.
+    """
+
+    default_error_messages = {
+        'revoked': _('Token has been revoked or was already used.'),
+    }
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        family = refresh.get(FAMILY_CLAIM)
+        generation = refresh.get(GENERATION_CLAIM)
+        if family is None or generation is None:
+            raise InvalidToken(self.error_messages['revoked'])
+
+        refresh.set_jti()
+        refresh.set_exp()
+        refresh.set_iat()
+        refresh[GENERATION_CLAIM] = generation + 1
+        expires_at = datetime_from_epoch(refresh['exp'])
+        if not TokenFamily.rotate(family, generation, expires_at):
+            raise InvalidToken(self.error_messages['revoked'])
+        return {'access': str(refresh.access_token), 'refresh': str(refresh)}
+
+
+class AuditEventSerializer(serializers.ModelSerializer):
+    """An audit event as returned by the audit API."""
+
+    class Meta:
+        model = AuditEvent
+        fields = [
+            'id', 'occurred_at', 'event', 'user_id', 'identifier',
+            'ip_address', 'request_id',
+        ]
+
+
+class AuditEventFilterSerializer(serializers.Serializer):
+    """Query parameters of the audit API; `end` is exclusive."""
+
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    event = serializers.ChoiceField(
+        choices=AuditEvent.EVENT_CHOICES, required=False)
+    user_id = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if 'start' in attrs and 'end' in attrs \
+                and attrs['start'] >= attrs['end']:
+            raise exceptions.ValidationError(
+                {'end': 'Must be after start.'})
+        return attrs
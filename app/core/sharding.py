@@ -0,0 +1,169 @@
+"""
+Optional horizontal sharding of users by email.
+
+Each user lives on the database alias picked by a stable hash of the
+normalized email, out of `settings.USER_SHARDS` (just 'default' unless
+sharding is configured). Issued JWTs, and activation and reset tokens,
+carry the alias so requests go straight to the right database.
+
+Only `core.User` (and its group/permission links) is sharded; everything
+else stays on 'default'. User ids are unique across shards: migrating a
+shard interleaves its id sequence with the others', so a moved user keeps
+its id and an id never names two people. Lookups that only know an id
+(the admin, the change feed) can therefore search every shard.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.base_user import BaseUserManager
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+SHARD_CLAIM = 'shard'
+
+
+def get_shards():
+    """Return the configured user shard aliases."""
+    return list(getattr(settings, 'USER_SHARDS', [DEFAULT_DB_ALIAS]))
+
+
+def is_sharded():
+    return len(get_shards()) > 1
+
+
+def is_shard(alias):
+    return alias in get_shards()
+
+
+def shard_for_email(email):
+    """Return the shard alias owning `email`."""
+    shards = get_shards()
+    normalized = BaseUserManager.normalize_email(email)
+    digest = hashlib.blake2b(normalized.encode(), digest_size=8).digest()
+    return shards[int.from_bytes(digest, 'big') % len(shards)]
+
+
+def _user_id_sequence(cursor, table):
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+    return cursor.fetchone()[0]
+
+
+def interleave_user_ids(alias, start_after=0, stride=None):
+    """
+    Make the user id sequence on `alias` hand out ids that never collide
+    with other shards, so rows keep their pk when rebalanced.
+
+    Shard `i` allocates ids congruent to `i` modulo `stride`, above
+    `start_after` (the highest id on any shard).
+    Returns False on backends without sequences.
+    """
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return False
+    from core.models import User
+
+    stride = stride or settings.USER_SHARD_ID_STRIDE
+    index = get_shards().index(alias)
+    with connection.cursor() as cursor:
+        sequence = _user_id_sequence(cursor, User._meta.db_table)
+        cursor.execute(
+            f'SELECT COALESCE(MAX(id), 0) FROM {User._meta.db_table}')
+        highest = max(start_after, cursor.fetchone()[0])
+        start = (highest // stride + 1) * stride + index
+        cursor.execute(
+            f'ALTER SEQUENCE {sequence} '
+            f'INCREMENT BY {stride} RESTART WITH {start}')
+    return True
+
+
+def is_interleaved(alias):
+    """
+    Whether the user id sequence on `alias` steps by USER_SHARD_ID_STRIDE;
+    None on backends without sequences.
+    """
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return None
+    from core.models import User
+
+    with connection.cursor() as cursor:
+        sequence = _user_id_sequence(cursor, User._meta.db_table)
+        cursor.execute(
+            'SELECT seqincrement FROM pg_sequence '
+            'WHERE seqrelid = %s::regclass', [sequence])
+        return cursor.fetchone()[0] == settings.USER_SHARD_ID_STRIDE
+
+
+def highest_user_id():
+    """Return the highest user id on any shard that has the table yet."""
+    from core.models import User
+
+    highest = 0
+    for alias in get_shards():
+        try:
+            found = User.objects.using(alias).order_by('-pk').values_list(
+                'pk', flat=True).first()
+        except DatabaseError:
+            # Not migrated yet, so it holds no users either.
+            continue
+        highest = max(highest, found or 0)
+    return highest
+
+
+def ensure_interleaved(alias):
+    """Interleave the id sequence of shard `alias` unless already done."""
+    if not is_sharded() or not is_shard(alias):
+        return False
+    if is_interleaved(alias) is not False:
+        return False
+    if len(get_shards()) > settings.USER_SHARD_ID_STRIDE:
+        raise ImproperlyConfigured(
+            'USER_SHARD_ID_STRIDE is smaller than the shard count.')
+    return interleave_user_ids(alias, highest_user_id())
+
+
+def users_in_bulk(ids):
+    """Return {id: user} for `ids`, wherever each user lives."""
+    manager = get_user_model()._default_manager
+    found, missing = {}, set(ids)
+    for alias in get_shards():
+        if not missing:
+            break
+        found.update(manager.using(alias).in_bulk(missing))
+        missing.difference_update(found)
+    return found
+
+
+class UserShardRouter:
+    """Route new users to their email shard and keep the rest in place.
+
+    Shards other than 'default' only get the tables users need: the user
+    model (and its links), auth and contenttypes.
+    """
+
+    shard_apps = {'auth', 'contenttypes'}
+
+    def _is_user_model(self, app_label, model_name):
+        # Compared by name: DatabaseCache routes a stand-in with no label.
+        user_app, user_model = settings.AUTH_USER_MODEL.lower().split('.')
+        return app_label == user_app and model_name == user_model
+
+    def db_for_write(self, model, **hints):
+        instance = hints.get('instance')
+        if (
+            self._is_user_model(model._meta.app_label, model._meta.model_name)
+            and instance is not None
+            and not instance._state.db
+            and instance.email
+        ):
+            return shard_for_email(instance.email)
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == DEFAULT_DB_ALIAS or not is_shard(db):
+            return None
+        if app_label in self.shard_apps:
+            return True
+        return self._is_user_model(app_label, model_name)
@@ -0,0 +1,104 @@
+"""
+Signal receivers for the core app.
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.contrib.auth.signals import user_login_failed
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_migrate, post_save,
+)
+from django.dispatch import Signal, receiver
+from djoser.signals import user_registered
+
+from core import audit, backends, changes, sharding
+from core.models import AuditEvent, User, UserChange
+
+# Sent once per chunk by core.bulk.set_user_flags with `user_ids` and `flags`.
+users_bulk_updated = Signal()
+
+
+@receiver(post_save, sender=User)
+def record_user_saved(sender, instance, created, raw=False, **kwargs):
+    """Append a change entry whenever a user is saved."""
+    if raw:
+        return
+    action = UserChange.CREATED if created else UserChange.UPDATED
+    changes.record_change(instance.pk, action)
+
+
+@receiver(post_delete, sender=User)
+def record_user_deleted(sender, instance, **kwargs):
+    """Append a change entry whenever a user is deleted."""
+    changes.record_change(instance.pk, UserChange.DELETED)
+
+
+def after_commit(using, func, *args):
+    """
+    Run `func(*args)` once the transaction on `using` commits.
+
+    Invalidating earlier would let a concurrent request cache the old
+    permissions again before the change is visible, for the whole TTL.
+    """
+    transaction.on_commit(lambda: func(*args), using=using)
+
+
+@receiver(post_save, sender=User)
+def invalidate_saved_user_permissions(sender, instance, created, using,
+                                      **kwargs):
+    """Drop cached permissions when flags like is_superuser may change."""
+    if not created:
+        after_commit(
+            using, backends.invalidate_user_permissions, [instance.pk])
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_user_permissions(sender, instance, action, reverse, pk_set,
+                                using, **kwargs):
+    """Drop cached permissions of users whose groups or perms changed."""
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        after_commit(
+            using, backends.invalidate_user_permissions, [instance.pk])
+    elif pk_set is None:
+        # Clearing from the group/permission side: affected users unknown.
+        after_commit(using, backends.bump_permissions_version)
+    else:
+        after_commit(
+            using, backends.invalidate_user_permissions, list(pk_set))
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_group_permissions(sender, action, using, **kwargs):
+    """Invalidate all cached permissions when a group's perms change."""
+    if action.startswith('post_'):
+        after_commit(using, backends.bump_permissions_version)
+
+
+@receiver(post_delete, sender=Group)
+def invalidate_deleted_group_permissions(sender, using, **kwargs):
+    """Invalidate all cached permissions when a group is deleted."""
+    after_commit(using, backends.bump_permissions_version)
+
+
+@receiver(user_login_failed)
+def audit_login_failed(sender, credentials, request=None, **kwargs):
+    """Audit failed logins with the identifier that was tried."""
+    identifier = credentials.get(get_user_model().USERNAME_FIELD) or ''
+    audit.record(AuditEvent.LOGIN_FAILED, identifier=str(identifier),
+                 request=request)
+
+
+@receiver(user_registered)
+def audit_registered(sender, user, request=None, **kwargs):
+    audit.record(AuditEvent.REGISTERED, user.pk, request=request)
+
+
+@receiver(post_migrate)
+def interleave_shard_user_ids(sender, using, **kwargs):
+    """Give every migrated shard an id sequence disjoint from the others."""
+    if sender.label == 'core':
+        sharding.ensure_interleaved(using)
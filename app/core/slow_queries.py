@@ -0,0 +1,252 @@
+"""
+Per-request database time budgets and slow-query capture.
+
+`QueryBudgetMiddleware` gives each request a `statement_timeout`: the
+budget of its endpoint class in `DB_TIME_BUDGETS`, or
+`DB_STATEMENT_TIMEOUT`. Only connections of processes serving requests
+get one, so migrations and management commands are not cut short. The
+middleware also hands queries slower than `SLOW_QUERY_MS` to a background
+thread that stores them with their plans in `SlowQuery`, aggregated by
+`slow_query_report`.
+"""
+
+import hashlib
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import (
+    DatabaseError, OperationalError, close_old_connections, connections,
+)
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE of a statement cancelled by statement_timeout.
+QUERY_CANCELED = '57014'
+UNRESOLVED = '<unresolved>'
+# libpq's PQTRANS_IDLE: connected, no transaction in progress.
+TRANSACTION_IDLE = 0
+
+LITERALS = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\s+'), ' '),
+    (re.compile(r'\(\?(?:, \?)*\)'), '(...)'),
+    (re.compile(r'\(\.\.\.\)(?:, \(\.\.\.\))+'), '(...), ...'),
+]
+
+
+def normalize_sql(sql):
+    """Replace literals and parameter lists so similar queries match."""
+    for pattern, replacement in LITERALS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def fingerprint(statement):
+    return hashlib.blake2b(statement.encode(), digest_size=8).hexdigest()
+
+
+def is_timeout(exc):
+    cause = exc.__cause__
+    code = getattr(cause, 'pgcode', None) or getattr(cause, 'sqlstate', None)
+    return code == QUERY_CANCELED
+
+
+@receiver(connection_created)
+def forget_session_budget(sender, connection, **kwargs):
+    # A new session starts with the role's statement_timeout.
+    connection.statement_timeout_ms = None
+
+
+class QueryMonitor:
+    """
+    Execute wrapper applying a statement timeout and timing queries.
+
+    Autocommit statements run under a session-level `SET`, issued only
+    when the connection's current budget differs, so consecutive requests
+    of the same endpoint class don't pay for it. Transactions that need
+    another budget get `SET LOCAL` before their first statement.
+    """
+
+    def __init__(self, budget_ms=None, threshold_ms=None):
+        self.budget_ms = budget_ms
+        self.threshold_ms = threshold_ms
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        connection = context['connection']
+        if connection.vendor == 'postgresql':
+            self.apply_budget(connection, context['cursor'].cursor)
+        timed_out = False
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as exc:
+            timed_out = is_timeout(exc)
+            raise
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            if timed_out or (self.threshold_ms is not None
+                             and duration >= self.threshold_ms):
+                self.slow.append({
+                    'database': connection.alias, 'sql': sql,
+                    'params': None if many else params,
+                    'duration_ms': duration, 'timed_out': timed_out,
+                })
+
+    def apply_budget(self, connection, cursor):
+        budget_ms = int(self.budget_ms or 0)
+        current = getattr(connection, 'statement_timeout_ms', None)
+        # None: still the role's default, which budget-less routes keep.
+        if budget_ms == (current or 0):
+            return
+        timeout = f'statement_timeout = {budget_ms}'
+        if connection.get_autocommit():
+            cursor.execute(f'SET {timeout}')
+            connection.statement_timeout_ms = budget_ms
+        elif (connection.connection.info.transaction_status
+              == TRANSACTION_IDLE):
+            # The next statement opens a transaction; scope the budget to it.
+            cursor.execute(f'SET LOCAL {timeout}')
+
+
+def explain(database, sql, params):
+    """Return the plan of a SELECT, or None if it can't be explained."""
+    words = sql.split(None, 1)
+    if params is None or not words or words[0].upper() not in (
+            'SELECT', 'WITH'):
+        return None
+    connection = connections[database]
+    if connection.vendor == 'postgresql':
+        prefix = 'EXPLAIN (FORMAT JSON) '
+    elif connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+    except DatabaseError:
+        return None
+    if connection.vendor == 'postgresql':
+        return rows[0][0]
+    return [row[-1] for row in rows]
+
+
+def record(queries, view_name):
+    """Store captured slow queries, with plans if SLOW_QUERY_EXPLAIN."""
+    from core.models import SlowQuery
+
+    rows = []
+    for query in queries:
+        statement = normalize_sql(query['sql'])
+        plan = None
+        if settings.SLOW_QUERY_EXPLAIN:
+            plan = explain(query['database'], query['sql'], query['params'])
+        rows.append(SlowQuery(
+            view_name=view_name, database=query['database'],
+            fingerprint=fingerprint(statement), statement=statement,
+            duration_ms=query['duration_ms'], timed_out=query['timed_out'],
+            plan=plan,
+        ))
+    SlowQuery.objects.bulk_create(rows)
+
+
+class SlowQueryRecorder:
+    """
+    Queue of captured slow queries, explained and stored by a daemon
+    thread so requests never wait for it. A full queue drops the batch.
+    """
+
+    def __init__(self):
+        self._queue = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def submit(self, queries, view_name):
+        if settings.SLOW_QUERY_QUEUE_SIZE <= 0:
+            record(queries, view_name)
+            return
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((queries, view_name))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _ensure_thread(self):
+        # A forked worker inherits the object but not the thread.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(settings.SLOW_QUERY_QUEUE_SIZE)
+            self._pid = os.getpid()
+            threading.Thread(
+                target=self._run, args=(self._queue,),
+                name='slow-queries', daemon=True).start()
+
+    def _run(self, pending):
+        while True:
+            queries, view_name = pending.get()
+            try:
+                record(queries, view_name)
+            except Exception:
+                logger.exception('Recording slow queries failed')
+            finally:
+                close_old_connections()
+
+
+recorder = SlowQueryRecorder()
+
+
+class QueryBudgetMiddleware:
+    """
+    Apply the DB time budget of the request's endpoint class and record
+    its slow queries.
+
+    `DB_TIME_BUDGETS` maps path prefixes to milliseconds; the longest
+    matching prefix wins and other paths get `DB_STATEMENT_TIMEOUT`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.budgets = sorted(
+            settings.DB_TIME_BUDGETS.items(), key=lambda item: -len(item[0]))
+        self.default_budget = settings.DB_STATEMENT_TIMEOUT or None
+        self.threshold_ms = settings.SLOW_QUERY_MS or None
+        if (not self.budgets and self.default_budget is None
+                and self.threshold_ms is None):
+            raise MiddlewareNotUsed
+
+    def budget_for(self, path):
+        for prefix, budget_ms in self.budgets:
+            if path.startswith(prefix):
+                return budget_ms
+        return self.default_budget
+
+    def __call__(self, request):
+        monitor = QueryMonitor(
+            self.budget_for(request.path_info), self.threshold_ms)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(monitor))
+            response = self.get_response(request)
+        if monitor.slow:
+            match = request.resolver_match
+            recorder.submit(
+                monitor.slow, match.view_name if match else UNRESOLVED)
+        return response
@@ -0,0 +1,166 @@
+"""
+Static asset pipeline: pre-compressed, content-hashed files served in-process.
+
+`collectstatic` with `CompressedManifestStaticFilesStorage` writes hashed
+copies of every asset plus `.gz` (and `.br`, when brotli is installed)
+siblings. `StaticFilesMiddleware` indexes STATIC_ROOT once at startup and
+answers STATIC_URL requests before the rest of the middleware stack, using
+`FileResponse` so servers with `wsgi.file_wrapper` can use sendfile.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from core.middleware import brotli, parse_accept_encoding
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.json', '.svg', '.html', '.txt', '.xml',
+)
+# Precompressed variants, in order of preference.
+VARIANTS = [('br', '.br'), ('gzip', '.gz')]
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage that also writes compressed copies of text assets."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(
+                paths, dry_run=dry_run, **options):
+            yield name, hashed_name, processed
+            if hashed_name and not isinstance(processed, Exception):
+                names.update((name, hashed_name))
+        if dry_run:
+            return
+        # Original and hashed copies usually share their content; compress
+        # each distinct content once.
+        compressed = {}
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress(name, compressed)
+
+    def compress(self, name, compressed=None):
+        compressed = {} if compressed is None else compressed
+        with self.open(name) as source:
+            content = source.read()
+        encoders = {'.gz': lambda data: gzip.compress(data, 9, mtime=0)}
+        if brotli is not None:
+            encoders['.br'] = lambda data: brotli.compress(data, quality=11)
+        for extension, encode in encoders.items():
+            key = (extension, hashlib.md5(content).digest())
+            if key not in compressed:
+                compressed[key] = encode(content)
+            data = compressed[key]
+            # Skip variants that don't save anything worthwhile.
+            if len(data) < len(content) * 0.95:
+                with open(self.path(name) + extension, 'wb') as target:
+                    target.write(data)
+
+
+def file_etag(stat, encoding=None):
+    """Strong ETag of one representation; encodings never share one."""
+    suffix = f'-{encoding}' if encoding else ''
+    return f'"{int(stat.st_mtime):x}-{stat.st_size:x}{suffix}"'
+
+
+class StaticFile:
+    """A collected asset and its precompressed variants."""
+
+    __slots__ = ('headers', 'last_modified', 'variants')
+
+    def __init__(self, path, stat, immutable):
+        content_type, _ = mimetypes.guess_type(path)
+        self.last_modified = int(stat.st_mtime)
+        self.headers = {
+            'Content-Type': content_type or 'application/octet-stream',
+            'Last-Modified': http_date(stat.st_mtime),
+            'Cache-Control': (
+                IMMUTABLE_CACHE_CONTROL if immutable
+                else f'public, max-age={settings.STATIC_MAX_AGE}'
+            ),
+        }
+        # (encoding, path, ETag) in order of preference; identity last.
+        self.variants = [
+            (encoding, path + extension,
+             file_etag(os.stat(path + extension), encoding))
+            for encoding, extension in VARIANTS
+            if os.path.isfile(path + extension)
+        ]
+        self.variants.append((None, path, file_etag(stat)))
+        if len(self.variants) > 1:
+            self.headers['Vary'] = 'Accept-Encoding'
+
+
+def index_static_root(root, prefix):
+    """Map request paths to the StaticFile served for them."""
+    immutable = set()
+    manifest = os.path.join(root, 'staticfiles.json')
+    if os.path.isfile(manifest):
+        with open(manifest) as f:
+            immutable = set(json.load(f).get('paths', {}).values())
+    files = {}
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(('.gz', '.br')):
+                continue
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            files[prefix + name] = StaticFile(
+                path, os.stat(path), name in immutable)
+    return files
+
+
+class StaticFilesMiddleware:
+    """Serve collected static files ahead of the rest of the stack."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        root = settings.STATIC_ROOT
+        if not settings.STATIC_SERVE or not root or not os.path.isdir(root):
+            raise MiddlewareNotUsed
+        self.prefix = settings.STATIC_URL
+        self.files = index_static_root(str(root), self.prefix)
+
+    def __call__(self, request):
+        if request.path.startswith(self.prefix):
+            static_file = self.files.get(request.path)
+            if static_file is not None and request.method in ('GET', 'HEAD'):
+                return self.serve(request, static_file)
+        return self.get_response(request)
+
+    def serve(self, request, static_file):
+        accepted = parse_accept_encoding(
+            request.headers.get('Accept-Encoding', ''))
+        encoding, path, etag = next(
+            variant for variant in static_file.variants
+            if variant[0] is None or accepted.get(variant[0], 0) > 0
+        )
+        response = get_conditional_response(
+            request, etag=etag, last_modified=static_file.last_modified)
+        if response is not None:
+            response['ETag'] = etag
+            response['Cache-Control'] = static_file.headers['Cache-Control']
+            if 'Vary' in static_file.headers:
+                response['Vary'] = static_file.headers['Vary']
+            return response
+
+        response = FileResponse(open(path, 'rb'))
+        # It would name the file sent, e.g. the .gz variant.
+        del response['Content-Disposition']
+        for header, value in static_file.headers.items():
+            response[header] = value
+        response['ETag'] = etag
+        if encoding:
+            response['Content-Encoding'] = encoding
+        return response
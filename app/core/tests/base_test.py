@@ -14,30 +14,34 @@ def create_user(**params):
 
 
 class BaseTestSetup(TestCase):
-    def setUp(self):
-        super().setUp()
-        self.client = APIClient()
-        self.active_payload = {
+    @classmethod
+    def setUpTestData(cls):
+        # Created once per class; each test runs in a rolled back
+        # transaction and gets its own copy of these attributes.
+        cls.active_payload = {
             'email': 'active@example.com',
             'password': 'Complex135@',
             'name': 'Active User',
         }
-        self.inactive_payload = {
+        cls.inactive_payload = {
             'email': 'inactive@example.com',
             'password': 'Complex135@',
             'name': 'Inactive User',
         }
-        self.active_user = User.objects.create_user(
-            email=self.active_payload['email'],
-            password=self.active_payload['password'],
-            name=self.active_payload['name'],
+        cls.active_user = User.objects.create_user(
+            email=cls.active_payload['email'],
+            password=cls.active_payload['password'],
+            name=cls.active_payload['name'],
         )
-        self.active_user.is_active = True
-        self.active_user.save()
-        self.active_user.refresh_from_db()
-        self.inactive_user = User.objects.create_user(
-            email=self.inactive_payload['email'],
-            password=self.inactive_payload['password'],
-            name=self.inactive_payload['name'],
+        cls.active_user.is_active = True
+        cls.active_user.save(update_fields=['is_active'])
+        cls.inactive_user = User.objects.create_user(
+            email=cls.inactive_payload['email'],
+            password=cls.inactive_payload['password'],
+            name=cls.inactive_payload['name'],
             is_active=False
         )
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
@@ -0,0 +1,71 @@
+"""
+Test runner reporting suite timings.
+
+Defaults to running in parallel with a kept test database, as configured by
+`TEST_PARALLEL` and `TEST_KEEPDB`; command line flags still take precedence.
+Parallel runs need tblib (requirements.dev.txt) to report failures, so the
+default stays serial without it.
+"""
+
+import importlib.util
+import time
+import unittest
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner, get_max_test_processes
+
+
+class TimedTextTestResult(unittest.TextTestResult):
+    """Text result collecting the duration of each test."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.durations = []
+
+    def startTest(self, test):
+        self._test_started = time.perf_counter()
+        super().startTest(test)
+
+    def stopTest(self, test):
+        super().stopTest(test)
+        self.durations.append(
+            (time.perf_counter() - self._test_started, test.id()))
+
+
+class TimedTestRunner(DiscoverRunner):
+    """DiscoverRunner with parallel/keepdb defaults and timing reports."""
+
+    slowest_count = 10
+
+    def __init__(self, parallel=0, keepdb=False, **kwargs):
+        if not parallel:
+            parallel = getattr(settings, 'TEST_PARALLEL', 0)
+            if importlib.util.find_spec('tblib') is None:
+                parallel = 0
+            elif parallel == 'auto':
+                parallel = get_max_test_processes()
+        keepdb = keepdb or getattr(settings, 'TEST_KEEPDB', False)
+        super().__init__(parallel=parallel, keepdb=keepdb, **kwargs)
+
+    def get_resultclass(self):
+        resultclass = super().get_resultclass()
+        # Per-test timings are only meaningful in-process: parallel workers
+        # report their events back in bulk once a batch is done.
+        if resultclass is None and self.parallel <= 1:
+            return TimedTextTestResult
+        return resultclass
+
+    def run_suite(self, suite, **kwargs):
+        start = time.perf_counter()
+        result = super().run_suite(suite, **kwargs)
+        elapsed = time.perf_counter() - start
+        self.log(
+            f'Suite: {result.testsRun} tests in {elapsed:.2f}s '
+            f'(parallel={self.parallel}, keepdb={self.keepdb})'
+        )
+        durations = sorted(getattr(result, 'durations', []), reverse=True)
+        if durations:
+            self.log(f'Slowest {self.slowest_count} tests:')
+            for duration, test_id in durations[:self.slowest_count]:
+                self.log(f'  {duration:.3f}s {test_id}')
+        return result
@@ -0,0 +1,167 @@
+"""
+Tests for the audit trail of authentication events.
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import DatabaseError, NotSupportedError, connections
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core import audit
+from core.audit import AuditSink
+from core.models import AuditEvent
+
+LOGIN_URL = reverse('jwt-create')
+EVENTS_URL = reverse('audit-events')
+
+
+class AuditSinkTests(TestCase):
+    """Test the buffered audit sink."""
+
+    @override_settings(AUDIT_FLUSH_INTERVAL=3600)
+    def test_events_are_buffered_and_written_in_bulk(self):
+        """Test events are written only on flush, one INSERT per batch."""
+        sink = AuditSink()
+        with patch.object(sink, '_ensure_thread'):
+            for user_id in range(3):
+                sink.record(AuditEvent.LOGIN, user_id)
+        self.assertFalse(AuditEvent.objects.exists())
+
+        with self.assertNumQueries(1):
+            self.assertEqual(sink.flush(), 3)
+        self.assertEqual(AuditEvent.objects.count(), 3)
+        self.assertEqual(sink.stats()['written'], 3)
+
+    @override_settings(AUDIT_FLUSH_INTERVAL=3600, AUDIT_BUFFER_SIZE=2)
+    def test_full_buffer_drops_oldest(self):
+        """Test a full buffer overwrites its oldest event and counts it."""
+        sink = AuditSink()
+        with patch.object(sink, '_ensure_thread'):
+            for user_id in range(3):
+                sink.record(AuditEvent.LOGIN, user_id)
+        sink.flush()
+
+        self.assertEqual(
+            sorted(AuditEvent.objects.values_list('user_id', flat=True)),
+            [1, 2])
+        self.assertEqual(sink.stats()['dropped'], 1)
+
+    @override_settings(AUDIT_FLUSH_INTERVAL=3600)
+    def test_failed_flush_keeps_events(self):
+        """Test a failed write puts the batch back for the next flush."""
+        sink = AuditSink()
+        with patch.object(sink, '_ensure_thread'):
+            sink.record(AuditEvent.LOGIN, 1)
+        failing = patch.object(
+            QuerySet, 'bulk_create', side_effect=DatabaseError)
+        with failing, self.assertLogs('core.audit', 'ERROR'):
+            self.assertEqual(sink.flush(), 0)
+        self.assertEqual(sink.stats()['pending'], 1)
+
+        self.assertEqual(sink.flush(), 1)
+        self.assertEqual(sink.stats()['failed_flushes'], 1)
+
+    def test_events_are_append_only(self):
+        audit.record(AuditEvent.LOGIN, 1)
+        event = AuditEvent.objects.get()
+
+        with self.assertRaises(NotSupportedError):
+            event.save()
+        with self.assertRaises(NotSupportedError):
+            event.delete()
+
+
+class AuditEventCaptureTests(TestCase):
+    """Test authentication endpoints record audit events."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            email='admin@example.com', password='password123')
+
+    def test_login_and_failed_login_are_audited(self):
+        self.client.post(LOGIN_URL, {
+            'email': 'admin@example.com', 'password': 'password123'})
+        self.client.post(LOGIN_URL, {
+            'email': 'admin@example.com', 'password': 'wrong'},
+            HTTP_X_REQUEST_ID='failed-login')
+
+        login, failed = AuditEvent.objects.order_by('id')
+        self.assertEqual(login.event, AuditEvent.LOGIN)
+        self.assertEqual(login.user_id, self.user.pk)
+        self.assertEqual(login.ip_address, '127.0.0.1')
+        self.assertEqual(failed.event, AuditEvent.LOGIN_FAILED)
+        self.assertIsNone(failed.user_id)
+        self.assertEqual(failed.identifier, 'admin@example.com')
+        self.assertEqual(failed.request_id, 'failed-login')
+
+    def test_registration_and_deletion_are_audited(self):
+        res = self.client.post(reverse('auth:user-list'), {
+            'email': 'new@example.com', 'password': 'Complex135@',
+            're_password': 'Complex135@', 'name': 'New'})
+        self.assertEqual(res.status_code, 201)
+        self.client.force_authenticate(self.user)
+        self.client.delete(reverse('auth:user-me'),
+                           {'current_password': 'password123'})
+
+        self.assertEqual(
+            list(AuditEvent.objects.order_by('id').values_list(
+                'event', flat=True)),
+            [AuditEvent.REGISTERED, AuditEvent.DELETED])
+
+    def test_events_api_filters_by_time_and_event(self):
+        now = timezone.now()
+        AuditEvent.objects.bulk_create([
+            AuditEvent(event=AuditEvent.LOGIN, user_id=1,
+                       occurred_at=now - timedelta(days=2)),
+            AuditEvent(event=AuditEvent.LOGIN, user_id=2, occurred_at=now),
+            AuditEvent(event=AuditEvent.DELETED, user_id=2, occurred_at=now),
+        ])
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(EVENTS_URL, {
+            'start': (now - timedelta(days=1)).isoformat(),
+            'event': AuditEvent.LOGIN,
+        })
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            [event['user_id'] for event in res.data['results']], [2])
+
+        res = self.client.get(EVENTS_URL, {
+            'start': now.isoformat(), 'end': now.isoformat()})
+        self.assertEqual(res.status_code, 400)
+
+
+class AuditPartitionTests(TestCase):
+    """Test the monthly partition helpers."""
+
+    def test_month_start(self):
+        day = datetime(2026, 12, 15, 13, tzinfo=dt_timezone.utc)
+
+        self.assertEqual(audit.month_start(day),
+                         datetime(2026, 12, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(audit.month_start(day, 1),
+                         datetime(2027, 1, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(audit.month_start(day, -12),
+                         datetime(2025, 12, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(audit.partition_name(audit.month_start(day, 1)),
+                         'core_auditevent_p202701')
+
+    def test_command_skips_without_postgres(self):
+        out = StringIO()
+
+        with patch('core.audit.ensure_partitions') as ensure, \
+                patch.object(connections['default'], 'vendor', 'sqlite'):
+            call_command('audit_partitions', stdout=out)
+
+        ensure.assert_not_called()
+        self.assertIn('skipped', out.getvalue())
@@ -525,9 +525,12 @@ class JWTAuthenticationTestCase(BaseTestSetup):
             [status.HTTP_204_NO_CONTENT, status.HTTP_200_OK]
         )
 
-        # Verify that the user has been deleted
-        with self.assertRaises(User.DoesNotExist):
-            self.active_user.refresh_from_db()
+        # Verify that the user is marked deleted and can no longer log in
+        self.active_user.refresh_from_db()
+        self.assertIsNotNone(self.active_user.deleted_at)
+        self.assertFalse(self.active_user.is_active)
+        response = self.client.get(PROTECTED_URL)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
     def test_user_deletion_unauthenticated(self):
         response = self.client.delete(DELETE_URL)
@@ -0,0 +1,75 @@
+"""
+Tests for the compact principal produced by JWT authentication.
+"""
+
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.authentication import JWTAuthentication, Principal
+
+from .base_test import BaseTestSetup
+
+
+ME_URL = reverse('auth:user-me')
+
+
+class PrincipalTests(BaseTestSetup):
+    """Test the Principal returned for authenticated requests."""
+
+    def authenticate(self):
+        token = AccessToken.for_user(self.active_user)
+        return JWTAuthentication().get_user(token)
+
+    def test_authentication_returns_principal(self):
+        """Test the principal is built from one query and needs no more."""
+        with self.assertNumQueries(1):
+            principal = self.authenticate()
+            self.assertIsInstance(principal, Principal)
+            self.assertTrue(principal.is_authenticated)
+            self.assertEqual(principal.pk, self.active_user.pk)
+            self.assertEqual(principal.email, self.active_user.email)
+            self.assertFalse(principal.is_staff)
+        self.assertEqual(principal, self.active_user)
+        self.assertEqual(self.active_user, principal)
+
+    def test_other_attributes_load_the_user_once(self):
+        """Test model attributes are delegated to a lazily loaded user."""
+        principal = self.authenticate()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(principal.name, 'Active User')
+            self.assertTrue(principal.check_password('Complex135@'))
+
+    def test_assignment_reaches_the_user(self):
+        """Test setting attributes updates the underlying user."""
+        principal = self.authenticate()
+
+        principal.email = 'renamed@example.com'
+        principal.save()
+
+        self.active_user.refresh_from_db()
+        self.assertEqual(principal.email, 'renamed@example.com')
+        self.assertEqual(self.active_user.email, 'renamed@example.com')
+
+    def test_me_endpoint_returns_user(self):
+        """Test the djoser 'me' endpoint works with a principal."""
+        token = AccessToken.for_user(self.active_user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['id'], self.active_user.pk)
+        self.assertEqual(res.data['email'], self.active_user.email)
+
+    def test_principal_benchmark(self):
+        """Test the benchmark compares model and principal users."""
+        out = StringIO()
+
+        call_command('benchmark', 'principal', iterations=5, stdout=out)
+
+        self.assertIn('bytes_per_user', out.getvalue())
+        self.assertIn('principal', out.getvalue())
@@ -0,0 +1,111 @@
+"""
+Tests for the cached permission backend.
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from core.checks import check_shared_cache
+
+
+class CachedModelBackendTests(TestCase):
+    """Test cross-request permission caching and invalidation."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='staff@example.com',
+            password='password123',
+            is_staff=True,
+        )
+        self.user.is_active = True
+        self.user.save()
+        self.perm = Permission.objects.get(codename='view_group')
+        self.group = Group.objects.create(name='Viewers')
+
+    def fresh_user(self):
+        """Return a new instance, as a new request would."""
+        return get_user_model().objects.get(pk=self.user.pk)
+
+    def test_permissions_cached_across_instances(self):
+        """Test a second instance resolves permissions without queries."""
+        self.user.user_permissions.add(self.perm)
+        self.assertTrue(self.fresh_user().has_perm('auth.view_group'))
+
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm('auth.view_group'))
+            self.assertFalse(user.has_perm('auth.delete_group'))
+
+    def test_user_permission_change_invalidates(self):
+        """Test adding a permission to the user is seen immediately."""
+        self.assertFalse(self.fresh_user().has_perm('auth.view_group'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.user_permissions.add(self.perm)
+
+        self.assertTrue(self.fresh_user().has_perm('auth.view_group'))
+
+    def test_group_membership_change_invalidates(self):
+        """Test joining a group from either side is seen immediately."""
+        self.group.permissions.add(self.perm)
+        self.assertFalse(self.fresh_user().has_perm('auth.view_group'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.user_set.add(self.user)
+
+        self.assertTrue(self.fresh_user().has_perm('auth.view_group'))
+
+    def test_group_permission_change_invalidates(self):
+        """Test editing a group's permissions reaches its members."""
+        self.user.groups.add(self.group)
+        self.assertFalse(self.fresh_user().has_perm('auth.view_group'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.permissions.add(self.perm)
+
+        self.assertTrue(self.fresh_user().has_perm('auth.view_group'))
+
+    def test_invalidation_waits_for_commit(self):
+        """Test the cache is only invalidated once the change commits."""
+        self.assertFalse(self.fresh_user().has_perm('auth.view_group'))
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.user_permissions.add(self.perm)
+        # Not committed yet: other requests still read the old permissions.
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertFalse(user.has_perm('auth.view_group'))
+
+        for callback in callbacks:
+            callback()
+        self.assertTrue(self.fresh_user().has_perm('auth.view_group'))
+
+    def test_check_refuses_process_local_cache_with_workers(self):
+        """Test the check fails for locmem shared by several workers."""
+        self.assertEqual(check_shared_cache(None), [])
+
+        with override_settings(WEB_CONCURRENCY=2):
+            errors = check_shared_cache(None)
+        self.assertEqual([error.id for error in errors], ['core.E005'])
+
+        redis = {'default': {
+            'BACKEND': 'core.caching.InstrumentedCache',
+            'OPTIONS': {
+                'BACKEND': 'django.core.cache.backends.redis.RedisCache'},
+        }}
+        with override_settings(WEB_CONCURRENCY=2, CACHES=redis):
+            self.assertEqual(check_shared_cache(None), [])
+
+    def test_check_warns_about_database_cache(self):
+        """Test the check warns when the default cache is the database."""
+        database = {'default': {
+            'BACKEND': 'core.caching.InstrumentedCache',
+            'OPTIONS': {
+                'BACKEND': 'django.core.cache.backends.db.DatabaseCache'},
+        }}
+        with override_settings(CACHES=database):
+            warnings = check_shared_cache(None)
+        self.assertEqual([warning.id for warning in warnings], ['core.W001'])
@@ -0,0 +1,113 @@
+"""
+Tests for bulk user flag updates.
+"""
+
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.bulk import set_user_flags
+from core.models import UserChange
+from core.signals import users_bulk_updated
+
+
+class BulkFlagTests(TestCase):
+    """Test set-based activation and deactivation."""
+
+    databases = {'default', 'shard_1'}
+
+    def setUp(self):
+        self.users = [
+            get_user_model().objects.create_user(
+                email=f'user{i}@example.com', password='password123')
+            for i in range(5)
+        ]
+
+    def test_chunked_update_sends_one_event_per_chunk(self):
+        """Test each chunk is one update event and feed batch."""
+        events = []
+
+        def receiver(sender, user_ids, flags, **kwargs):
+            events.append((list(user_ids), flags))
+
+        users_bulk_updated.connect(receiver)
+        self.addCleanup(users_bulk_updated.disconnect, receiver)
+        start = UserChange.objects.order_by('-seq').first().seq
+        progress = []
+
+        updated = set_user_flags(
+            get_user_model().objects.filter(email__startswith='user'),
+            {'is_active': True}, chunk_size=2, progress=progress.append)
+
+        self.assertEqual(updated, 5)
+        self.assertEqual(progress, [2, 4, 5])
+        self.assertEqual([len(ids) for ids, _ in events], [2, 2, 1])
+        self.assertEqual(
+            UserChange.objects.filter(seq__gt=start).count(), 5)
+        self.assertFalse(
+            get_user_model().objects.filter(is_active=False).exists())
+
+    def test_activation_skips_users_pending_deletion(self):
+        """Test soft-deleted users are not reactivated."""
+        self.users[0].soft_delete()
+
+        set_user_flags(get_user_model().objects.all(), {'is_active': True})
+
+        self.users[0].refresh_from_db()
+        self.assertFalse(self.users[0].is_active)
+
+    def test_updates_users_on_the_querysets_shard(self):
+        """Test a shard's queryset is updated on that shard."""
+        user = get_user_model().objects.db_manager('shard_1').create_user(
+            email='shard@example.com', password='password123')
+
+        updated = set_user_flags(
+            get_user_model().objects.using('shard_1'), {'is_active': True})
+
+        self.assertEqual(updated, 1)
+        user.refresh_from_db()
+        self.assertTrue(user.is_active)
+        self.assertTrue(UserChange.objects.filter(user_id=user.pk).exists())
+
+    def test_unsupported_flag_rejected(self):
+        """Test only the bulk flags can be set."""
+        with self.assertRaises(ValueError):
+            set_user_flags(
+                get_user_model().objects.all(), {'is_superuser': True})
+
+    def test_command_filters_users(self):
+        """Test the command only touches matching users."""
+        out = StringIO()
+
+        call_command(
+            'set_user_flags', '--activate', '--staff',
+            '--filter', 'email__iexact=USER1@example.com',
+            stdout=out)
+
+        user = get_user_model().objects.get(email='user1@example.com')
+        self.assertTrue(user.is_active and user.is_staff)
+        self.assertEqual(
+            get_user_model().objects.filter(is_active=True).count(), 1)
+        self.assertIn('Updated 1 users.', out.getvalue())
+
+    def test_admin_action(self):
+        """Test the admin activate action updates the selected users."""
+        admin_user = get_user_model().objects.create_superuser(
+            email='admin@example.com', password='password123')
+        client = Client()
+        client.force_login(admin_user)
+
+        res = client.post(reverse('admin:core_user_changelist'), {
+            'action': 'set_is_active_true',
+            '_selected_action': [user.pk for user in self.users[:3]],
+        })
+
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual(
+            get_user_model().objects.filter(
+                email__startswith='user', is_active=True).count(),
+            3,
+        )
@@ -0,0 +1,148 @@
+"""
+Tests for the caching layer.
+"""
+
+import json
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from app.settings.cache_config import build_caches
+from core import caching
+
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+SCHEMA_URL = reverse('api-schema')
+STATS_URL = reverse('cache-stats')
+
+
+class CachingTests(SimpleTestCase):
+    """Test the instrumented backend and stampede protection."""
+
+    def setUp(self):
+        self.cache = caching.InstrumentedCache(
+            'tests', {'OPTIONS': {'BACKEND': LOCMEM}})
+        self.cache.clear()
+
+    def test_hits_and_misses_counted(self):
+        """Test lookups are counted and delegated to the backend."""
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.set('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.get_many(['key', 'other']),
+                         {'key': 'value'})
+
+        self.assertEqual(dict(self.cache.stats),
+                         {'hits': 2, 'misses': 2, 'sets': 1})
+
+    def test_build_caches(self):
+        """Test aliases share a backend and deploy keys change per deploy."""
+        config = build_caches('file', deploy_id='abc123')
+
+        self.assertEqual(config['deploy']['KEY_PREFIX'], 'drf:abc123')
+        self.assertEqual(config['default']['KEY_PREFIX'], 'drf')
+        self.assertEqual(config['default']['LOCATION'], '/tmp/django_cache')
+        self.assertEqual(config['local']['OPTIONS']['BACKEND'], LOCMEM)
+        custom = build_caches('myapp.cache.Backend', 'host:1')
+        self.assertEqual(
+            custom['default']['OPTIONS']['BACKEND'], 'myapp.cache.Backend')
+
+    def test_get_or_compute_caches_value(self):
+        """Test values are computed once while fresh."""
+        compute = mock.Mock(return_value=42)
+        with mock.patch.object(caching, 'caches', {'t': self.cache}):
+            for _ in range(3):
+                value = caching.get_or_compute('k', compute, 60, alias='t')
+
+        self.assertEqual(value, 42)
+        compute.assert_called_once()
+
+    def test_expiring_values_recomputed_early(self):
+        """Test a value about to expire is refreshed before it does."""
+        self.cache.set('k', ('old', 5.0, time.time() + 0.001), 60)
+        with mock.patch.object(caching, 'caches', {'t': self.cache}):
+            value = caching.get_or_compute('k', lambda: 'new', 60, alias='t')
+
+        self.assertEqual(value, 'new')
+
+    def test_miss_waits_for_lock_holder(self):
+        """Test a miss computes anyway once the lock holder gives up."""
+        self.cache.add('k:lock', 1)
+        with mock.patch.object(caching, 'caches', {'t': self.cache}):
+            value = caching.get_or_compute(
+                'k', lambda: 'v', 60, alias='t', lock_timeout=0.1)
+
+        self.assertEqual(value, 'v')
+
+
+class DatabaseCacheTests(TestCase):
+    """Test the shared database cache."""
+
+    @override_settings(CACHES=build_caches('database'))
+    def test_createcachetable_sees_through_the_wrapper(self):
+        """Test the wrapped DatabaseCache gets its table, used by all."""
+        call_command('createcachetable', stdout=StringIO())
+
+        self.assertIn('core_cache', connection.introspection.table_names())
+        caches['default'].set('key', 'value')
+        self.assertEqual(caches['default'].get('key'), 'value')
+        self.assertIsNone(caches['deploy'].get('key'))
+
+
+class CacheWarmupTests(TestCase):
+    """Test the schema cache, warmup command and stats endpoint."""
+
+    def setUp(self):
+        for alias in ('default', 'deploy'):
+            caches[alias].clear()
+
+    def test_warm_cache_fills_schema(self):
+        """Test the schema view serves the warmed schema."""
+        out = StringIO()
+
+        call_command('warm_cache', 'schema', stdout=out)
+
+        self.assertIn('Warmed schema', out.getvalue())
+        self.assertIsNotNone(caches['deploy'].get(caching.schema_key()))
+        with mock.patch('drf_spectacular.generators.SchemaGenerator'
+                        '.get_schema') as get_schema:
+            res = APIClient().get(SCHEMA_URL)
+        self.assertEqual(res.status_code, 200)
+        get_schema.assert_not_called()
+
+    def test_schema_loaded_from_build_file(self):
+        """Test a schema generated at build time is served as is."""
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as f:
+            json.dump({'openapi': '3.0.3', 'prebuilt': True}, f)
+            f.flush()
+            with override_settings(OPENAPI_SCHEMA_FILE=f.name):
+                schema = caching.get_schema()
+
+        self.assertTrue(schema['prebuilt'])
+
+    @override_settings(OPENAPI_SCHEMA_FILE='/nonexistent/openapi.json')
+    def test_schema_generated_without_build_file(self):
+        """Test a missing schema file falls back to generating it."""
+        self.assertIn('paths', caching.get_schema())
+
+    def test_stats_endpoint(self):
+        """Test staff can read the per-alias hit ratios."""
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_superuser(
+            'admin@example.com', 'password123'))
+        caches['default'].get('missing')
+
+        res = client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            set(res.data['caches']), {'default', 'deploy', 'local'})
+        self.assertGreaterEqual(res.data['caches']['default']['misses'], 1)
@@ -0,0 +1,180 @@
+"""
+Tests for the user change feed.
+"""
+
+from datetime import timedelta
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import changes
+from core.models import UserChange
+
+
+CHANGES_URL = reverse('user-changes')
+
+
+class UserChangeTests(TestCase):
+    """Test the user change log and its API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='password123'
+        )
+        self.client.force_authenticate(self.admin_user)
+
+    def test_create_update_delete_recorded(self):
+        """Test user saves and deletes are appended to the log."""
+        start = UserChange.objects.order_by('-seq').first().seq
+        user = get_user_model().objects.create_user(
+            email='test@example.com', password='password123')
+        user.is_active = True
+        user.save()
+        user_id = user.id
+        user.delete()
+
+        actions = list(
+            UserChange.objects.filter(seq__gt=start)
+            .values_list('user_id', 'action')
+        )
+        self.assertEqual(actions, [
+            (user_id, UserChange.CREATED),
+            (user_id, UserChange.UPDATED),
+            (user_id, UserChange.DELETED),
+        ])
+
+    def test_changes_api_paginates_by_sequence(self):
+        """Test the API returns batches after the given sequence number."""
+        for i in range(3):
+            get_user_model().objects.create_user(
+                email=f'user{i}@example.com', password='password123')
+
+        res = self.client.get(CHANGES_URL, {'since': 0, 'limit': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data['has_more'])
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertEqual(res.data['next'], res.data['results'][-1]['seq'])
+
+        res = self.client.get(CHANGES_URL, {'since': res.data['next']})
+        self.assertFalse(res.data['has_more'])
+        self.assertEqual(
+            res.data['results'][-1]['user']['email'], 'user2@example.com')
+
+    def test_changes_api_deleted_user_has_no_state(self):
+        """Test deleted users are returned without their state."""
+        user = get_user_model().objects.create_user(
+            email='test@example.com', password='password123')
+        user.delete()
+
+        res = self.client.get(CHANGES_URL)
+
+        self.assertIsNone(res.data['results'][-1]['user'])
+
+    def test_changes_api_requires_staff(self):
+        """Test non-staff users cannot read the change feed."""
+        user = get_user_model().objects.create_user(
+            email='test@example.com', password='password123')
+        self.client.force_authenticate(user)
+
+        res = self.client.get(CHANGES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_compact_keeps_latest_change_per_user(self):
+        """Test compaction drops superseded entries only."""
+        user = get_user_model().objects.create_user(
+            email='test@example.com', password='password123')
+        user.save()
+        user.save()
+        last = UserChange.objects.order_by('-seq').first().seq
+
+        changes.compact_changes(last)
+
+        self.assertEqual(
+            list(UserChange.objects.filter(user_id=user.id)
+                 .values_list('seq', flat=True)),
+            [last],
+        )
+        self.assertTrue(
+            UserChange.objects.filter(user_id=self.admin_user.id).exists())
+
+    def test_changes_after_watermark_are_held_back(self):
+        """Test changes an open transaction may still precede are hidden."""
+        get_user_model().objects.create_user(
+            email='test@example.com', password='password123')
+        horizon = timezone.now() - timedelta(minutes=1)
+
+        with patch('core.changes.watermark', return_value=horizon):
+            res = self.client.get(CHANGES_URL)
+            pending = changes.changes_since(0, 100)
+
+        self.assertEqual(res.data['results'], [])
+        self.assertEqual(res.data['next'], 0)
+        self.assertEqual(pending, [])
+
+    def feed_emails(self):
+        res = self.client.get(CHANGES_URL)
+        return {change['user']['email'] for change in res.data['results']
+                if change['user']}
+
+    @skipUnless(connection.vendor == 'postgresql', 'reads pg_locks')
+    def test_only_open_change_writers_hold_the_feed_back(self):
+        """Test a transaction writing changes holds back later ones."""
+        get_user_model().objects.create_user(
+            email='first@example.com', password='password123')
+        other = connection.copy()
+        try:
+            with other.cursor() as cursor:
+                cursor.execute('BEGIN')
+                cursor.execute('SELECT 1')
+                get_user_model().objects.create_user(
+                    email='second@example.com', password='password123')
+
+                self.assertLessEqual(
+                    {'first@example.com', 'second@example.com'},
+                    self.feed_emails())
+
+                cursor.execute(
+                    f'LOCK TABLE {UserChange._meta.db_table} '
+                    'IN ROW EXCLUSIVE MODE')
+                get_user_model().objects.create_user(
+                    email='third@example.com', password='password123')
+                emails = self.feed_emails()
+
+                self.assertIn('first@example.com', emails)
+                self.assertNotIn('third@example.com', emails)
+
+                cursor.execute('ROLLBACK')
+        finally:
+            other.close()
+        self.assertIn('third@example.com', self.feed_emails())
+
+    def test_compact_computes_keep_set_once(self):
+        """Test compaction aggregates once, not once per batch."""
+        user = get_user_model().objects.create_user(
+            email='test@example.com', password='password123')
+        for _ in range(4):
+            user.save()
+        last = UserChange.objects.order_by('-seq').first().seq
+
+        with CaptureQueriesContext(connection) as queries:
+            changes.compact_changes(last, batch_size=2)
+
+        aggregates = [q for q in queries if 'GROUP BY' in q['sql']]
+        self.assertEqual(len(aggregates), 1)
+        self.assertEqual(
+            list(UserChange.objects.filter(user_id=user.id)
+                 .values_list('seq', flat=True)),
+            [last],
+        )
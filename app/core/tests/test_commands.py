@@ -2,12 +2,13 @@
 Test custom Django management commands
 """
 
+from io import StringIO
 from unittest.mock import patch
-from psycopg2 import OperationalError as Psycopg2Error
 
 from django.core.management import call_command
+from django.db import connections
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -24,10 +25,36 @@ class CommandTests(SimpleTestCase):
     @patch('time.sleep')
     def test_wait_for_db_delay(self, patched_sleep, patched_check):
         """Test waiting for db when getting OperationalError"""
+        driver_error = connections['default'].Database.OperationalError
         patched_check.side_effect = [
-            Psycopg2Error()] * 2 + [OperationalError()] * 3 + [True]
+            driver_error()] * 2 + [OperationalError()] * 3 + [True]
 
         call_command('wait_for_db')
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class ThroughputBenchmarkTests(TestCase):
+    """Test the throughput benchmark scenario."""
+
+    def test_benchmark_reports_every_endpoint(self):
+        out = StringIO()
+
+        call_command('benchmark', 'throughput', iterations=2, stdout=out)
+
+        self.assertIn('Django', out.getvalue())
+        for endpoint in ('healthz', 'users/me', 'user changes', 'schema'):
+            self.assertIn(endpoint, out.getvalue())
+
+
+class SchemaTests(SimpleTestCase):
+    """Test the generated OpenAPI schema."""
+
+    def test_schema_generates_without_warnings(self):
+        """Test component names are unique and views describe themselves."""
+        out = StringIO()
+
+        call_command('spectacular', '--fail-on-warn', stdout=out)
+
+        self.assertNotIn('deferred deletion', out.getvalue())
@@ -0,0 +1,117 @@
+"""
+Tests for deferred user deletion.
+"""
+
+from datetime import timedelta
+from importlib.metadata import version
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import UserChange
+
+# Resending activation with no matching user: djoser 2.2 (requirements.txt)
+# answers 400, 2.3 (requirements.upgrade.txt) 204 so as not to leak it.
+NO_USER_STATUS = (
+    status.HTTP_400_BAD_REQUEST if version('djoser').startswith('2.2.')
+    else status.HTTP_204_NO_CONTENT)
+
+
+class DeferredDeletionTests(TestCase):
+    """Test soft deletion and the purge command."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='password123'
+        )
+
+    def test_soft_delete_revokes_access(self):
+        """Test soft deletion deactivates the user and keeps the row."""
+        self.user.soft_delete()
+
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertFalse(self.user.has_usable_password())
+        self.assertIsNotNone(self.user.deleted_at)
+
+    def test_purge_deletes_in_batches(self):
+        """Test the purge command removes soft-deleted users only."""
+        kept = get_user_model().objects.create_user(
+            email='kept@example.com', password='password123')
+        for i in range(3):
+            get_user_model().objects.create_user(
+                email=f'gone{i}@example.com', password='password123'
+            ).soft_delete()
+        self.user.soft_delete()
+        out = StringIO()
+
+        call_command('purge_deleted_users', batch_size=2, stdout=out)
+
+        self.assertEqual(
+            list(get_user_model().objects.values_list('pk', flat=True)),
+            [kept.pk],
+        )
+        self.assertIn('Purged 4 users.', out.getvalue())
+
+    def test_purge_respects_grace_period(self):
+        """Test recently deleted users are kept during the grace period."""
+        self.user.soft_delete()
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            deleted_at=timezone.now() - timedelta(minutes=30))
+
+        call_command('purge_deleted_users', grace_hours=1, stdout=StringIO())
+
+        self.assertTrue(
+            get_user_model().objects.filter(pk=self.user.pk).exists())
+
+    def test_purge_records_changes_in_bulk(self):
+        """Test purged users are logged with one INSERT per batch."""
+        for i in range(3):
+            get_user_model().objects.create_user(
+                email=f'gone{i}@example.com', password='password123'
+            ).soft_delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command('purge_deleted_users', stdout=StringIO())
+
+        inserts = [q for q in queries if q['sql'].startswith(
+            f'INSERT INTO "{UserChange._meta.db_table}"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            UserChange.objects.filter(action=UserChange.DELETED).count(), 3)
+
+    def test_deleted_email_can_register_again(self):
+        """Test a soft-deleted user's email is free for a new account."""
+        self.user.soft_delete()
+
+        res = APIClient().post(reverse('auth:user-list'), {
+            'email': 'test@example.com', 'password': 'Complex135@',
+            're_password': 'Complex135@', 'name': 'Again'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        user = get_user_model().objects.get(email='test@example.com')
+        self.assertNotEqual(user.pk, self.user.pk)
+        self.assertIsNone(user.deleted_at)
+
+    def test_deleted_user_gets_no_activation_email(self):
+        """Test resending activation skips soft-deleted users."""
+        self.user.set_password('password123')
+        self.user.deleted_at = timezone.now()
+        self.user.save()
+        mail.outbox.clear()
+
+        res = APIClient().post(reverse('auth:user-resend-activation'),
+                               {'email': 'test@example.com'})
+
+        self.assertEqual(res.status_code, NO_USER_STATUS)
+        self.assertEqual(mail.outbox, [])
@@ -0,0 +1,85 @@
+"""
+Tests for the path-aware middleware dispatcher.
+"""
+
+from io import StringIO
+
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, override_settings,
+)
+
+from app.middleware import PathDispatchMiddleware
+from core.checks import check_site_middleware
+
+
+def view(request):
+    return HttpResponse('ok')
+
+
+class PathDispatchTests(SimpleTestCase):
+    """Test API paths skip the session stack and site paths keep it."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = PathDispatchMiddleware(lambda request: view(request))
+
+    def test_api_requests_skip_sessions(self):
+        """Test API requests run without session, user or messages."""
+        request = self.factory.get('/api/auth/users/me/')
+
+        response = self.middleware(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(hasattr(request, 'session'))
+        self.assertFalse(hasattr(request, 'user'))
+        self.assertEqual(response['X-Frame-Options'], 'DENY')
+
+    def test_site_requests_get_full_stack(self):
+        """Test other requests get sessions, auth and messages."""
+        request = self.factory.get('/admin/')
+
+        self.middleware(request)
+
+        self.assertTrue(hasattr(request, 'session'))
+        self.assertTrue(hasattr(request, 'user'))
+        self.assertTrue(hasattr(request, '_messages'))
+
+    def test_view_hooks_follow_the_path(self):
+        """Test CSRF checks run for site paths only."""
+        for path, enforced in (('/admin/login/', True), ('/api/x/', False)):
+            request = self.factory.post(path)
+            self.middleware(request)
+
+            response = self.middleware.process_view(request, view, (), {})
+
+            if enforced:
+                self.assertEqual(response.status_code, 403)
+            else:
+                self.assertIsNone(response)
+
+    def test_check_requires_admin_middleware(self):
+        """Test the replacement for the silenced admin checks."""
+        self.assertEqual(check_site_middleware(None), [])
+        with override_settings(SITE_MIDDLEWARE=[]):
+            errors = check_site_middleware(None)
+        self.assertEqual(
+            [error.id for error in errors],
+            ['core.E001', 'core.E002', 'core.E003'],
+        )
+        with override_settings(ADMIN_URL='api/admin/'):
+            errors = check_site_middleware(None)
+        self.assertEqual([error.id for error in errors], ['core.E004'])
+
+
+class MiddlewareBenchmarkTests(TestCase):
+    """Test the middleware benchmark scenario."""
+
+    def test_benchmark_compares_stacks(self):
+        out = StringIO()
+
+        call_command('benchmark', 'middleware', iterations=3, stdout=out)
+
+        self.assertIn('full', out.getvalue())
+        self.assertIn('dispatch', out.getvalue())
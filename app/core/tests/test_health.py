@@ -0,0 +1,100 @@
+"""
+Tests for the health and readiness probes and worker warmup.
+"""
+
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import OperationalError
+from django.test import TestCase
+from django.urls import reverse
+
+from core import caching, warmup
+from core.serializers import UserChangeSerializer, UserCreateSerializer
+
+HEALTHZ_URL = reverse('healthz')
+READYZ_URL = reverse('readyz')
+
+
+class HealthTests(TestCase):
+    """Test the probes."""
+
+    databases = {'default', 'shard_1'}
+
+    def test_healthz_does_no_io(self):
+        """Test the liveness probe answers without touching the database."""
+        with self.assertNumQueries(0):
+            res = self.client.get(HEALTHZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {'status': 'ok'})
+        self.assertIn('no-cache', res['Cache-Control'])
+
+    def test_readyz_checks_databases_and_cache(self):
+        """Test the readiness probe pings every database and the cache."""
+        stats = caches['default'].stats.copy()
+
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['checks'], {
+            'db:default': 'ok', 'db:shard_1': 'ok', 'cache:default': 'ok',
+        })
+        # Probes don't count as cache misses.
+        self.assertEqual(caches['default'].stats, stats)
+
+    def test_readyz_unavailable_when_cache_down(self):
+        """Test a failing dependency makes the worker unready."""
+        with mock.patch.object(caches['default'], 'has_key',
+                               side_effect=ConnectionError):
+            res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['checks']['cache:default'],
+                         'ConnectionError')
+
+    def test_readyz_unavailable_when_database_down(self):
+        """Test an unreachable database is reported by alias."""
+        with mock.patch('core.views.connections') as connections:
+            connections.__getitem__.return_value.cursor.side_effect = (
+                OperationalError)
+            res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['checks']['db:default'],
+                         'OperationalError')
+
+
+class WarmupTests(TestCase):
+    """Test the warmup hook."""
+
+    databases = {'default', 'shard_1'}
+
+    def test_serializer_classes_of_views(self):
+        """Test serializers are found for views and viewset actions."""
+        found = set().union(
+            *map(warmup.serializer_classes, warmup.iter_views()))
+
+        self.assertIn(UserChangeSerializer, found)
+        self.assertIn(UserCreateSerializer, found)
+
+    def test_warm_up_runs_every_step(self):
+        """Test warmup times every step and precomputes the schema."""
+        caches['deploy'].clear()
+
+        timings = warmup.warm_up()
+
+        self.assertEqual(list(timings), [name for name, _ in warmup.STEPS])
+        self.assertIsNotNone(caches['deploy'].get(caching.schema_key()))
+
+    def test_failed_step_does_not_stop_warmup(self):
+        """Test a failing step is logged and later steps still run."""
+        failing = mock.Mock(side_effect=RuntimeError('boom'))
+        later = mock.Mock()
+        steps = [('failing', failing), ('later', later)]
+
+        with mock.patch.object(warmup, 'STEPS', steps), \
+                self.assertLogs('core.warmup', 'ERROR'):
+            warmup.warm_up()
+
+        later.assert_called_once()
@@ -0,0 +1,62 @@
+"""
+Tests for the buffered last_login updates.
+"""
+
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.last_login import LastLoginBuffer, buffer
+
+
+LOGIN_URL = reverse('jwt-create')
+
+
+class LastLoginBufferTests(TestCase):
+    """Test the last_login write-coalescing buffer."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser(
+            email='test@example.com',
+            password='password123'
+        )
+
+    @override_settings(LAST_LOGIN_FLUSH_INTERVAL=3600)
+    def test_logins_are_buffered_until_flush(self):
+        """Test recorded logins are written only when flushed."""
+        login_buffer = LastLoginBuffer()
+        earlier = timezone.now() - timedelta(minutes=5)
+        later = timezone.now()
+        login_buffer.record(self.user.pk, earlier)
+        login_buffer.record(self.user.pk, later)
+
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_login)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(login_buffer.flush(), 1)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_login, later)
+
+    def test_flush_without_pending_is_free(self):
+        """Test flushing an empty buffer runs no query."""
+        with self.assertNumQueries(0):
+            self.assertEqual(LastLoginBuffer().flush(), 0)
+
+    @override_settings(LAST_LOGIN_FLUSH_INTERVAL=3600)
+    def test_jwt_login_records_last_login(self):
+        """Test issuing a token pair records the login in the buffer."""
+        res = APIClient().post(LOGIN_URL, {
+            'email': 'test@example.com',
+            'password': 'password123',
+        }, format='json')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(('default', self.user.pk), buffer._pending)
+        buffer.flush()
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
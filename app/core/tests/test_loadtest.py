@@ -0,0 +1,88 @@
+"""
+Tests for the multi-node load test harness.
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+
+from core import loadtest
+
+
+class PortHandler(BaseHTTPRequestHandler):
+    """Answer every request with the port of the backend."""
+
+    def do_GET(self):
+        body = str(self.server.server_address[1]).encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class LoadBalancerTests(SimpleTestCase):
+    """Test the round-robin load balancer."""
+
+    def start_backend(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), PortHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server.server_address
+
+    def test_connections_alternate_between_backends(self):
+        backends = [self.start_backend(), self.start_backend()]
+
+        with loadtest.LoadBalancer(backends) as balancer:
+            ports = [
+                loadtest.request(balancer.server_address, 'GET', '/')[1]
+                for _ in range(4)
+            ]
+
+        expected = [port for _, port in backends] * 2
+        self.assertEqual(ports, expected)
+
+
+class LoadTestUsersTests(TestCase):
+    """Test the throwaway load test users."""
+
+    def test_users_are_deleted_on_exit(self):
+        User = get_user_model()
+
+        with loadtest.Users(2) as users:
+            users.create(active=False)
+            self.assertEqual(
+                [user.is_active for user in users.created],
+                [True, True, False])
+
+        self.assertFalse(
+            User.objects.filter(email__startswith=users.prefix).exists())
+
+
+class LoadTestCommandTests(SimpleTestCase):
+    """Test the loadtest_cluster command."""
+
+    @patch('core.loadtest.run')
+    def test_failed_check_fails_the_command(self, run):
+        run.return_value = (
+            {'nodes': 2, 'requests': 10, 'req_per_s': 5},
+            {'deactivation': (True, 'ok'), 'idempotency': (False, 'bad')},
+        )
+        out = StringIO()
+
+        with self.assertRaises(CommandError):
+            call_command('loadtest_cluster', nodes=[2], stdout=out,
+                         stderr=StringIO())
+
+        self.assertIn('PASS deactivation (2 nodes)', out.getvalue())
+        self.assertIn('FAIL idempotency (2 nodes): bad', out.getvalue())
+        self.assertIn('req_per_s', out.getvalue())
@@ -0,0 +1,116 @@
+"""
+Tests for the logging pipeline.
+"""
+
+import json
+import logging
+import logging.config
+import sys
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from app.log import (
+    JsonFormatter, RequestIdFilter, SamplingFilter, queue_handler,
+    request_id_var,
+)
+from app.settings.logging_config import build_logging
+
+
+class CollectingHandler(logging.Handler):
+    """Handler keeping formatted records in memory."""
+
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+def make_record(name='test', level=logging.DEBUG, msg='hello'):
+    return logging.LogRecord(name, level, __file__, 1, msg, None, None)
+
+
+class LoggingTests(SimpleTestCase):
+    """Test the logging helpers."""
+
+    def test_request_id_header_round_trip(self):
+        """Test the request id is echoed, or generated when missing."""
+        url = reverse('fake_protected')
+        res = APIClient().get(url, HTTP_X_REQUEST_ID='abc-123')
+        self.assertEqual(res['X-Request-ID'], 'abc-123')
+
+        res = APIClient().get(url, HTTP_X_REQUEST_ID='bad id!')
+        self.assertNotEqual(res['X-Request-ID'], 'bad id!')
+        self.assertEqual(len(res['X-Request-ID']), 32)
+
+    def test_json_formatter_includes_request_id(self):
+        """Test JSON records carry the current request id."""
+        record = make_record(msg='value %s')
+        record.args = (42,)
+        token = request_id_var.set('req-1')
+        try:
+            RequestIdFilter().filter(record)
+        finally:
+            request_id_var.reset(token)
+
+        payload = json.loads(JsonFormatter().format(record))
+
+        self.assertEqual(payload['message'], 'value 42')
+        self.assertEqual(payload['request_id'], 'req-1')
+
+    def test_sampling_filter(self):
+        """Test sampled loggers drop debug records but keep warnings."""
+        sampling = SamplingFilter({'django.db.backends': 0})
+
+        self.assertFalse(sampling.filter(make_record('django.db.backends')))
+        self.assertTrue(sampling.filter(
+            make_record('django.db.backends', logging.WARNING)))
+        self.assertTrue(sampling.filter(make_record('core')))
+
+    def test_queue_handler_delivers_on_close(self):
+        """Test queued records reach the target handler."""
+        target = CollectingHandler()
+        handler = queue_handler(target)
+        handler.handle(make_record(msg='queued'))
+
+        handler.close()
+
+        self.assertEqual(target.lines, ['queued'])
+
+    def test_queue_handler_keeps_traceback_for_json(self):
+        """Test tracebacks survive the queue as their own JSON field."""
+        target = CollectingHandler()
+        target.setFormatter(JsonFormatter())
+        handler = queue_handler(target)
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            record = make_record(msg='failed %s')
+            record.args = ('job',)
+            record.exc_info = sys.exc_info()
+        handler.handle(record)
+
+        handler.close()
+
+        payload = json.loads(target.lines[0])
+        self.assertEqual(payload['message'], 'failed job')
+        self.assertIn('ValueError: boom', payload['exc_info'])
+
+    def test_build_logging_is_valid(self):
+        """Test the shipped configuration can be applied."""
+        config = build_logging('INFO', json_format=True)
+        config['disable_existing_loggers'] = False
+        root = logging.getLogger()
+        saved_handlers, saved_level = root.handlers[:], root.level
+        try:
+            logging.config.dictConfig(config)
+            self.assertEqual(len(root.handlers), 1)
+            self.assertIsNotNone(root.handlers[0].listener)
+            target = root.handlers[0].listener.handlers[0]
+            self.assertIsInstance(target.formatter, JsonFormatter)
+            root.handlers[0].close()
+        finally:
+            root.handlers, root.level = saved_handlers, saved_level
@@ -0,0 +1,95 @@
+"""
+Tests for the compression and conditional GET middleware.
+"""
+
+import gzip
+from unittest import skipUnless
+
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.middleware import (
+    CompressionMiddleware, brotli, parse_accept_encoding,
+)
+
+PAYLOAD = {'users': [{'email': f'user{i}@example.com'} for i in range(50)]}
+
+
+@override_settings(COMPRESSION_MIN_SIZE=512)
+class CompressionMiddlewareTests(SimpleTestCase):
+    """Test content negotiation and ETags."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def run_middleware(self, response, **headers):
+        middleware = CompressionMiddleware(lambda request: response)
+        request = self.factory.get('/api/users/', **headers)
+        return middleware(request)
+
+    def test_gzip_when_accepted(self):
+        """Test JSON is gzipped and marked with Vary and a weak ETag."""
+        res = self.run_middleware(
+            JsonResponse(PAYLOAD), HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', res['Vary'])
+        self.assertTrue(res['ETag'].startswith('W/"'))
+        self.assertEqual(
+            gzip.decompress(res.content), JsonResponse(PAYLOAD).content)
+
+    @skipUnless(brotli, 'brotli is not installed')
+    def test_brotli_preferred(self):
+        """Test brotli wins over gzip when both are accepted."""
+        res = self.run_middleware(
+            JsonResponse(PAYLOAD), HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertEqual(res['Content-Encoding'], 'br')
+
+    def test_q_zero_and_small_bodies_not_compressed(self):
+        """Test refused encodings and tiny responses stay identity."""
+        res = self.run_middleware(
+            JsonResponse(PAYLOAD),
+            HTTP_ACCEPT_ENCODING='gzip;q=0, br;q=0, zstd;q=0')
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+        res = self.run_middleware(
+            JsonResponse({'a': 1}), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    def test_html_not_compressed(self):
+        """Test HTML pages are left alone."""
+        res = self.run_middleware(
+            HttpResponse('x' * 2000), HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    def test_if_none_match_returns_304(self):
+        """Test a matching validator short-circuits with no body."""
+        etag = self.run_middleware(JsonResponse(PAYLOAD))['ETag']
+
+        res = self.run_middleware(
+            JsonResponse(PAYLOAD), HTTP_IF_NONE_MATCH=etag,
+            HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.content, b'')
+
+    def test_streaming_compressed_incrementally(self):
+        """Test streaming responses are compressed chunk by chunk."""
+        chunks = [b'{"chunk": "%d"}' % i * 20 for i in range(5)]
+        response = StreamingHttpResponse(
+            iter(chunks), content_type='application/json')
+
+        res = self.run_middleware(response, HTTP_ACCEPT_ENCODING='gzip')
+
+        body = list(res.streaming_content)
+        self.assertGreater(len(body), 2)
+        self.assertEqual(gzip.decompress(b''.join(body)), b''.join(chunks))
+
+    def test_parse_accept_encoding(self):
+        """Test q-values are parsed."""
+        self.assertEqual(
+            parse_accept_encoding('gzip;q=0.5, br, *;q=0'),
+            {'gzip': 0.5, 'br': 1.0, '*': 0.0},
+        )
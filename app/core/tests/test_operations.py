@@ -0,0 +1,205 @@
+"""
+Tests for online migration operations and the safety checker.
+"""
+
+from contextlib import contextmanager
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.apps import apps
+from django.core.management import CommandError, call_command
+from django.db import (
+    NotSupportedError, OperationalError, connection, migrations, models,
+)
+from django.test import SimpleTestCase
+
+from core.models import User
+from core.operations import (
+    ERROR, WARNING, AddIndexConcurrently, BatchedBackfill, WithLockTimeout,
+    check_operation, check_plan,
+)
+
+from .base_test import BaseTestSetup
+
+INDEX = models.Index(fields=['name'], name='core_user_name_idx')
+
+
+def postgres_editor(in_atomic_block=False):
+    """Schema editor stand-in for a PostgreSQL connection."""
+    return mock.Mock(connection=SimpleNamespace(
+        vendor='postgresql', alias='default',
+        in_atomic_block=in_atomic_block,
+    ))
+
+
+@contextmanager
+def backfill_editor():
+    """Schema editor for running a backfill in the test transaction."""
+    if connection.vendor != 'postgresql':
+        # SQLite's can't be entered in a transaction, and isn't used.
+        yield SimpleNamespace(connection=connection)
+        return
+    with connection.schema_editor(atomic=False) as editor:
+        yield editor
+
+
+def lock_timeout_error():
+    error = OperationalError('canceling statement due to lock timeout')
+    error.__cause__ = Exception()
+    error.__cause__.pgcode = '55P03'
+    return error
+
+
+class MigrationSafetyTests(SimpleTestCase):
+    """Test unsafe operations are flagged."""
+
+    databases = {'default'}
+
+    def setUp(self):
+        self.migration = migrations.Migration('0099_test', 'core')
+
+    def check(self, operation):
+        return [level for level, _ in
+                check_operation(operation, self.migration)]
+
+    def test_plain_index_flagged(self):
+        """Test only the concurrent index operation passes."""
+        self.assertEqual(self.check(migrations.AddIndex('user', INDEX)),
+                         [ERROR])
+        self.assertEqual(
+            self.check(AddIndexConcurrently('user', INDEX)), [])
+
+    def test_add_field(self):
+        """Test indexed fields and unguarded DDL are flagged."""
+        indexed = migrations.AddField(
+            'user', 'nickname',
+            models.CharField(max_length=10, db_index=True, default=''))
+        nullable = migrations.AddField(
+            'user', 'nickname', models.CharField(max_length=10, null=True))
+
+        self.assertEqual(self.check(indexed), [ERROR, WARNING])
+        self.assertEqual(self.check(nullable), [WARNING])
+        self.assertEqual(self.check(WithLockTimeout(nullable)), [])
+
+    def test_backfill_in_atomic_migration(self):
+        """Test data migrations holding locks until commit are flagged."""
+        backfill = BatchedBackfill('user', {'name': ''})
+
+        self.assertEqual(self.check(backfill), [WARNING])
+        self.migration.atomic = False
+        self.assertEqual(self.check(backfill), [])
+
+    def test_new_tables_skipped(self):
+        """Test operations on tables created in the same plan pass."""
+        self.migration.operations = [
+            migrations.CreateModel('Thing', [('id', models.AutoField(
+                primary_key=True))]),
+            migrations.AddIndex('thing', INDEX),
+            migrations.AddIndex('user', INDEX),
+        ]
+        plan = [(self.migration, False)]
+
+        findings = check_plan(plan)
+
+        self.assertEqual([op.model_name for _, op, _, _ in findings],
+                         ['user'])
+        self.assertEqual(len(check_plan(plan, skip_new_tables=False)), 2)
+
+    def test_core_migrations_pass(self):
+        """Test the deploy gate accepts every core migration."""
+        out = StringIO()
+
+        call_command('check_migrations_safety', 'core', '--all', stdout=out)
+
+        self.assertIn('Checked', out.getvalue())
+
+    def test_command_fails_on_errors(self):
+        """Test errors are reported and fail the command."""
+        finding = (self.migration, migrations.AddIndex('user', INDEX),
+                   ERROR, 'builds the index while blocking writes')
+        out = StringIO()
+
+        with mock.patch(
+                'core.management.commands.check_migrations_safety.check_plan',
+                return_value=[finding]):
+            with self.assertRaises(CommandError):
+                call_command('check_migrations_safety', 'core', stdout=out)
+
+        self.assertIn('core.0099_test', out.getvalue())
+
+
+class OnlineOperationTests(BaseTestSetup):
+    """Test the operations themselves."""
+
+    def test_lock_timeout_retried(self):
+        """Test DDL is retried with backoff when its lock isn't granted."""
+        editor = postgres_editor()
+        operation = WithLockTimeout(
+            migrations.RunSQL('SELECT 1'), attempts=3, delay=0.5)
+        method = mock.Mock(side_effect=[lock_timeout_error(), None])
+
+        with mock.patch('core.operations.time.sleep') as sleep:
+            operation.run(method, 'core', editor, None, None)
+
+        self.assertEqual(method.call_count, 2)
+        sleep.assert_called_once_with(0.5)
+        editor.execute.assert_any_call(
+            'SET LOCAL lock_timeout = %s', ['2s'])
+        editor.execute.assert_called_with('SET LOCAL statement_timeout = 0')
+
+    def test_lock_timeout_gives_up(self):
+        """Test the last lock timeout is raised."""
+        operation = WithLockTimeout(migrations.RunSQL('SELECT 1'),
+                                    attempts=2, delay=0)
+        method = mock.Mock(
+            side_effect=[lock_timeout_error(), lock_timeout_error()])
+
+        with self.assertRaises(OperationalError):
+            operation.run(method, 'core', postgres_editor(), None, None)
+        self.assertEqual(method.call_count, 2)
+
+    def test_concurrent_operations_need_non_atomic_migration(self):
+        """Test CONCURRENTLY is refused inside a transaction."""
+        state = SimpleNamespace(apps=apps)
+
+        with self.assertRaises(NotSupportedError):
+            AddIndexConcurrently('user', INDEX).database_forwards(
+                'core', postgres_editor(in_atomic_block=True), state, state)
+
+    def test_batched_backfill(self):
+        """Test matching rows are updated batch by batch with progress."""
+        state = SimpleNamespace(apps=apps)
+        operation = BatchedBackfill(
+            'user', {'name': 'Backfilled'}, filter={'is_active': True},
+            batch_size=1)
+        second = User.objects.create_user('second@example.com', 'pass')
+        User.objects.filter(pk=second.pk).update(is_active=True)
+
+        with self.assertLogs('core.operations') as logs, \
+                backfill_editor() as editor:
+            operation.database_forwards('core', editor, state, state)
+
+        self.assertEqual(
+            set(User.objects.filter(is_active=True).values_list(
+                'name', flat=True)), {'Backfilled'})
+        self.assertEqual(User.objects.get(is_active=False).name,
+                         self.inactive_payload['name'])
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn('2/2 rows', logs.records[-1].getMessage())
+
+    def test_batched_backfill_lifts_statement_timeout(self):
+        """Test batches on PostgreSQL run without a statement_timeout."""
+        state = SimpleNamespace(apps=apps)
+        editor = postgres_editor()
+        operation = BatchedBackfill('user', {'name': 'Backfilled'})
+
+        with self.assertLogs('core.operations'):
+            operation.database_forwards('core', editor, state, state)
+
+        self.assertEqual(editor.execute.call_args_list, [
+            mock.call('SET statement_timeout = 0'),
+            mock.call('RESET statement_timeout'),
+        ])
+        self.assertEqual(
+            set(User.objects.values_list('name', flat=True)), {'Backfilled'})
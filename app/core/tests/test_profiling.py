@@ -0,0 +1,194 @@
+"""
+Tests for the sampling profiler.
+"""
+
+import json
+import os
+import signal
+import tempfile
+import threading
+import time
+from collections import Counter
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import resolve, reverse
+from rest_framework.test import APIClient
+
+from core.profiling import (
+    ProfilingMiddleware, SamplingProfiler, install_signal_handler,
+    parse_collapsed, profiler, to_collapsed, to_speedscope, toggle,
+)
+
+PROFILER_URL = reverse('profiler')
+SAMPLES = Counter({
+    ('user-list', ('main (wsgi.py:1)', 'create (views.py:10)')): 3,
+    ('user-list', ('main (wsgi.py:1)',)): 1,
+    ('fake_protected', ('main (wsgi.py:1)', 'get (views.py:5)')): 2,
+})
+
+
+def blocked_in_view(started, release):
+    started.set()
+    release.wait()
+
+
+class SamplingProfilerTests(SimpleTestCase):
+    """Test sampling and the export formats."""
+
+    def tearDown(self):
+        profiler.stop()
+        profiler.reset()
+
+    def test_samples_labelled_threads_only(self):
+        """Test only threads serving a request are sampled."""
+        sampler = SamplingProfiler()
+        started, release = threading.Event(), threading.Event()
+        worker = threading.Thread(
+            target=blocked_in_view, args=(started, release))
+        worker.start()
+        started.wait()
+        sampler.sample()
+        sampler.labels[worker.ident] = 'user-list'
+        sampler.sample()
+        release.set()
+        worker.join()
+
+        (label, stack), = sampler.snapshot()
+        self.assertEqual(label, 'user-list')
+        self.assertTrue(
+            any(frame.startswith('blocked_in_view ') for frame in stack))
+
+    def test_collapsed_round_trip(self):
+        """Test collapsed stacks are written and parsed back."""
+        text = to_collapsed(SAMPLES)
+
+        self.assertIn('user-list;main (wsgi.py:1);create (views.py:10) 3',
+                      text)
+        self.assertEqual(parse_collapsed(text), SAMPLES)
+
+    def test_speedscope_profile_per_label(self):
+        """Test the speedscope export shares frames across labels."""
+        document = to_speedscope(SAMPLES)
+
+        self.assertEqual(len(document['shared']['frames']), 3)
+        profiles = {p['name']: p for p in document['profiles']}
+        self.assertEqual(profiles['user-list']['endValue'], 4)
+        self.assertEqual(profiles['fake_protected']['weights'], [2])
+
+    def test_middleware_labels_with_url_name(self):
+        """Test request threads are labelled only while profiling."""
+        seen = []
+
+        def get_response(request):
+            request.resolver_match = resolve('/fake_protected/')
+            middleware.process_view(request, None, (), {})
+            seen.append(dict(profiler.labels))
+            return HttpResponse()
+
+        middleware = ProfilingMiddleware(get_response)
+        request = RequestFactory().get('/fake_protected/')
+        middleware(request)
+        profiler.start(hz=1)
+        middleware(request)
+
+        ident = threading.get_ident()
+        self.assertEqual(seen, [{}, {ident: 'fake_protected'}])
+        self.assertEqual(profiler.labels, {})
+
+    def test_signal_toggle_dumps_samples(self):
+        """Test toggling off writes this worker's samples to a file."""
+        with tempfile.TemporaryDirectory() as directory:
+            with self.settings(PROFILING_DIR=directory):
+                toggle()
+                self.assertTrue(profiler.running)
+                toggle()
+
+            self.assertFalse(profiler.running)
+            self.assertEqual(len(os.listdir(directory)), 1)
+
+    def test_signal_handler_defers_toggle(self):
+        """Test the signal only flags a toggle, done off the main thread."""
+        def wait_until(condition):
+            deadline = time.monotonic() + 5
+            while not condition() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(condition())
+
+        previous = signal.getsignal(signal.SIGUSR2)
+        self.addCleanup(signal.signal, signal.SIGUSR2, previous)
+        with tempfile.TemporaryDirectory() as directory:
+            with self.settings(
+                    PROFILING_SIGNAL='SIGUSR2', PROFILING_DIR=directory):
+                if not install_signal_handler():
+                    self.skipTest('not on the main thread')
+                os.kill(os.getpid(), signal.SIGUSR2)
+                wait_until(lambda: profiler.running)
+                os.kill(os.getpid(), signal.SIGUSR2)
+                wait_until(lambda: os.listdir(directory))
+
+            self.assertFalse(profiler.running)
+
+    def test_merge_profiles(self):
+        """Test dumps from several workers are summed."""
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for worker in range(2):
+                paths.append(os.path.join(directory, f'{worker}.collapsed'))
+                with open(paths[-1], 'w') as f:
+                    f.write(to_collapsed(SAMPLES))
+            out = StringIO()
+
+            call_command('merge_profiles', *paths, stdout=out)
+            self.assertEqual(parse_collapsed(out.getvalue()),
+                             SAMPLES + SAMPLES)
+
+            out = StringIO()
+            call_command('merge_profiles', *paths, label=['fake_protected'],
+                         output_format='speedscope', stdout=out)
+            document = json.loads(out.getvalue())
+            self.assertEqual(document['profiles'][0]['weights'], [4])
+
+
+class ProfilerViewTests(TestCase):
+    """Test the staff-only profiler endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.staff = get_user_model().objects.create_superuser(
+            'admin@example.com', 'password123')
+
+    def tearDown(self):
+        profiler.stop()
+        profiler.reset()
+
+    def test_requires_staff(self):
+        """Test regular users can't control the profiler."""
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'password123')
+        self.client.force_authenticate(user)
+
+        res = self.client.post(PROFILER_URL, {'running': True})
+
+        self.assertEqual(res.status_code, 403)
+        self.assertFalse(profiler.running)
+
+    def test_start_export_stop(self):
+        """Test staff can start, export and stop the profiler."""
+        self.client.force_authenticate(self.staff)
+
+        res = self.client.post(PROFILER_URL, {'running': True, 'hz': 50})
+        self.assertTrue(res.data['running'])
+        self.assertEqual(res.data['hz'], 50)
+
+        res = self.client.get(PROFILER_URL, {'output': 'collapsed'})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Content-Type'], 'text/plain')
+
+        res = self.client.post(
+            PROFILER_URL, {'running': False, 'reset': True})
+        self.assertFalse(res.data['running'])
+        self.assertEqual(res.data['samples'], 0)
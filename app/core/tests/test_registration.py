@@ -0,0 +1,137 @@
+"""
+Tests for registration idempotency, pre-checks and admission control.
+"""
+
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import exceptions
+from rest_framework.test import APIClient
+
+from core import views
+from core.admission import AdmissionController, ServiceUnavailable
+
+
+REGISTER_URL = reverse('auth:user-list')
+
+
+class RegistrationTests(TestCase):
+    """Test the user registration endpoint."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.payload = {'email': 'new@example.com', 'password': 'Complex135@'}
+
+    def register(self, key=None, **payload):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.client.post(
+            REGISTER_URL, {**self.payload, **payload}, format='json',
+            **headers)
+
+    def test_duplicate_normalized_email_rejected(self):
+        """Test a taken email is rejected whatever its domain case."""
+        get_user_model().objects.create_user('new@example.com', 'pw')
+
+        with mock.patch(
+                'django.contrib.auth.base_user.make_password') as hash_:
+            res = self.register(email='new@EXAMPLE.com')
+
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(
+            res.data['email'][0], 'user with this email already exists.')
+        hash_.assert_not_called()
+
+    def test_retry_with_key_is_replayed(self):
+        """Test repeating a request with the same key creates one user."""
+        first = self.register(key='signup-0001')
+        second = self.register(key='signup-0001')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(get_user_model().objects.count(), 1)
+
+    def test_key_reused_for_other_body(self):
+        """Test a key can't be reused for a different request."""
+        self.register(key='signup-0002')
+
+        res = self.register(key='signup-0002', email='other@example.com')
+
+        self.assertEqual(res.status_code, 422)
+
+    def test_invalid_key_rejected(self):
+        """Test malformed keys are rejected."""
+        self.assertEqual(self.register(key='short').status_code, 400)
+
+    def test_overload_returns_429(self):
+        """Test registrations beyond the limit and queue are turned away."""
+        admission = AdmissionController('overload', limit=1, retry_after=5)
+
+        with mock.patch.object(views, 'registration_admission', admission):
+            with admission.admit():
+                res = self.register()
+
+        self.assertEqual(res.status_code, 429)
+        self.assertEqual(res['Retry-After'], '5')
+        self.assertFalse(get_user_model().objects.exists())
+
+
+class AdmissionControllerTests(TestCase):
+    """Test the admission controller on its own."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_queue_timeout_raises_503(self):
+        """Test a queued request gives up after the timeout."""
+        admission = AdmissionController(
+            'timeout', limit=1, queue_size=1, timeout=0.01)
+
+        with admission.admit():
+            with self.assertRaises(ServiceUnavailable):
+                with admission.admit():
+                    pass
+        self.assertEqual(admission.waiting, 0)
+
+    def test_slots_are_released(self):
+        """Test slots are freed after errors too."""
+        admission = AdmissionController('release', limit=1)
+
+        with self.assertRaises(ValueError):
+            with admission.admit():
+                raise ValueError
+        with admission.admit():
+            with self.assertRaises(exceptions.Throttled):
+                with admission.admit():
+                    pass
+
+    def test_slots_are_shared_between_controllers(self):
+        """Test the limit holds across processes sharing the cache."""
+        worker_1 = AdmissionController('shared', limit=1)
+        worker_2 = AdmissionController('shared', limit=1)
+
+        with worker_1.admit():
+            with self.assertRaises(exceptions.Throttled):
+                with worker_2.admit():
+                    pass
+        with worker_2.admit():
+            pass
+
+    def test_queued_request_gets_a_freed_slot(self):
+        """Test a waiting request is admitted once a slot frees up."""
+        admission = AdmissionController(
+            'queue', limit=1, queue_size=1, timeout=5)
+        admission.poll_interval = 0.01
+        holder = admission.admit()
+        holder.__enter__()
+        threading.Timer(0.05, holder.__exit__, (None, None, None)).start()
+
+        with admission.admit():
+            pass
+        self.assertEqual(admission.waiting, 0)
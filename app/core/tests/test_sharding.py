@@ -0,0 +1,188 @@
+"""
+Tests for sharded user storage.
+"""
+
+from io import StringIO
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from djoser.utils import encode_uid
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.models import TokenFamily, UserChange
+from core.sharding import SHARD_CLAIM, UserShardRouter, shard_for_email
+from core.tokens import activation_tokens, password_reset_tokens
+
+
+LOGIN_URL = reverse('jwt-create')
+ACTIVATE_URL = reverse('auth:user-activation')
+RESET_CONFIRM_URL = reverse('auth:user-reset-password-confirm')
+CHANGES_URL = reverse('user-changes')
+PROTECTED_URL = reverse('fake_protected')
+SHARDS = ['default', 'shard_1']
+
+
+def email_on(shard):
+    """Return an email address hashing to `shard`."""
+    i = 0
+    while shard_for_email(f'user{i}@example.com') != shard:
+        i += 1
+    return f'user{i}@example.com'
+
+
+@override_settings(USER_SHARDS=SHARDS)
+class ShardingTests(TestCase):
+    """Test routing users to shards by email."""
+
+    databases = set(SHARDS)
+
+    def test_shard_for_email_is_stable(self):
+        """Test the shard depends on the normalized email only."""
+        self.assertEqual(
+            shard_for_email('Someone@EXAMPLE.com'),
+            shard_for_email('Someone@example.com'),
+        )
+        spread = {shard_for_email(f'u{i}@example.com') for i in range(50)}
+        self.assertEqual(spread, set(SHARDS))
+
+    def test_create_user_routes_to_shard(self):
+        """Test new users are stored on their email shard only."""
+        email = email_on('shard_1')
+        user = get_user_model().objects.create_user(email, 'password123')
+
+        self.assertEqual(user._state.db, 'shard_1')
+        self.assertTrue(
+            get_user_model().objects.using('shard_1')
+            .filter(email=email).exists())
+        self.assertFalse(
+            get_user_model().objects.filter(email=email).exists())
+
+    def test_login_and_request_use_token_shard(self):
+        """Test login finds the user on its shard and tokens carry it."""
+        email = email_on('shard_1')
+        user = get_user_model().objects.create_user(email, 'password123')
+        user.is_active = True
+        user.save()
+        client = APIClient()
+
+        res = client.post(
+            LOGIN_URL, {'email': email, 'password': 'password123'})
+
+        token = res.data['access']
+        self.assertEqual(AccessToken(token)['shard'], 'shard_1')
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(client.get(PROTECTED_URL).status_code, 200)
+        user.refresh_from_db()
+        self.assertIsNotNone(user.last_login)
+
+    def test_rebalance_moves_users_keeping_ids(self):
+        """Test rebalancing copies misplaced users with their links."""
+        moving, staying = email_on('shard_1'), email_on('default')
+        with self.settings(USER_SHARDS=['default']):
+            moved = get_user_model().objects.create_user(moving, 'pw')
+            kept = get_user_model().objects.create_user(staying, 'pw')
+        group = Group.objects.create(name='staff')
+        Group.objects.using('shard_1').create(pk=group.pk, name='staff')
+        moved.groups.add(group)
+        out = StringIO()
+
+        call_command('rebalance_user_shards', batch_size=1, stdout=out)
+
+        self.assertIn('Moved 1 users.', out.getvalue())
+        copy = get_user_model().objects.using('shard_1').get(pk=moved.pk)
+        self.assertEqual(copy.email, moving)
+        self.assertEqual(list(copy.groups.values_list('pk', flat=True)),
+                         [group.pk])
+        self.assertEqual(
+            list(get_user_model().objects.values_list('pk', flat=True)),
+            [kept.pk])
+
+        call_command('rebalance_user_shards', stdout=out)
+        self.assertIn('Moved 0 users.', out.getvalue())
+        self.assertFalse(UserChange.objects.filter(
+            user_id=moved.pk, action=UserChange.DELETED).exists())
+
+    def test_rebalance_revokes_refresh_tokens_of_moved_users(self):
+        """Test moved users sign in again: their tokens name the old shard."""
+        email = email_on('shard_1')
+        with self.settings(USER_SHARDS=['default']):
+            moved = get_user_model().objects.create_user(email, 'pw')
+        TokenFamily.objects.create(user_id=moved.pk, expires_at='2999-01-01')
+
+        call_command('rebalance_user_shards', stdout=StringIO())
+
+        self.assertFalse(TokenFamily.objects.filter(user_id=moved.pk).exists())
+
+    def test_token_for_another_shard_is_not_retried_elsewhere(self):
+        """Test a token only ever authenticates on the shard it names."""
+        user = get_user_model().objects.create_user(
+            email_on('shard_1'), 'password123')
+        user.is_active = True
+        user.save()
+        token = AccessToken.for_user(user)
+        token[SHARD_CLAIM] = 'default'
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        self.assertEqual(client.get(PROTECTED_URL).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+
+    def test_activation_and_reset_reach_the_user_shard(self):
+        """Test id-based token flows use the shard named in the token."""
+        user = get_user_model().objects.create_user(
+            email_on('shard_1'), 'Complex135@')
+        client = APIClient()
+        uid = encode_uid(user.pk)
+
+        res = client.post(ACTIVATE_URL, {
+            'uid': uid, 'token': activation_tokens.make_token(user)})
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        user.refresh_from_db()
+        self.assertTrue(user.is_active)
+
+        res = client.post(RESET_CONFIRM_URL, {
+            'uid': uid, 'token': password_reset_tokens.make_token(user),
+            'new_password': 'NewComplex135@'})
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        user.refresh_from_db()
+        self.assertTrue(user.check_password('NewComplex135@'))
+
+    def test_admin_and_change_feed_find_shard_users(self):
+        """Test id lookups search every shard."""
+        staff = get_user_model().objects.create_superuser(
+            email_on('default'), 'password123')
+        # PostgreSQL interleaves ids across shards; keep them apart here.
+        user = get_user_model()(pk=staff.pk + 1000, email=email_on('shard_1'))
+        user.save()
+        model_admin = admin.site._registry[get_user_model()]
+        request = RequestFactory().get('/')
+        request.user = staff
+
+        self.assertEqual(model_admin.get_object(request, str(user.pk)), user)
+        self.assertEqual(
+            model_admin.get_object(request, str(user.pk))._state.db,
+            'shard_1')
+
+        client = APIClient()
+        client.force_authenticate(staff)
+        res = client.get(CHANGES_URL)
+        emails = {change['user']['email'] for change in res.data['results']
+                  if change['user']}
+        self.assertIn(user.email, emails)
+
+    def test_shards_only_migrate_user_tables(self):
+        """Test extra shards get users, auth and contenttypes only."""
+        router = UserShardRouter()
+
+        self.assertIsNone(router.allow_migrate('default', 'core', 'slowquery'))
+        self.assertTrue(router.allow_migrate('shard_1', 'core', 'user'))
+        self.assertTrue(router.allow_migrate('shard_1', 'auth', 'group'))
+        self.assertFalse(
+            router.allow_migrate('shard_1', 'core', 'tokenfamily'))
+        self.assertFalse(router.allow_migrate('shard_1', 'admin', 'logentry'))
@@ -0,0 +1,211 @@
+"""
+Tests for DB time budgets and slow-query capture.
+"""
+
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import SlowQuery
+from core.slow_queries import (
+    QueryBudgetMiddleware, QueryMonitor, SlowQueryRecorder, fingerprint,
+    normalize_sql,
+)
+
+from .base_test import BaseTestSetup
+
+LOGIN_URL = reverse('jwt-create')
+ME_URL = reverse('auth:user-me')
+
+
+def postgres_context(autocommit=True, transaction_status=0):
+    """Execute wrapper context for a fake PostgreSQL connection."""
+    connection = SimpleNamespace(
+        vendor='postgresql', alias='default', statement_timeout_ms=None,
+        get_autocommit=lambda: autocommit,
+        connection=SimpleNamespace(
+            info=SimpleNamespace(transaction_status=transaction_status)),
+    )
+    return {'connection': connection, 'cursor': mock.Mock()}
+
+
+class QueryMonitorTests(SimpleTestCase):
+    """Test statement budgets and slow query detection."""
+
+    def test_normalize_sql(self):
+        """Test literals and parameter lists are normalized away."""
+        statement = normalize_sql(
+            "SELECT * FROM core_user\n WHERE id IN (%s, %s, %s) "
+            "AND email = 'a@example.com' LIMIT 21")
+
+        self.assertEqual(
+            statement,
+            'SELECT * FROM core_user WHERE id IN (...) AND email = ? LIMIT ?')
+        self.assertEqual(
+            fingerprint(statement),
+            fingerprint(normalize_sql(
+                'SELECT * FROM core_user WHERE id IN (%s) AND '
+                "email = 'b@example.com' LIMIT 1")))
+
+    def test_session_budget_set_once_per_connection(self):
+        """Test autocommit requests reuse the connection's session budget."""
+        context = postgres_context()
+        execute = mock.Mock(return_value='rows')
+
+        for _ in range(2):
+            monitor = QueryMonitor(budget_ms=250)
+            self.assertEqual(
+                monitor(execute, 'SELECT 1', (), False, context), 'rows')
+
+        context['cursor'].cursor.execute.assert_called_once_with(
+            'SET statement_timeout = 250')
+        self.assertEqual(execute.call_count, 2)
+
+    def test_session_budget_changed_between_endpoint_classes(self):
+        """Test a request without a budget lifts the previous one."""
+        context = postgres_context()
+
+        QueryMonitor(budget_ms=250)(mock.Mock(), 'SELECT 1', (), False,
+                                    context)
+        QueryMonitor()(mock.Mock(), 'SELECT 1', (), False, context)
+        QueryMonitor()(mock.Mock(), 'SELECT 1', (), False, context)
+
+        self.assertEqual(context['cursor'].cursor.execute.call_args_list, [
+            mock.call('SET statement_timeout = 250'),
+            mock.call('SET statement_timeout = 0'),
+        ])
+
+    def test_local_budget_at_transaction_start(self):
+        """Test a transaction gets SET LOCAL before its first statement."""
+        monitor = QueryMonitor(budget_ms=250)
+        starting = postgres_context(autocommit=False, transaction_status=0)
+        started = postgres_context(autocommit=False, transaction_status=2)
+
+        monitor(mock.Mock(), 'SELECT 1', (), False, starting)
+        monitor(mock.Mock(), 'SELECT 1', (), False, started)
+
+        starting['cursor'].cursor.execute.assert_called_once_with(
+            'SET LOCAL statement_timeout = 250')
+        started['cursor'].cursor.execute.assert_not_called()
+        self.assertIsNone(starting['connection'].statement_timeout_ms)
+
+    def test_no_local_budget_when_session_matches(self):
+        """Test transactions skip SET LOCAL under the same session budget."""
+        context = postgres_context(autocommit=False, transaction_status=0)
+        context['connection'].statement_timeout_ms = 250
+
+        QueryMonitor(budget_ms=250)(mock.Mock(), 'SELECT 1', (), False,
+                                    context)
+
+        context['cursor'].cursor.execute.assert_not_called()
+
+    def test_timeouts_recorded(self):
+        """Test cancelled statements are captured even under threshold."""
+        monitor = QueryMonitor(threshold_ms=10_000)
+        error = OperationalError('canceling statement')
+        error.__cause__ = Exception()
+        error.__cause__.pgcode = '57014'
+
+        with self.assertRaises(OperationalError):
+            monitor(mock.Mock(side_effect=error), 'SELECT 1', (), False,
+                    postgres_context())
+
+        self.assertEqual(len(monitor.slow), 1)
+        self.assertTrue(monitor.slow[0]['timed_out'])
+
+    @override_settings(DB_TIME_BUDGETS={'/api/': 100, '/api/export/': 900},
+                       DB_STATEMENT_TIMEOUT=2000)
+    def test_budget_for_longest_prefix(self):
+        """Test the most specific endpoint class wins."""
+        middleware = QueryBudgetMiddleware(lambda request: None)
+
+        self.assertEqual(middleware.budget_for('/api/export/users/'), 900)
+        self.assertEqual(middleware.budget_for('/api/users/'), 100)
+        self.assertEqual(middleware.budget_for('/healthz'), 2000)
+
+        with override_settings(DB_STATEMENT_TIMEOUT=0):
+            middleware = QueryBudgetMiddleware(lambda request: None)
+        self.assertIsNone(middleware.budget_for('/healthz'))
+
+    @override_settings(SLOW_QUERY_QUEUE_SIZE=1)
+    def test_queries_recorded_off_the_request_thread(self):
+        """Test submitted queries are stored by the recorder's thread."""
+        recorder = SlowQueryRecorder()
+        recorded = threading.Event()
+        threads = []
+
+        def fake_record(queries, view_name):
+            threads.append(threading.current_thread())
+            recorded.wait(5)
+
+        with mock.patch('core.slow_queries.record', fake_record):
+            recorder.submit(['q1'], 'view')
+            for _ in range(100):
+                if threads:
+                    break
+                time.sleep(0.01)
+            recorder.submit(['q2'], 'view')
+            recorder.submit(['q3'], 'view')
+            dropped = recorder.dropped
+            recorded.set()
+            for _ in range(100):
+                if len(threads) == 2:
+                    break
+                time.sleep(0.01)
+
+        self.assertNotEqual(threads[0], threading.current_thread())
+        self.assertEqual(dropped, 1)
+
+
+class SlowQueryCaptureTests(BaseTestSetup):
+    """Test slow queries are stored and reported."""
+
+    @override_settings(SLOW_QUERY_MS=1e-6)
+    def test_slow_queries_recorded_with_plan(self):
+        """Test the request's queries are stored by view with a plan."""
+        token = self.client.post(
+            LOGIN_URL, self.active_payload, format='json').data['access']
+        SlowQuery.objects.all().delete()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, 200)
+        query = SlowQuery.objects.filter(view_name='auth:user-me').first()
+        self.assertIsNotNone(query)
+        self.assertIn('FROM "core_user"', query.statement)
+        self.assertTrue(query.plan)
+
+    def test_report_groups_by_statement_and_view(self):
+        """Test the report aggregates and purges old queries."""
+        def add(duration, view='auth:user-me', timed_out=False):
+            return SlowQuery.objects.create(
+                view_name=view, database='default', fingerprint='f1',
+                statement='SELECT ?', duration_ms=duration,
+                timed_out=timed_out)
+        add(100)
+        add(300, timed_out=True)
+        add(50, view='auth:user-list')
+        old = add(1000)
+        SlowQuery.objects.filter(pk=old.pk).update(
+            recorded_at=timezone.now() - timedelta(days=30))
+        out = StringIO()
+
+        call_command('slow_query_report', '--purge-older-than', '7',
+                     stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], 'Purged 1 slow queries.')
+        self.assertEqual(lines[2].split(),
+                         ['2', '1', '200.0', '300.0', '400.0', 'auth:user-me'])
+        self.assertEqual(lines[3].strip(), 'SELECT ?')
+        self.assertIn('auth:user-list', lines[4])
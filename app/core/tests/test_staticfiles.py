@@ -0,0 +1,114 @@
+"""
+Tests for the static asset pipeline.
+"""
+
+import gzip
+import json
+import os
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from core.staticfiles import (
+    IMMUTABLE_CACHE_CONTROL, CompressedManifestStaticFilesStorage,
+    StaticFilesMiddleware,
+)
+
+ASSET = b'body { color: red; }\n' * 50
+
+
+class StaticFilesTests(SimpleTestCase):
+    """Test precompression and in-process serving of collected files."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        os.makedirs(os.path.join(self.root, 'css'))
+        self.write('css/site.css', ASSET)
+        self.write('css/site.0123456789ab.css', ASSET)
+        self.write('css/site.0123456789ab.css.gz', gzip.compress(ASSET))
+        self.write('staticfiles.json', json.dumps({
+            'version': '1.1',
+            'paths': {'css/site.css': 'css/site.0123456789ab.css'},
+        }).encode())
+        self.factory = RequestFactory()
+        override = override_settings(STATIC_ROOT=self.root, STATIC_SERVE=True)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.middleware = StaticFilesMiddleware(
+            lambda request: HttpResponse('fallthrough'))
+
+    def write(self, name, content):
+        with open(os.path.join(self.root, name), 'wb') as f:
+            f.write(content)
+
+    def get(self, path, **headers):
+        return self.middleware(self.factory.get(path, **headers))
+
+    def test_storage_writes_compressed_variant(self):
+        """Test the storage writes a .gz sibling for text assets."""
+        storage = CompressedManifestStaticFilesStorage(location=self.root)
+        storage.save('css/new.css', ContentFile(ASSET))
+
+        storage.compress('css/new.css')
+
+        with open(os.path.join(self.root, 'css/new.css.gz'), 'rb') as f:
+            self.assertEqual(gzip.decompress(f.read()), ASSET)
+
+    def test_hashed_file_served_immutable_and_precompressed(self):
+        """Test hashed names get far-future headers and the .gz body."""
+        res = self.get('/static/css/site.0123456789ab.css',
+                       HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(res['Content-Type'], 'text/css')
+        self.assertEqual(
+            gzip.decompress(b''.join(res.streaming_content)), ASSET)
+
+    def test_unhashed_file_short_lived_and_identity(self):
+        """Test original names are cached briefly and sent as-is."""
+        res = self.get('/static/css/site.css')
+
+        self.assertNotIn('immutable', res['Cache-Control'])
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(res.streaming_content), ASSET)
+
+    def test_etag_revalidation(self):
+        """Test a matching If-None-Match returns 304."""
+        etag = self.get('/static/css/site.css')['ETag']
+
+        res = self.get('/static/css/site.css', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+
+    def test_each_encoding_has_its_own_etag(self):
+        """Test a cached gzip body never revalidates an identity request."""
+        path = '/static/css/site.0123456789ab.css'
+        gzipped = self.get(path, HTTP_ACCEPT_ENCODING='gzip')
+        identity = self.get(path)
+
+        self.assertNotEqual(gzipped['ETag'], identity['ETag'])
+        self.assertFalse(gzipped.has_header('Content-Disposition'))
+        res = self.get(path, HTTP_IF_NONE_MATCH=gzipped['ETag'])
+        self.assertEqual(res.status_code, 200)
+        res = self.get(path, HTTP_ACCEPT_ENCODING='gzip',
+                       HTTP_IF_NONE_MATCH=f'"other", {gzipped["ETag"]}')
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res['Vary'], 'Accept-Encoding')
+
+    def test_unknown_paths_fall_through(self):
+        """Test other requests reach the rest of the stack."""
+        self.assertEqual(self.get('/static/missing.css').content,
+                         b'fallthrough')
+        self.assertEqual(self.get('/api/').content, b'fallthrough')
+
+    def test_swagger_ui_uses_local_assets(self):
+        """Test the docs page loads Swagger UI from STATIC_URL."""
+        res = self.client.get(reverse('swagger-ui'))
+
+        self.assertContains(res, '/static/drf_spectacular_sidecar/')
@@ -0,0 +1,81 @@
+"""
+Tests for refresh token rotation within token families.
+"""
+
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.models import TokenFamily
+
+from .base_test import BaseTestSetup
+
+
+LOGIN_URL = reverse('jwt-create')
+REFRESH_URL = reverse('jwt-refresh')
+
+
+class TokenFamilyTests(BaseTestSetup):
+    """Test refresh token rotation and reuse detection."""
+
+    def login(self):
+        res = self.client.post(LOGIN_URL, self.active_payload, format='json')
+        return res.data['refresh']
+
+    def refresh(self, token):
+        return self.client.post(REFRESH_URL, {'refresh': token})
+
+    def test_login_starts_a_family(self):
+        """Test each login creates a family at generation 0."""
+        token = RefreshToken(self.login())
+
+        family = TokenFamily.objects.get(pk=token['fam'])
+        self.assertEqual(family.user_id, self.active_user.pk)
+        self.assertEqual(token['gen'], 0)
+
+    def test_refresh_rotates_in_one_query(self):
+        """Test a refresh is a single UPDATE and returns a new token."""
+        token = self.login()
+
+        with self.assertNumQueries(1):
+            res = self.refresh(token)
+
+        self.assertEqual(res.status_code, 200)
+        rotated = RefreshToken(res.data['refresh'])
+        self.assertEqual(rotated['gen'], 1)
+        self.assertEqual(
+            TokenFamily.objects.get(pk=rotated['fam']).generation, 1)
+        self.assertEqual(self.refresh(res.data['refresh']).status_code, 200)
+
+    def test_reuse_revokes_family(self):
+        """Test replaying a rotated token revokes its descendants too."""
+        token = self.login()
+        rotated = self.refresh(token).data['refresh']
+
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+        self.assertFalse(TokenFamily.objects.exists())
+        self.assertEqual(self.refresh(rotated).status_code, 401)
+
+    def test_tokens_without_family_rejected(self):
+        """Test refresh tokens not issued by login are refused."""
+        token = RefreshToken.for_user(self.active_user)
+
+        self.assertEqual(self.refresh(str(token)).status_code, 401)
+
+    def test_purge_removes_expired_families(self):
+        """Test the purge command deletes expired families only."""
+        self.login()
+        TokenFamily.objects.create(
+            user_id=self.active_user.pk,
+            expires_at=timezone.now() - timedelta(minutes=1))
+        out = StringIO()
+
+        call_command('purge_token_families', batch_size=1, stdout=out)
+
+        self.assertEqual(TokenFamily.objects.count(), 1)
+        self.assertIn('Purged 1 token families.', out.getvalue())
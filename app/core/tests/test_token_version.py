@@ -0,0 +1,95 @@
+"""
+Tests for revoking tokens on password changes.
+"""
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from djoser.utils import encode_uid
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.authentication import VERSION_CLAIM, JWTAuthentication
+from core.models import TokenFamily
+from core.tokens import password_reset_tokens
+
+from .base_test import BaseTestSetup
+
+LOGIN_URL = reverse('jwt-create')
+REFRESH_URL = reverse('jwt-refresh')
+ME_URL = reverse('auth:user-me')
+SET_PASSWORD_URL = reverse('auth:user-set-password')
+RESET_CONFIRM_URL = reverse('auth:user-reset-password-confirm')
+
+
+class TokenVersionTests(BaseTestSetup):
+    """Test password changes invalidate outstanding tokens."""
+
+    def login(self, password='Complex135@'):
+        res = self.client.post(LOGIN_URL, {
+            'email': self.active_payload['email'], 'password': password})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data['access'], res.data['refresh']
+
+    def me(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        res = self.client.get(ME_URL)
+        self.client.credentials()
+        return res.status_code
+
+    def test_tokens_carry_the_version(self):
+        access, _ = self.login()
+
+        self.assertEqual(AccessToken(access)[VERSION_CLAIM], 0)
+
+    def test_password_change_bumps_version_in_the_same_update(self):
+        self.active_user.set_password('NewComplex135@')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.active_user.save()
+
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('token_version', updates[0])
+        self.assertEqual(self.active_user.token_version, 1)
+
+    def test_set_password_revokes_access_and_refresh_tokens(self):
+        access, refresh = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        res = self.client.post(SET_PASSWORD_URL, {
+            'current_password': 'Complex135@',
+            'new_password': 'NewComplex135@',
+        })
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertEqual(self.me(access), status.HTTP_401_UNAUTHORIZED)
+        res = self.client.post(REFRESH_URL, {'refresh': refresh})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(
+            TokenFamily.objects.filter(user_id=self.active_user.pk).exists())
+
+        new_access, _ = self.login('NewComplex135@')
+        self.assertEqual(self.me(new_access), status.HTTP_200_OK)
+
+    def test_password_reset_revokes_access_tokens(self):
+        access, _ = self.login()
+        res = self.client.post(RESET_CONFIRM_URL, {
+            'uid': encode_uid(self.active_user.pk),
+            'token': password_reset_tokens.make_token(self.active_user),
+            'new_password': 'NewComplex135@',
+        })
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertEqual(self.me(access), status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_without_version_is_version_zero(self):
+        """Test tokens issued before versioning stay valid until a change."""
+        token = AccessToken.for_user(self.active_user)
+        self.assertNotIn(VERSION_CLAIM, token)
+
+        self.assertEqual(JWTAuthentication().get_user(token),
+                         self.active_user)
+
+        self.active_user.set_password('NewComplex135@')
+        self.active_user.save(update_fields=['password'])
+        self.assertEqual(self.me(str(token)), status.HTTP_401_UNAUTHORIZED)
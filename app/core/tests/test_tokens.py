@@ -0,0 +1,126 @@
+"""
+Tests for the signed activation and password reset tokens.
+"""
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from djoser.utils import encode_uid
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.tokens import activation_tokens, password_reset_tokens
+
+
+ACTIVATE_USER_URL = reverse('auth:user-activation')
+PASSWORD_RESET_CONFIRM_URL = reverse('auth:user-reset-password-confirm')
+
+
+class TokenServiceTests(TestCase):
+    """Test token verification and single use."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='Complex135@'
+        )
+        self.uid = encode_uid(self.user.pk)
+
+    def activate(self, token):
+        return self.client.post(
+            ACTIVATE_USER_URL, {'uid': self.uid, 'token': token},
+            format='json')
+
+    def reset(self, token, password='NewComplex135@'):
+        return self.client.post(PASSWORD_RESET_CONFIRM_URL, {
+            'uid': self.uid, 'token': token, 'new_password': password,
+        }, format='json')
+
+    def test_activation_is_a_single_conditional_update(self):
+        """Test activation costs the UPDATE plus its change feed entry."""
+        token = activation_tokens.make_token(self.user)
+
+        # The audit event is buffered outside tests.
+        with self.assertNumQueries(2), patch('core.audit.record') as record:
+            res = self.activate(token)
+
+        record.assert_called_once()
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+
+    def test_replayed_activation_is_refused_without_cache(self):
+        """Test a consumed token is refused from the user's state."""
+        token = activation_tokens.make_token(self.user)
+        self.activate(token)
+        cache.clear()
+
+        res = self.activate(token)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_activation_cannot_be_replayed_after_deactivation(self):
+        """Test a used token cannot reactivate a deactivated user."""
+        token = activation_tokens.make_token(self.user)
+        self.assertEqual(self.activate(token).status_code,
+                         status.HTTP_204_NO_CONTENT)
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False)
+
+        res = self.activate(token)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+
+    def test_activation_of_active_user_is_stale(self):
+        """Test a fresh token for an already active user is refused."""
+        self.user.is_active = True
+        self.user.save()
+
+        res = self.activate(activation_tokens.make_token(self.user))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_tampered_or_foreign_token_rejected_without_queries(self):
+        """Test bad signatures and mismatched uids never hit the DB."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='Complex135@')
+        token = activation_tokens.make_token(self.user)
+
+        with self.assertNumQueries(0):
+            tampered = self.activate(token[:-2] + 'xx')
+            foreign = self.activate(activation_tokens.make_token(other))
+            reset_token = self.activate(
+                password_reset_tokens.make_token(self.user))
+
+        for res in (tampered, foreign, reset_token):
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(PASSWORD_RESET_TIMEOUT=-1)
+    def test_expired_token_rejected(self):
+        """Test tokens older than PASSWORD_RESET_TIMEOUT are refused."""
+        res = self.activate(activation_tokens.make_token(self.user))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reset_token_is_single_use(self):
+        """Test a reset token works once, even if the cache is lost."""
+        token = password_reset_tokens.make_token(self.user)
+
+        res = self.reset(token)
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('NewComplex135@'))
+
+        res = self.reset(token, 'OtherComplex135@')
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        cache.clear()
+        res = self.reset(token, 'OtherComplex135@')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,88 @@
+"""
+Compact signed tokens for account activation and password reset.
+
+A token carries the user id and shard (see core.sharding) signed with
+SECRET_KEY, so its signature and age can be checked without touching the
+database, plus the user state it was issued for: a fingerprint of the
+password hash for resets, and the `token_version` for activation, which
+activating bumps. A token therefore stops working once it has been used,
+whatever the cache holds. Consumed reset tokens are also remembered in
+the cache until they would have expired anyway.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+
+def password_fingerprint(user):
+    """Return a short digest changing whenever the password changes."""
+    return salted_hmac(
+        'core.tokens.password', user.password).hexdigest()[:12]
+
+
+class TokenService:
+    """Issue and verify signed, single-use tokens for one purpose."""
+
+    def __init__(self, purpose, bind_password=False, bind_version=False):
+        self.purpose = purpose
+        self.salt = f'core.tokens.{purpose}'
+        self.bind_password = bind_password
+        self.bind_version = bind_version
+
+    @property
+    def max_age(self):
+        return settings.PASSWORD_RESET_TIMEOUT
+
+    def make_token(self, user):
+        payload = {'u': user.pk}
+        if user._state.db not in (None, DEFAULT_DB_ALIAS):
+            payload['s'] = user._state.db
+        if self.bind_password:
+            payload['p'] = password_fingerprint(user)
+        if self.bind_version:
+            payload['v'] = user.token_version
+        return signing.dumps(payload, salt=self.salt, compress=True)
+
+    def load(self, token):
+        """Return the payload of a valid, unexpired token, or None."""
+        try:
+            payload = signing.loads(
+                token, salt=self.salt, max_age=self.max_age)
+        except signing.BadSignature:
+            return None
+        if not isinstance(payload, dict) or 'u' not in payload:
+            return None
+        return payload
+
+    def check_password(self, payload, user):
+        """Check a reset token was issued for the current password."""
+        return constant_time_compare(
+            payload.get('p', ''), password_fingerprint(user))
+
+    def shard(self, payload):
+        """Return the database alias of the user a token was issued to."""
+        return payload.get('s', DEFAULT_DB_ALIAS)
+
+    def version(self, payload):
+        """Return the token_version a token was issued for."""
+        return payload.get('v', 0)
+
+    def _used_key(self, token):
+        digest = hashlib.sha256(token.encode()).hexdigest()[:32]
+        return f'tokens:used:{self.purpose}:{digest}'
+
+    def is_used(self, token):
+        return cache.get(self._used_key(token)) is not None
+
+    def mark_used(self, token):
+        """Remember `token` as consumed; return False if it already was."""
+        return cache.add(self._used_key(token), 1, timeout=self.max_age)
+
+
+activation_tokens = TokenService('activation', bind_version=True)
+password_reset_tokens = TokenService('password_reset', bind_password=True)
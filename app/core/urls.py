@@ -0,0 +1,14 @@
+"""
+URL configuration for the core app.
+
+Mirrors `djoser.urls` with the core user viewset.
+"""
+
+from rest_framework.routers import DefaultRouter
+
+from core import views
+
+router = DefaultRouter()
+router.register('users', views.UserViewSet)
+
+urlpatterns = router.urls
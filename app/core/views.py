@@ -0,0 +1,262 @@
+"""
+Views for the core app.
+"""
+
+import os
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DatabaseError, connections
+from django.db.models import F
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.cache import never_cache
+from djoser import signals, views as djoser_views
+from djoser.compat import get_user_email
+from djoser.conf import settings as djoser_settings
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SpectacularAPIView
+from rest_framework import generics, status, views
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from core import audit, caching, changes, profiling, sharding
+from core.admission import AdmissionController
+from core.authentication import Principal
+from core.idempotency import idempotent
+from core.models import AuditEvent, UserChange
+from core.pagination import AuditEventPagination, SequencePagination
+from core.serializers import (
+    AuditEventFilterSerializer, AuditEventSerializer, ProfilerSerializer,
+    UserChangeSerializer,
+)
+
+
+class UserChangeListView(generics.ListAPIView):
+    """List user changes since a given sequence number."""
+    permission_classes = [IsAdminUser]
+    serializer_class = UserChangeSerializer
+    pagination_class = SequencePagination
+    queryset = UserChange.objects.all()
+
+    def get_queryset(self):
+        # Never hand out a cursor past a seq an open transaction may commit.
+        return changes.settled(super().get_queryset())
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['users'] = getattr(self, 'users', {})
+        return context
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        # One query for the users in the batch instead of one per change.
+        self.users = sharding.users_in_bulk(
+            {change.user_id for change in page})
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+registration_admission = AdmissionController.from_settings('REGISTRATION')
+
+
+# Djoser user endpoints with deferred deletion and signed tokens. Not a
+# docstring: the schema would show it as every endpoint's description.
+class UserViewSet(djoser_views.UserViewSet):
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+    def get_instance(self):
+        user = self.request.user
+        return user.unwrap() if isinstance(user, Principal) else user
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        with registration_admission.admit():
+            return super().create(request, *args, **kwargs)
+
+    def perform_destroy(self, instance):
+        instance.soft_delete()
+        audit.record(AuditEvent.DELETED, instance.pk, request=self.request)
+
+    @action(['post'], detail=False)
+    def activation(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # The token was checked without the database; activating is a
+        # single conditional UPDATE. It bumps the token_version the token
+        # is bound to, so a replay matches no row, even after the user has
+        # been deactivated again.
+        users = get_user_model().objects.db_manager(serializer.shard)
+        activated = users.filter(
+            pk=serializer.user_id, is_active=False, deleted_at__isnull=True,
+            token_version=serializer.token_service.version(
+                serializer.payload),
+        ).update(is_active=True, token_version=F('token_version') + 1)
+        if not activated:
+            raise PermissionDenied(serializer.error_messages['stale_token'])
+        changes.record_change(serializer.user_id, UserChange.UPDATED)
+        audit.record(AuditEvent.ACTIVATED, serializer.user_id,
+                     request=request)
+
+        if (signals.user_activated.has_listeners()
+                or djoser_settings.SEND_CONFIRMATION_EMAIL):
+            user = users.get(pk=serializer.user_id)
+            signals.user_activated.send(
+                sender=self.__class__, user=user, request=self.request
+            )
+            if djoser_settings.SEND_CONFIRMATION_EMAIL:
+                context = {'user': user}
+                to = [get_user_email(user)]
+                djoser_settings.EMAIL.confirmation(
+                    self.request, context).send(to)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(['post'], detail=False)
+    def reset_password_confirm(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if not serializer.token_service.mark_used(
+                serializer.validated_data['token']):
+            raise PermissionDenied(serializer.error_messages['stale_token'])
+
+        user = serializer.user
+        user.set_password(serializer.validated_data['new_password'])
+        user.save()
+        audit.record(AuditEvent.PASSWORD_RESET, user.pk, request=request)
+
+        if djoser_settings.PASSWORD_CHANGED_EMAIL_CONFIRMATION:
+            context = {'user': user}
+            to = [get_user_email(user)]
+            djoser_settings.EMAIL.password_changed_confirmation(
+                self.request, context).send(to)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@extend_schema(exclude=True)
+class ProfilerView(views.APIView):
+    """Control the sampling profiler of the worker serving the request.
+
+    GET returns its status, or the samples with `?output=collapsed` or
+    `?output=speedscope`; POST starts or stops it.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        output = request.query_params.get('output')
+        if output in ('collapsed', 'speedscope'):
+            samples = profiling.profiler.snapshot()
+            content_type = (
+                'application/json' if output == 'speedscope' else 'text/plain')
+            response = HttpResponse(
+                profiling.render(samples, output), content_type=content_type)
+            response['Content-Disposition'] = (
+                f'attachment; filename="profile-{os.getpid()}.{output}"')
+            return response
+        return Response(self.status())
+
+    def post(self, request):
+        serializer = ProfilerSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        if data['running']:
+            profiling.profiler.start(data.get('hz'))
+        else:
+            profiling.profiler.stop()
+        if data['reset']:
+            profiling.profiler.reset()
+        return Response(self.status())
+
+    def status(self):
+        profiler = profiling.profiler
+        return {
+            'pid': os.getpid(),
+            'running': profiler.running,
+            'hz': profiler.hz,
+            'started_at': profiler.started_at,
+            'samples': sum(profiler.snapshot().values()),
+        }
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """OpenAPI schema served from the per-deploy cache."""
+
+    def _get_schema_response(self, request):
+        version = (
+            self.api_version or request.version
+            or self._get_version_parameter(request)
+        )
+        return Response(
+            data=caching.get_schema(version, request),
+            headers={'Content-Disposition': 'inline; filename="{}"'.format(
+                self._get_filename(request, version))},
+        )
+
+
+class AuditEventListView(generics.ListAPIView):
+    """List audit events, filtered by time range, event type and user."""
+    permission_classes = [IsAdminUser]
+    serializer_class = AuditEventSerializer
+    pagination_class = AuditEventPagination
+
+    @extend_schema(parameters=[AuditEventFilterSerializer])
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        filters = AuditEventFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        return audit.events(**filters.validated_data)
+
+
+@extend_schema(exclude=True)
+class AuditStatsView(views.APIView):
+    """Audit sink counters of the worker serving the request."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({'pid': os.getpid(), **audit.sink.stats()})
+
+
+@extend_schema(exclude=True)
+class CacheStatsView(views.APIView):
+    """Cache hit/miss counters of the worker serving the request."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({'pid': os.getpid(), 'caches': caching.cache_stats()})
+
+
+@never_cache
+def healthz(request):
+    """Liveness probe: the process serves requests. No I/O."""
+    return JsonResponse({'status': 'ok'})
+
+
+@never_cache
+def readyz(request):
+    """Readiness probe: every database and the shared cache answer."""
+    checks = {}
+    for alias in settings.DATABASES:
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+            checks[f'db:{alias}'] = 'ok'
+        except DatabaseError as exc:
+            checks[f'db:{alias}'] = exc.__class__.__name__
+    try:
+        # has_key round-trips without counting a miss in the cache stats.
+        caches['default'].has_key('readyz')
+        checks['cache:default'] = 'ok'
+    except Exception as exc:
+        checks['cache:default'] = exc.__class__.__name__
+    ready = all(result == 'ok' for result in checks.values())
+    return JsonResponse(
+        {'status': 'ok' if ready else 'unavailable', 'checks': checks},
+        status=200 if ready else 503,
+    )
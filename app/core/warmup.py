@@ -0,0 +1,116 @@
+"""
+Worker warmup, run before a worker accepts traffic.
+
+The first requests of a fresh worker otherwise pay for compiling URL
+patterns, building serializer fields, connecting to the databases,
+loading the JWT algorithms and generating the OpenAPI schema.
+"""
+
+import logging
+import time
+
+from django.db import connections
+from django.urls import URLResolver, get_resolver
+
+from core import caching
+
+logger = logging.getLogger(__name__)
+
+
+def iter_views(resolver=None):
+    """Yield the view callback of every URL pattern, compiling each regex."""
+    resolver = resolver or get_resolver()
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex  # compiled and cached on first access
+        if isinstance(pattern, URLResolver):
+            yield from iter_views(pattern)
+        else:
+            yield pattern.callback
+
+
+def resolve_urls():
+    resolver = get_resolver()
+    resolver.reverse_dict  # populates the reverse() lookup tables
+    for _ in iter_views(resolver):
+        pass
+
+
+def serializer_classes(callback):
+    """Return the serializer classes a DRF view callback can use."""
+    cls = getattr(callback, 'cls', None)
+    if cls is None:
+        return set()
+    actions = getattr(callback, 'actions', None) or {}
+    found = set()
+    for action in set(actions.values()) or {None}:
+        view = cls(**getattr(callback, 'initkwargs', {}))
+        view.action = action
+        view.request = view.format_kwarg = None
+        view.args, view.kwargs = (), {}
+        try:
+            if hasattr(view, 'get_serializer_class'):
+                found.add(view.get_serializer_class())
+            elif getattr(view, 'serializer_class', None):
+                found.add(view.serializer_class)
+        except Exception:
+            continue
+    return found
+
+
+def build_serializers():
+    classes = set()
+    for callback in iter_views():
+        classes |= serializer_classes(callback)
+    for serializer_class in classes:
+        serializer_class(context={}).fields
+
+
+def open_connections():
+    for connection in connections.all():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+
+def load_jwt_keys():
+    from rest_framework_simplejwt.settings import api_settings
+    from rest_framework_simplejwt.state import token_backend
+
+    token = token_backend.encode({
+        api_settings.TOKEN_TYPE_CLAIM: 'access',
+        api_settings.USER_ID_CLAIM: 0,
+        'exp': int(time.time()) + 60,
+    })
+    token_backend.decode(token)
+
+
+def run_warmers():
+    for warm in caching.WARMERS.values():
+        warm()
+
+
+STEPS = [
+    ('urls', resolve_urls),
+    ('serializers', build_serializers),
+    ('databases', open_connections),
+    ('jwt', load_jwt_keys),
+    ('caches', run_warmers),
+]
+
+
+def warm_up():
+    """
+    Run every warmup step, logging failures without raising, and return
+    {step: milliseconds}.
+    """
+    timings = {}
+    for name, step in STEPS:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception('Warmup step %r failed', name)
+        timings[name] = (time.perf_counter() - start) * 1000
+    logger.info(
+        'Worker warmed up in %.0f ms (%s)', sum(timings.values()),
+        ', '.join(f'{name} {ms:.0f} ms' for name, ms in timings.items()))
+    return timings
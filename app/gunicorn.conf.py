@@ -0,0 +1,18 @@
+"""
+Gunicorn settings for the production image, overridable from the
+environment.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+# Heartbeat files on tmpfs; a slow overlay filesystem stalls workers.
+worker_tmp_dir = '/dev/shm'
+accesslog = '-'
+# Each worker loads (and warms up) the app itself: warmup opens database
+# connections, which must not be shared across forks.
+preload_app = False
@@ -0,0 +1,39 @@
+#!/usr/bin/env bash
+# Build the dev image for several Python/requirements stacks and run the
+# throughput benchmark of each against the same PostgreSQL.
+#
+# Usage: scripts/benchmark_stacks.sh [python_version:requirements ...]
+#        (default: 3.9:requirements.txt 3.12:requirements.upgrade.txt)
+#
+# ITERATIONS sets the requests per endpoint (default 2000).
+set -euo pipefail
+
+cd "$(dirname "$0")/.."
+
+IMAGE=${IMAGE:-docker-drf-bench}
+ITERATIONS=${ITERATIONS:-2000}
+stacks=("$@")
+[ ${#stacks[@]} -eq 0 ] && stacks=(3.9:requirements.txt 3.12:requirements.upgrade.txt)
+
+network="$IMAGE-$$"
+docker network create "$network" > /dev/null
+db=$(docker run -d --network "$network" --network-alias db \
+    -e POSTGRES_PASSWORD=postgres postgres:16-alpine)
+trap 'docker rm -f "$db" > /dev/null; docker network rm "$network" > /dev/null' EXIT
+
+for stack in "${stacks[@]}"; do
+    python_version=${stack%%:*}
+    requirements=${stack#*:}
+    tag="$IMAGE:py$python_version"
+    docker build --quiet --target dev --tag "$tag" \
+        --build-arg PYTHON_VERSION="$python_version" \
+        --build-arg REQUIREMENTS="$requirements" . > /dev/null
+
+    echo "== Python $python_version, $requirements"
+    docker run --rm --network "$network" \
+        -e DB_HOST=db -e DJANGO_SETTINGS_MODULE=app.settings.prod_settings \
+        -e SECRET_KEY=benchmark -e WARMUP=False "$tag" sh -c "
+            python manage.py wait_for_db &&
+            python manage.py migrate -v 0 &&
+            python manage.py benchmark throughput --iterations $ITERATIONS"
+done
@@ -0,0 +1,54 @@
+#!/usr/bin/env bash
+# Build image targets and report their size and cold-start latency.
+#
+# Usage: scripts/report_image_metrics.sh [target ...]   (default: dev prod)
+#
+# For each target this prints:
+#   size_mb    uncompressed image size
+#   import_ms  time to import the WSGI app in a fresh container (no warmup)
+#   ready_ms   `docker run` until /healthz answers under gunicorn, warmup
+#              included
+# Extra `docker run` arguments (e.g. --network and DB_HOST for a real
+# database) can be passed in RUN_ARGS.
+set -euo pipefail
+
+cd "$(dirname "$0")/.."
+
+IMAGE=${IMAGE:-docker-drf}
+TIMEOUT=${TIMEOUT:-60}
+read -r -a run_args <<< "${RUN_ARGS:-}"
+targets=("$@")
+[ ${#targets[@]} -eq 0 ] && targets=(dev prod)
+
+now_ms() { date +%s%3N; }
+
+printf '%-8s %10s %10s %10s\n' target size_mb import_ms ready_ms
+for target in "${targets[@]}"; do
+    tag="$IMAGE:$target"
+    docker build --quiet --target "$target" --tag "$tag" . > /dev/null
+    size=$(docker image inspect --format '{{.Size}}' "$tag")
+
+    import_ms=$(docker run --rm -e WARMUP=False "${run_args[@]}" "$tag" \
+        python -c 'import time; start = time.perf_counter(); import app.wsgi; print(round((time.perf_counter() - start) * 1000))')
+
+    start=$(now_ms)
+    container=$(docker run -d -p 127.0.0.1::8000 \
+        -e ALLOWED_HOSTS=127.0.0.1 "${run_args[@]}" "$tag" \
+        gunicorn app.wsgi:application)
+    trap 'docker rm -f "$container" > /dev/null' EXIT
+    port=$(docker port "$container" 8000/tcp | head -n 1 | cut -d: -f2)
+    ready_ms=timeout
+    while [ $(( $(now_ms) - start )) -lt $(( TIMEOUT * 1000 )) ]; do
+        if curl -fsS -o /dev/null "http://127.0.0.1:$port/healthz" 2> /dev/null; then
+            ready_ms=$(( $(now_ms) - start ))
+            break
+        fi
+        sleep 0.05
+    done
+    docker rm -f "$container" > /dev/null
+    trap - EXIT
+
+    printf '%-8s %10s %10s %10s\n' "$target" \
+        "$(awk -v bytes="$size" 'BEGIN { printf "%.1f", bytes / 1e6 }')" \
+        "$import_ms" "$ready_ms"
+done